@@ -1,6 +1,7 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 import os
 
 # For development, using SQLite. In production, use PostgreSQL
@@ -25,3 +26,73 @@ def get_db():
     finally:
         db.close()
 
+
+# ============ 비동기 엔진 (asyncpg / aiosqlite) ============
+# 이벤트 루프를 막지 않도록 async 엔드포인트에서 사용합니다.
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "10"))
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+# 요청 하나의 쿼리가 워커를 오래 붙잡지 않도록 하는 문장 단위 타임아웃 (0이면 사용 안 함)
+# 요청 세션(get_async_db)에만 적용하고, 백그라운드 갱신/일괄 조회 세션(AsyncSessionLocal)에는 적용하지 않음
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "5000"))
+
+
+def get_async_database_url(url: str) -> str:
+    """동기 DB URL을 비동기 드라이버 URL로 변환"""
+    if url.startswith("postgresql+asyncpg://") or url.startswith("sqlite+aiosqlite://"):
+        return url
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    if url.startswith("postgresql"):
+        return "postgresql+asyncpg://" + url.split("://", 1)[1]
+    if url.startswith("sqlite"):
+        return "sqlite+aiosqlite://" + url.split("://", 1)[1]
+    return url
+
+
+def _async_engine_options(url: str) -> dict:
+    if url.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+ASYNC_DATABASE_URL = get_async_database_url(SQLALCHEMY_DATABASE_URL)
+
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_async_engine_options(ASYNC_DATABASE_URL))
+
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+
+class RequestSession(Session):
+    """API 요청용 세션 (트랜잭션마다 문장 타임아웃 적용)"""
+
+
+@event.listens_for(RequestSession, "after_begin")
+def _set_statement_timeout(session, transaction, connection):
+    # SET LOCAL은 트랜잭션이 끝나면 풀리므로 커넥션 풀의 다른 사용자(백그라운드 작업)에는 영향 없음
+    if DB_STATEMENT_TIMEOUT_MS > 0 and connection.dialect.name == "postgresql":
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {DB_STATEMENT_TIMEOUT_MS}")
+
+
+RequestSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, sync_session_class=RequestSession, expire_on_commit=False
+)
+
+
+async def get_async_db():
+    async with RequestSessionLocal() as db:
+        yield db
+
+
+async def close_async_engine() -> None:
+    """비동기 커넥션 풀 종료 (서버 종료 시 호출)"""
+    await async_engine.dispose()
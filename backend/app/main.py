@@ -1,11 +1,102 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+import signal
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from app.database import SessionLocal, engine, async_engine, close_async_engine
 from app.routers import chatbot, users
+from app.services.affinity import load_affinity_model
+from app.services.catalog import load_catalog, load_catalog_snapshot
+from app.services.catalog_snapshot import open_snapshot
+from app.services.llm import providers, close_llm_clients, reload_providers
+from app.services.insight_snapshots import insight_snapshots
+from app.services.cohort_insights import cohort_insights
+from app.services.chat_log import chat_log
+from app.services.message_classifier import get_classifier, reload_classifier
+from app.services.observability import setup_logging, instrument_engine, render_metrics
+
+setup_logging()
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+
+logger = logging.getLogger(__name__)
+
+
+# ============ 설정 다시 로드 (SIGHUP) ============
+
+def reload_on_sighup() -> None:
+    """
+    SIGHUP 수신 시 재시작 없이 설정 다시 로드
+
+    secret.json의 API 키와 제공자 클라이언트를 다시 만들고 (kill -HUP <워커 pid>),
+    로컬 분류기 모델 파일은 이벤트 루프를 막지 않도록 스레드에서 다시 로드합니다.
+    """
+    try:
+        reload_providers(force=True)
+        logger.info("🔄 API 키 다시 로드")
+    except Exception as e:
+        logger.warning("⚠️  API 키 다시 로드 실패: %s", e)
+    asyncio.get_running_loop().run_in_executor(None, reload_classifier)
+
+
+def install_reload_handler() -> bool:
+    """현재 이벤트 루프에 SIGHUP 핸들러 등록 (지원하지 않는 플랫폼이면 False)"""
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, reload_on_sighup)
+        return True
+    except (AttributeError, NotImplementedError, RuntimeError) as e:
+        logger.warning("⚠️  SIGHUP 핸들러 등록 실패, 설정 다시 로드는 재시작으로만 가능: %s", e)
+        return False
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 서버 시작 시 상품 카탈로그를 한 번만 로드 (스냅샷이 있으면 mmap, 없으면 DB 조회)
+    snapshot = open_snapshot()
+    if snapshot is not None:
+        catalog = load_catalog_snapshot(snapshot)
+        logger.info("📦 상품 카탈로그 스냅샷 로드: %d개 (version=%s)", len(catalog), catalog.version)
+    else:
+        db = SessionLocal()
+        try:
+            catalog = load_catalog(db)
+            logger.info("📦 상품 카탈로그 로드: %d개 (version=%s)", len(catalog), catalog.version)
+        except Exception as e:
+            logger.warning("⚠️  상품 카탈로그 로드 실패: %s", e)
+        finally:
+            db.close()
+    # API 키는 시작 시 한 번만 로드 (이후 SIGHUP으로 갱신)
+    try:
+        providers.secrets()
+    except Exception as e:
+        logger.warning("⚠️  API 키 로드 실패: %s", e)
+    reload_handler = install_reload_handler()
+    # 구매 연관 모델 (mmap, 없으면 구매이력 연관 점수 없이 동작)
+    load_affinity_model()
+    # 로컬 의도/감정 분류기 (첫 요청에서 학습하지 않도록 미리 로드)
+    get_classifier()
+    # 구매 인사이트 스냅샷 증분/일일 갱신
+    insight_snapshots.start()
+    # 세그먼트 인사이트 주기적 갱신 (콜드 스타트 추천 prior)
+    cohort_insights.start()
+    # 대화 내역 배치 저장
+    chat_log.start()
+    yield
+    if reload_handler:
+        asyncio.get_running_loop().remove_signal_handler(signal.SIGHUP)
+    await chat_log.stop()
+    await cohort_insights.stop()
+    await insight_snapshots.stop()
+    await close_llm_clients()
+    await close_async_engine()
+
 
 app = FastAPI(
     title="FreshMind API",
     description="AI-powered fresh grocery e-commerce platform",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -32,3 +123,9 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus 메트릭 (단계별 소요 시간, DB 쿼리 시간, LLM 호출/캐시 수)"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
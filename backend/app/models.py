@@ -3,12 +3,49 @@ SQLAlchemy ORM 모델
 schema.sql과 일치하도록 작성됨
 """
 
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Text, Numeric
+import json
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Text, Numeric, Index, DDL, event
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
+from sqlalchemy.types import TypeDecorator
 from app.database import Base
 
 
+class StringList(TypeDecorator):
+    """
+    문자열 배열 컬럼
+
+    PostgreSQL은 TEXT[] (GIN 인덱스), 그 외(SQLite)는 JSON 배열 문자열로 저장합니다.
+    ORM에서는 항상 list[str]로 읽고 씁니다.
+    """
+    impl = Text
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(ARRAY(Text))
+        return dialect.type_descriptor(Text())
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if dialect.name == "postgresql":
+            return list(value)
+        return json.dumps(list(value), ensure_ascii=False)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return []
+        if dialect.name == "postgresql":
+            return list(value)
+        try:
+            parsed = json.loads(value)
+        except (TypeError, ValueError):
+            return []
+        return parsed if isinstance(parsed, list) else []
+
+
 class User(Base):
     """사용자 프로필 정보"""
     __tablename__ = "users"
@@ -26,6 +63,11 @@ class User(Base):
     purchase_history = relationship("PurchaseHistory", back_populates="user")
     chat_messages = relationship("ChatMessage", back_populates="user")
 
+    __table_args__ = (
+        # 세그먼트(성별/연령대)별 집계용 (schema.sql과 같음)
+        Index("idx_gender_age", "gender", "age_group"),
+    )
+
 
 class Product(Base):
     """상품 정보 및 타겟팅 데이터"""
@@ -45,9 +87,9 @@ class Product(Base):
     purchase_count = Column(Integer, default=0)
     
     target_gender = Column(String(20))  # 'all', 'male', 'female', 'male-oriented', 'female-oriented'
-    target_age_groups = Column(Text)  # JSON 배열 형태: '["20s", "30s"]'
-    used_in = Column(Text)  # JSON 배열 형태: '["찌개/국/탕", "볶음"]'
-    tags = Column(Text)  # JSON 배열 형태: '["유기농", "국내산"]'
+    target_age_groups = Column(StringList, default=list)  # ["20s", "30s"]
+    used_in = Column(StringList, default=list)  # ["찌개/국/탕", "볶음"]
+    tags = Column(StringList, default=list)  # ["유기농", "국내산"]
     
     stock = Column(Integer, default=0)
     badge = Column(String(50))
@@ -57,6 +99,13 @@ class Product(Base):
     
     # Relationships
     purchase_history = relationship("PurchaseHistory", back_populates="product")
+    
+    __table_args__ = (
+        # SQLite는 product_attributes 테이블로 조회
+        Index("idx_products_target_age_groups", "target_age_groups", postgresql_using="gin").ddl_if(dialect="postgresql"),
+        Index("idx_products_used_in", "used_in", postgresql_using="gin").ddl_if(dialect="postgresql"),
+        Index("idx_products_tags", "tags", postgresql_using="gin").ddl_if(dialect="postgresql"),
+    )
 
 
 class PurchaseHistory(Base):
@@ -93,3 +142,84 @@ class ChatMessage(Base):
     
     # Relationships
     user = relationship("User", back_populates="chat_messages")
+
+
+class UserPurchaseInsight(Base):
+    """사용자별 구매 인사이트 스냅샷 (purchase-summary 응답을 미리 계산해 저장)"""
+    __tablename__ = "user_purchase_insights"
+    
+    user_id = Column(Integer, ForeignKey("users.user_id"), primary_key=True)
+    period_days = Column(Integer, primary_key=True)
+    summary = Column(Text, nullable=False)  # JSON: get_purchase_summary 결과
+    last_purchase_id = Column(Integer, nullable=False, default=0)  # 계산 시점의 마지막 구매 ID
+    computed_at = Column(DateTime, nullable=False)
+
+
+# ============ SQLite 상품 속성 정규화 ============
+
+# 속성 이름 → products 배열 컬럼
+PRODUCT_ATTRIBUTE_COLUMNS = {
+    "target_age": "target_age_groups",
+    "used_in": "used_in",
+    "tag": "tags",
+}
+
+
+class ProductAttribute(Base):
+    """
+    상품 배열 속성의 정규화 테이블 (SQLite 전용)
+
+    SQLite에는 배열/GIN 인덱스가 없으므로 (속성, 값) 인덱스로 조회합니다.
+    products 트리거가 자동으로 채우므로 직접 쓰지 않습니다.
+    PostgreSQL은 products의 TEXT[] 컬럼과 GIN 인덱스를 사용하고 이 테이블은 비어 있습니다.
+    """
+    __tablename__ = "product_attributes"
+    
+    attribute = Column(String(20), primary_key=True)  # 'target_age', 'used_in', 'tag'
+    value = Column(String(100), primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.product_id", ondelete="CASCADE"), primary_key=True)
+    
+    __table_args__ = (
+        Index("idx_product_attributes_product", "product_id", "attribute"),
+    )
+
+
+def sqlite_attribute_insert(row: str = "NEW") -> str:
+    """
+    products 행의 JSON 배열들을 product_attributes로 펼치는 INSERT ... SELECT
+
+    Args:
+        row: 트리거에서는 "NEW", 기존 데이터 채우기에는 "products" (모든 행)
+    """
+    from_products = "products, " if row == "products" else ""
+    selects = [
+        f"SELECT '{attribute}', value, {row}.product_id "
+        f"FROM {from_products}json_each(COALESCE(NULLIF({row}.{column}, ''), '[]'))"
+        for attribute, column in PRODUCT_ATTRIBUTE_COLUMNS.items()
+    ]
+    return (
+        "INSERT OR IGNORE INTO product_attributes (attribute, value, product_id) "
+        + " UNION ".join(selects)
+    )
+
+
+_ARRAY_COLUMNS = ", ".join(PRODUCT_ATTRIBUTE_COLUMNS.values())
+
+SQLITE_PRODUCT_ATTRIBUTE_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS trg_products_attributes_insert AFTER INSERT ON products
+BEGIN
+  {sqlite_attribute_insert("NEW")};
+END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_products_attributes_update AFTER UPDATE OF {_ARRAY_COLUMNS} ON products
+BEGIN
+  DELETE FROM product_attributes WHERE product_id = OLD.product_id;
+  {sqlite_attribute_insert("NEW")};
+END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_products_attributes_delete AFTER DELETE ON products
+BEGIN
+  DELETE FROM product_attributes WHERE product_id = OLD.product_id;
+END""",
+]
+
+for _trigger in SQLITE_PRODUCT_ATTRIBUTE_TRIGGERS:
+    event.listen(ProductAttribute.__table__, "after_create", DDL(_trigger).execute_if(dialect="sqlite"))
@@ -1,23 +1,49 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+import json
+import logging
+from contextlib import aclosing
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple, AsyncIterator
 from app.services.chatbot import (
     analyze_intent,
     analyze_sentiment,
     recommend_products,
-    generate_casual_response
+    generate_casual_response,
+    stream_casual_response,
+    stream_recommendations,
+    should_recommend_products,
+    prefilter_candidates,
+    use_single_shot,
+    analyze_single_shot,
+    ProductCandidates,
+    SingleShotAnalysis
 )
+from app.services.affinity import get_affinity_model
+from app.services.catalog import get_catalog
+from app.services.chat_log import chat_log
+from app.services.llm import MODEL_LABELS
+from app.services.llm_cache import response_cache
+from app.services.llm_router import llm_router, request_deadline
+from app.services.observability import span, track_request, summarize_spans, server_timing_header
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 
 class ChatRequest(BaseModel):
     """챗봇 요청 데이터"""
     message: str
     user_profile: Optional[Dict[str, Any]] = None
-    products: List[Dict[str, Any]]  # 프론트엔드에서 전달받은 상품 목록
+    products: Optional[List[Dict[str, Any]]] = None  # (레거시) 프론트엔드에서 전달받은 상품 목록
+    product_ids: Optional[List[int]] = None  # 서버 카탈로그 중 후보로 사용할 상품 ID
+    catalog_version: Optional[str] = None  # 클라이언트가 알고 있는 카탈로그 버전
     purchase_history: Optional[List[Dict[str, Any]]] = []  # 구매이력 데이터 (신규)
-    model: str = "gpt"  # AI 모델 선택: "gpt" 또는 "gemini"
+    model: str = "gpt"  # AI 모델 선택: "gpt", "gemini" 또는 "local"(LLM 없이 로컬 추천)
+    latency_budget_ms: Optional[int] = None  # 요청 전체 LLM 지연 예산 (초과한 단계는 기본값/로컬 추천으로 대체)
+    single_shot: Optional[bool] = None  # 의도/감정/추천을 LLM 한 번으로 처리 (생략 시 CHAT_SINGLE_SHOT)
+    user_id: Optional[int] = None  # 대화 내역 저장용 사용자 ID (없으면 저장하지 않음)
 
 
 class ChatResponse(BaseModel):
@@ -28,91 +54,351 @@ class ChatResponse(BaseModel):
     keywords: List[str]
     recommended_products: List[Dict[str, Any]]  # 추천 상품들
     model_used: str  # 사용된 AI 모델
+    catalog_version: Optional[str] = None  # 응답에 사용된 서버 카탈로그 버전
+    pipeline: str = "multi_call"  # 분석 방식: "single_shot" 또는 "multi_call" (A/B 비교용)
+
+
+def resolve_products(request: ChatRequest) -> List[Dict[str, Any]]:
+    """
+    요청에 사용할 상품 목록 결정
+
+    - products가 있으면 그대로 사용 (레거시 클라이언트)
+    - product_ids가 있으면 서버 카탈로그에서 해당 상품만 사용
+    - 둘 다 없으면 서버 카탈로그 전체 사용
+    """
+    if request.products:
+        return request.products
+    catalog = get_catalog()
+    if request.product_ids:
+        return catalog.get_many(request.product_ids)
+    return catalog.products
+
+
+def find_product(products: List[Dict[str, Any]], product_id: int) -> Optional[Dict[str, Any]]:
+    """
+    추천 결과의 상품 조회
+
+    서버 카탈로그는 ID로 바로 조회하고(스냅샷이면 해당 상품만 읽음),
+    요청으로 전달된 상품 목록은 순회합니다.
+    """
+    catalog = get_catalog()
+    if products is catalog.products:
+        return catalog.get(product_id)
+    return next((p for p in products if p['id'] == product_id), None)
+
+
+def resolve_model(request: ChatRequest) -> str:
+    """요청 모델 검증 (지원하지 않으면 gpt)"""
+    return request.model if request.model in ["gpt", "gemini", "local"] else "gpt"
+
+
+async def start_analysis(
+    request: ChatRequest,
+    user_profile: Dict[str, Any],
+    products: List[Dict[str, Any]],
+    model: str
+) -> Tuple[asyncio.Task, asyncio.Task, Optional[ProductCandidates]]:
+    """
+    의도 분석과 감정 분석을 동시에 시작합니다.
+    
+    키워드로 추천 의도가 확정되면 LLM 응답을 기다리는 동안 후보 선택을 먼저 수행합니다.
+    """
+    intent_task = asyncio.create_task(analyze_intent(request.message, model=model))
+    sentiment_task = asyncio.create_task(analyze_sentiment(request.message, model=model))
+    
+    candidates = None
+    if should_recommend_products(request.message):
+        await asyncio.sleep(0)  # LLM 요청이 먼저 출발하도록 양보
+        candidates = prefilter_candidates(request.message, user_profile, products, request.purchase_history or [])
+    return intent_task, sentiment_task, candidates
+
+
+async def try_single_shot(
+    request: ChatRequest,
+    user_profile: Dict[str, Any],
+    products: List[Dict[str, Any]],
+    model: str
+) -> Optional[SingleShotAnalysis]:
+    """단일 호출 모드면 의도/감정/추천을 한 번에 처리 (사용하지 않거나 실패하면 None)"""
+    if not use_single_shot(request.single_shot, model):
+        return None
+    return await analyze_single_shot(
+        request.message, user_profile, products,
+        purchase_history=request.purchase_history or [],
+        model=model
+    )
+
+
+def build_product_card(rec: Any, product: Dict[str, Any]) -> Dict[str, Any]:
+    """추천 결과와 상품 정보로 응답용 상품 카드 구성"""
+    return {
+        "id": rec.product_id,
+        "name": rec.name,
+        "reason": rec.reason,
+        "relevance_score": rec.relevance_score,
+        "price": product.get('price'),
+        "image": product.get('image'),
+        "rating": product.get('rating'),
+        "reviews": product.get('reviews'),
+        "category": product.get('category')
+    }
 
 
 @router.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, response: Response):
     """
     사용자 메시지를 받아 의도를 파악하고, 필요시에만 상품을 추천합니다.
     
     - **message**: 사용자가 입력한 메시지
     - **user_profile**: 사용자 프로필 (gender, ageGroup 등)
-    - **products**: 전체 상품 목록
+    - **products**: (레거시) 전체 상품 목록
+    - **product_ids**: 서버 카탈로그 중 후보 상품 ID (생략 시 전체)
+    - **catalog_version**: 클라이언트가 캐시한 카탈로그 버전
+    - **latency_budget_ms**: 요청 전체 LLM 지연 예산 (ms, 생략 시 CHAT_LATENCY_BUDGET_MS)
+    - **single_shot**: 의도/감정/추천을 LLM 한 번으로 처리 (검증 실패 시 기존 다중 호출로 대체)
+    - **user_id**: 대화 내역을 저장할 사용자 ID (응답 후 배치로 저장)
     """
-    try:
-        user_profile = request.user_profile or {}
-        model = request.model if request.model in ["gpt", "gemini"] else "gpt"
+    with track_request() as spans, span("chat_request") as current, request_deadline(request.latency_budget_ms):
+        analysis_tasks: List[asyncio.Task] = []
+        try:
+            user_profile = request.user_profile or {}
+            products = resolve_products(request)
+            catalog = get_catalog()
+            if request.catalog_version and request.catalog_version != catalog.version:
+                logger.warning("⚠️  카탈로그 버전 불일치: client=%s, server=%s", request.catalog_version, catalog.version)
+            model = resolve_model(request)
+            current.provider = MODEL_LABELS[model]["provider"]
+            current.model = MODEL_LABELS[model]["model"]
         
-        print(f"🤖 사용 모델: {model.upper()}")
+            logger.info("🤖 사용 모델: %s", model.upper())
         
-        # 1. 의도 분석 (상품 추천이 필요한가?)
-        intent_analysis = await analyze_intent(request.message, model=model)
-        print(f"🔍 의도 분석: {intent_analysis.intent_type}, 상품 추천 필요: {intent_analysis.needs_product_recommendation}")
+            # 1~3. 단일 호출 모드면 의도/감정/추천을 한 번에 처리 (실패 시 아래 다중 호출로 대체)
+            combined = await try_single_shot(request, user_profile, products, model)
+            if combined is not None:
+                intent_analysis, sentiment_result = combined.intent, combined.sentiment
+            else:
+                # 1~2. 의도 분석과 감정 분석은 서로 독립적이므로 동시에 실행
+                intent_task, sentiment_task, candidates = await start_analysis(request, user_profile, products, model)
+                analysis_tasks = [intent_task, sentiment_task]
+                intent_analysis, sentiment_result = await asyncio.gather(intent_task, sentiment_task)
+            logger.info("🔍 의도 분석: %s, 상품 추천 필요: %s", intent_analysis.intent_type, intent_analysis.needs_product_recommendation)
+            logger.info("💭 감정: %s (%s)", sentiment_result.sentiment, sentiment_result.score)
         
-        # 2. 감정 분석
-        sentiment_result = await analyze_sentiment(request.message, model=model)
-        print(f"💭 감정: {sentiment_result.sentiment} ({sentiment_result.score})")
+            recommended_products_detail = []
+            response_message = ""
         
-        recommended_products_detail = []
-        response_message = ""
-        
-        # 3. 상품 추천이 필요한 경우에만 추천 실행
-        if intent_analysis.needs_product_recommendation:
-            print("✅ 상품 추천 실행")
-            recommendations = await recommend_products(
-                message=request.message,
-                sentiment_result=sentiment_result,
-                user_profile=user_profile,
-                all_products=request.products,
-                purchase_history=request.purchase_history or [],  # 구매이력 전달
-                model=model
-            )
+            # 3. 상품 추천이 필요한 경우에만 추천 실행
+            if intent_analysis.needs_product_recommendation:
+                logger.info("✅ 상품 추천 실행")
+                if combined is not None:
+                    recommendations = combined.recommendations
+                else:
+                    recommendations = await recommend_products(
+                        message=request.message,
+                        sentiment_result=sentiment_result,
+                        user_profile=user_profile,
+                        all_products=products,
+                        purchase_history=request.purchase_history or [],  # 구매이력 전달
+                        model=model,
+                        candidates=candidates,
+                        latency_budget_ms=request.latency_budget_ms
+                    )
             
-            # 추천 상품 상세 정보 구성
-            for rec in recommendations:
-                product = next((p for p in request.products if p['id'] == rec.product_id), None)
-                if product:
-                    recommended_products_detail.append({
-                        "id": rec.product_id,
-                        "name": rec.name,
-                        "reason": rec.reason,
-                        "relevance_score": rec.relevance_score,
-                        "price": product.get('price'),
-                        "image": product.get('image'),
-                        "rating": product.get('rating'),
-                        "reviews": product.get('reviews'),
-                        "category": product.get('category')
-                    })
+                # 추천 상품 상세 정보 구성
+                for rec in recommendations:
+                    product = find_product(products, rec.product_id)
+                    if product:
+                        recommended_products_detail.append(build_product_card(rec, product))
             
-            # 상품 추천 응답 메시지
-            response_message = generate_response_message(
-                sentiment=sentiment_result.sentiment,
-                recommendations=recommendations,
-                user_name=user_profile.get('name', '고객')
+                # 상품 추천 응답 메시지
+                response_message = generate_response_message(
+                    sentiment=sentiment_result.sentiment,
+                    recommendations=recommendations,
+                    user_name=user_profile.get('name', '고객')
+                )
+            else:
+                logger.info("ℹ️  일반 대화 응답 생성")
+                # 일반 대화 응답
+                response_message = await generate_casual_response(
+                    message=request.message,
+                    sentiment_result=sentiment_result,
+                    intent_analysis=intent_analysis,
+                    user_profile=user_profile,
+                    model=model
+                )
+        
+            chat_log.record(
+                request.user_id, request.message,
+                sentiment_result.sentiment, sentiment_result.score,
+                response_message, [card["id"] for card in recommended_products_detail]
             )
-        else:
-            print("ℹ️  일반 대화 응답 생성")
-            # 일반 대화 응답
-            response_message = await generate_casual_response(
-                message=request.message,
-                sentiment_result=sentiment_result,
-                intent_analysis=intent_analysis,
-                user_profile=user_profile,
-                model=model
+            response.headers["Server-Timing"] = server_timing_header(spans)
+            return ChatResponse(
+                message=response_message,
+                sentiment=sentiment_result.sentiment,
+                sentiment_score=sentiment_result.score,
+                keywords=sentiment_result.keywords,
+                recommended_products=recommended_products_detail,
+                model_used=model,
+                catalog_version=None if request.products else catalog.version,
+                pipeline="multi_call" if combined is None else "single_shot"
             )
         
-        return ChatResponse(
-            message=response_message,
-            sentiment=sentiment_result.sentiment,
-            sentiment_score=sentiment_result.score,
-            keywords=sentiment_result.keywords,
-            recommended_products=recommended_products_detail,
-            model_used=model
-        )
+        except Exception as e:
+            logger.exception("❌ 챗봇 오류: %s", e)
+            raise HTTPException(status_code=500, detail=f"챗봇 처리 중 오류 발생: {str(e)}")
+        finally:
+            # 오류나 연결 종료 시 남은 분석 LLM 호출 취소
+            cancel_pending(analysis_tasks)
+
+
+def cancel_pending(tasks: List[asyncio.Task]) -> None:
+    """끝나지 않은 작업 취소"""
+    for task in tasks:
+        if not task.done():
+            task.cancel()
+
+
+async def iterate(items: List[Any]) -> AsyncIterator[Any]:
+    """목록을 비동기 이터레이터로 변환"""
+    for item in items:
+        yield item
+
+
+def sse_event(event: str, data: Any) -> str:
+    """Server-Sent Events 형식의 이벤트 문자열 생성"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def sentiment_event_data(sentiment_result: Any) -> Dict[str, Any]:
+    """sentiment 이벤트 데이터"""
+    return {
+        "sentiment": sentiment_result.sentiment,
+        "sentiment_score": sentiment_result.score,
+        "keywords": sentiment_result.keywords
+    }
+
+
+async def stream_chat_events(request: ChatRequest) -> AsyncIterator[str]:
+    """
+    채팅 처리 단계별 이벤트를 생성합니다.
+    
+    이벤트 순서: meta → intent/sentiment(먼저 끝난 순서) → recommendation(상품별) 또는 token(청크별) → done
+    추천 상품은 LLM 응답(JSON)에서 항목이 완성되는 대로 전송하고, 처리 중 오류가 나면 done 대신 error로 끝납니다.
+    """
+    with track_request() as spans, span("chat_stream") as current, request_deadline(request.latency_budget_ms):
+        analysis_tasks: List[asyncio.Task] = []
+        try:
+            user_profile = request.user_profile or {}
+            products = resolve_products(request)
+            catalog = get_catalog()
+            model = resolve_model(request)
+            current.provider = MODEL_LABELS[model]["provider"]
+            current.model = MODEL_LABELS[model]["model"]
+        
+            yield sse_event("meta", {
+                "model_used": model,
+                "catalog_version": None if request.products else catalog.version
+            })
+        
+            combined = await try_single_shot(request, user_profile, products, model)
+            if combined is not None:
+                intent_analysis, sentiment_result = combined.intent, combined.sentiment
+                yield sse_event("sentiment", sentiment_event_data(sentiment_result))
+                yield sse_event("intent", intent_analysis.model_dump())
+            else:
+                intent_task, sentiment_task, candidates = await start_analysis(request, user_profile, products, model)
+                analysis_tasks = [intent_task, sentiment_task]
+                
+                # 의도/감정 분석 중 먼저 끝난 결과부터 전송
+                pending = {intent_task, sentiment_task}
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        if task is sentiment_task:
+                            sentiment_result = task.result()
+                            yield sse_event("sentiment", sentiment_event_data(sentiment_result))
+                        else:
+                            intent_analysis = task.result()
+                            yield sse_event("intent", intent_analysis.model_dump())
+        
+            response_message = ""
+            recommended_ids: List[int] = []
+            if intent_analysis.needs_product_recommendation:
+                if combined is not None:
+                    recommendation_stream = iterate(combined.recommendations)
+                else:
+                    recommendation_stream = stream_recommendations(
+                        message=request.message,
+                        sentiment_result=sentiment_result,
+                        user_profile=user_profile,
+                        all_products=products,
+                        purchase_history=request.purchase_history or [],
+                        model=model,
+                        candidates=candidates,
+                        latency_budget_ms=request.latency_budget_ms
+                    )
+                recommendations = []
+                # 연결이 끊기면 LLM 스트림도 바로 닫히도록 aclosing 사용
+                async with aclosing(recommendation_stream):
+                    async for rec in recommendation_stream:
+                        recommendations.append(rec)
+                        product = find_product(products, rec.product_id)
+                        if product:
+                            recommended_ids.append(rec.product_id)
+                            yield sse_event("recommendation", build_product_card(rec, product))
+                response_message = generate_response_message(
+                    sentiment=sentiment_result.sentiment,
+                    recommendations=recommendations,
+                    user_name=user_profile.get('name', '고객')
+                )
+                yield sse_event("token", {"text": response_message})
+            else:
+                chunks = []
+                casual_stream = stream_casual_response(
+                    message=request.message,
+                    sentiment_result=sentiment_result,
+                    intent_analysis=intent_analysis,
+                    user_profile=user_profile,
+                    model=model
+                )
+                async with aclosing(casual_stream):
+                    async for chunk in casual_stream:
+                        chunks.append(chunk)
+                        yield sse_event("token", {"text": chunk})
+                response_message = "".join(chunks).strip()
         
-    except Exception as e:
-        print(f"❌ 챗봇 오류: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"챗봇 처리 중 오류 발생: {str(e)}")
+            chat_log.record(
+                request.user_id, request.message,
+                sentiment_result.sentiment, sentiment_result.score,
+                response_message, recommended_ids
+            )
+            yield sse_event("done", {
+                "message": response_message,
+                "pipeline": "multi_call" if combined is None else "single_shot",
+                "timings": summarize_spans(spans)
+            })
+    
+        except Exception as e:
+            logger.exception("❌ 챗봇 스트리밍 오류: %s", e)
+            yield sse_event("error", {"detail": f"챗봇 처리 중 오류 발생: {str(e)}"})
+        finally:
+            cancel_pending(analysis_tasks)
+
+
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    /chat의 스트리밍 버전 (Server-Sent Events)
+    
+    감정/키워드가 정해지는 즉시 전송하고, 추천 상품 카드는 LLM 응답에서 완성되는 대로 하나씩,
+    일반 대화 응답은 토큰 단위로 전송합니다.
+    """
+    return StreamingResponse(
+        stream_chat_events(request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 def generate_response_message(sentiment: str, recommendations: List[Any], user_name: str = "고객") -> str:
@@ -130,6 +416,73 @@ def generate_response_message(sentiment: str, recommendations: List[Any], user_n
         return f"{greeting} 아쉽지만 지금은 딱 맞는 상품을 찾지 못했어요. 다른 키워드로 다시 물어봐주시겠어요?"
 
 
+@router.get("/catalog")
+async def get_product_catalog(request: Request):
+    """
+    서버 카탈로그 조회
+
+    ETag로 카탈로그 버전을 내려주며, If-None-Match가 일치하면 304를 반환합니다.
+    응답 본문은 스냅샷 빌드 시 저장한 파일(mmap)을 그대로 내려주므로 요청마다 직렬화하지 않습니다.
+    """
+    catalog = get_catalog()
+    etag = f'"{catalog.version}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return StreamingResponse(
+        catalog.iter_body(),
+        media_type="application/json",
+        headers={"ETag": etag, "Content-Length": str(len(catalog.body))}
+    )
+
+
+@router.get("/catalog/version")
+async def get_catalog_version():
+    """서버 카탈로그 버전과 상품 수만 조회"""
+    catalog = get_catalog()
+    return {"version": catalog.version, "count": len(catalog)}
+
+
+@router.get("/products/{product_id}/also-bought")
+async def get_also_bought(product_id: int, limit: int = Query(10, ge=1, le=50)):
+    """
+    이 상품을 구매한 고객이 함께 구매한 상품 (구매 연관 모델 기준)
+
+    카탈로그에 있는 상품만 유사도 순으로 반환합니다.
+    """
+    model = get_affinity_model()
+    if model is None:
+        raise HTTPException(status_code=503, detail="구매 연관 모델이 없습니다")
+    catalog = get_catalog()
+    if catalog.get(product_id) is None:
+        raise HTTPException(status_code=404, detail="상품을 찾을 수 없습니다")
+    products = []
+    for related_id, score in model.also_bought(product_id, limit=limit * 2):
+        product = catalog.get(related_id)
+        if product is not None:
+            products.append({**product, "score": score})
+        if len(products) >= limit:
+            break
+    return {"product_id": product_id, "built_at": model.meta.get("built_at"), "products": products}
+
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """LLM 응답 캐시 적중률 통계"""
+    return response_cache.stats()
+
+
+@router.get("/chat-log/stats")
+async def get_chat_log_stats():
+    """대화 내역 저장 큐 상태 (대기/저장/버린 행 수)"""
+    return chat_log.stats()
+
+
+@router.get("/providers/stats")
+async def get_provider_stats():
+    """LLM 제공자별 지연 시간(EWMA, p90)/오류율 통계 (라우팅/헤지 기준)"""
+    return llm_router.snapshot()
+
+
 @router.get("/health")
 async def health_check():
     """챗봇 API 상태 확인"""
@@ -1,39 +1,150 @@
 """
 사용자 관련 API 엔드포인트
 """
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import Dict, Any
-from app.database import get_db
-from app.services.purchase_insights import get_purchase_summary
+import os
+import json
+import logging
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Any, List, AsyncIterator, Optional
+from app.database import get_async_db, AsyncSessionLocal
+from app.services.cohort_insights import cohort_insights
+from app.services.insight_snapshots import (
+    INSIGHTS_MAX_PERIOD_DAYS,
+    INSIGHTS_MIN_PERIOD_DAYS,
+    get_purchase_summary_snapshot,
+)
+from app.services.purchase_insights import iter_purchase_summaries
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# 일괄 조회 요청 한 번에 받을 수 있는 최대 사용자 수
+PURCHASE_SUMMARY_BATCH_MAX_USERS = int(os.getenv("PURCHASE_SUMMARY_BATCH_MAX_USERS", "100000"))
+
+
+class PurchaseSummaryBatchRequest(BaseModel):
+    """구매 요약 일괄 조회 요청"""
+    user_ids: List[int]
+    period_days: int = Field(30, ge=INSIGHTS_MIN_PERIOD_DAYS, le=INSIGHTS_MAX_PERIOD_DAYS)
 
 
 @router.get("/{user_id}/purchase-summary")
 async def get_user_purchase_summary(
     user_id: int,
-    period_days: int = 30,
-    db: Session = Depends(get_db)
+    period_days: int = Query(30, ge=INSIGHTS_MIN_PERIOD_DAYS, le=INSIGHTS_MAX_PERIOD_DAYS),
+    db: AsyncSession = Depends(get_async_db)
 ) -> Dict[str, Any]:
     """
     사용자의 구매 요약 정보 조회
     
+    미리 계산된 스냅샷을 반환합니다 (캐시 또는 기본 키 조회 한 번).
+    
     Args:
         user_id: 사용자 ID
-        period_days: 분석 기간 (일, 기본값: 30)
-        db: 데이터베이스 세션
+        period_days: 분석 기간 (일, 기본값: 30, 1~INSIGHTS_MAX_PERIOD_DAYS)
+        db: 비동기 데이터베이스 세션
     
     Returns:
         구매 요약 정보
     """
     try:
-        summary = get_purchase_summary(db, user_id, period_days)
+        summary = await get_purchase_summary_snapshot(db, user_id, period_days)
         
         if summary is None:
             raise HTTPException(status_code=404, detail="User not found")
         
         return summary
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching purchase summary: {str(e)}")
 
+
+async def stream_purchase_summaries(user_ids: List[int], period_days: int) -> AsyncIterator[str]:
+    """구매 요약을 사용자당 한 줄의 JSON(NDJSON)으로 생성"""
+    # 응답 스트리밍 중에도 유지되도록 요청 의존성 대신 세션을 직접 엽니다
+    async with AsyncSessionLocal() as db:
+        try:
+            async for user_id, summary in iter_purchase_summaries(db, user_ids, period_days):
+                if summary is None:
+                    line = {"user_id": user_id, "error": "User not found"}
+                else:
+                    line = summary
+                yield json.dumps(line, ensure_ascii=False) + "\n"
+        except Exception as e:
+            logger.exception("❌ 구매 요약 일괄 조회 오류: %s", e)
+            yield json.dumps({"error": f"Error fetching purchase summaries: {str(e)}"}, ensure_ascii=False) + "\n"
+
+
+@router.post("/purchase-summaries")
+async def get_user_purchase_summaries(request: PurchaseSummaryBatchRequest):
+    """
+    여러 사용자의 구매 요약 정보 일괄 조회 (CRM/푸시 배치용)
+    
+    사용자 묶음마다 집계 쿼리 한 번으로 계산하고, 계산되는 대로 NDJSON으로 스트리밍합니다.
+    없는 사용자는 {"user_id": ..., "error": "User not found"} 줄로 표시됩니다.
+    
+    Args:
+        request: 사용자 ID 목록과 분석 기간
+    
+    Returns:
+        사용자당 한 줄의 구매 요약 (application/x-ndjson)
+    """
+    if len(request.user_ids) > PURCHASE_SUMMARY_BATCH_MAX_USERS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many user_ids (max {PURCHASE_SUMMARY_BATCH_MAX_USERS})"
+        )
+    return StreamingResponse(
+        stream_purchase_summaries(request.user_ids, request.period_days),
+        media_type="application/x-ndjson"
+    )
+
+
+@router.get("/cohorts")
+async def get_cohort_insights() -> Dict[str, Any]:
+    """
+    세그먼트(성별/연령대/직업/결혼 여부)별 구매 인사이트 목록
+
+    주기적으로 미리 계산된 결과를 반환합니다. 세그먼트 값이 없는 필드는 전체를 의미합니다.
+
+    Returns:
+        계산 시각, 분석 기간, 세그먼트별 인사이트
+    """
+    if cohort_insights.computed_at is None:
+        raise HTTPException(status_code=503, detail="Cohort insights not computed yet")
+    return {
+        **cohort_insights.stats(),
+        "cohorts": [insight.to_dict() for insight in cohort_insights.insights.values()],
+    }
+
+
+@router.get("/cohorts/insight")
+async def get_cohort_insight(
+    gender: Optional[str] = Query(None),
+    age_group: Optional[str] = Query(None),
+    occupation: Optional[str] = Query(None),
+    marital_status: Optional[str] = Query(None)
+) -> Dict[str, Any]:
+    """
+    프로필에 해당하는 세그먼트 인사이트 조회
+
+    구매자가 적은 세그먼트는 상위 세그먼트(성별+연령대+직업 → 성별+연령대 → 성별 → 전체)로 대체되며,
+    실제 사용된 세그먼트는 응답의 segment에 표시됩니다.
+    """
+    insight = cohort_insights.lookup({
+        "gender": gender,
+        "ageGroup": age_group,
+        "occupation": occupation,
+        "maritalStatus": marital_status,
+    })
+    if insight is None:
+        raise HTTPException(status_code=503, detail="Cohort insights not computed yet")
+    return {
+        "computed_at": cohort_insights.computed_at.isoformat(),
+        "period_days": cohort_insights.period_days,
+        **insight.to_dict(),
+    }
@@ -0,0 +1,285 @@
+"""
+구매이력 기반 상품 연관 모델 (함께 구매한 상품 / 카테고리 연관도)
+
+purchase_history로 오프라인에서 만든 희소 행렬을 .npy 파일로 저장하고,
+서버는 시작 시 mmap으로 열어 프로세스(워커) 간에 페이지를 공유합니다.
+
+행렬 한 행 = 상품 하나, 열 = [상품 n개 | 카테고리 m개]
+- 상품 열: 함께 구매한 상품 유사도 (구매자 집합 코사인 + 수축, 상품별 상위 AFFINITY_NEIGHBORS개만 저장)
+- 카테고리 열: 이 상품의 카테고리를 산 사용자가 각 카테고리를 함께 산 비율 P(B | A)
+
+사용자 점수는 구매이력 벡터(시간/수량 가중치)와 이 행렬의 희소 벡터 곱 한 번으로
+카탈로그 전체의 상품 점수와 카테고리 점수를 함께 계산합니다.
+
+빌드:
+    python3 backend/database/build_affinity.py
+"""
+import os
+import json
+import shutil
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from scipy import sparse
+from app.services.purchase_insights import history_arrays, purchase_weights
+
+AFFINITY_ENABLED = os.getenv("AFFINITY_ENABLED", "1") == "1"
+AFFINITY_MODEL_DIR = os.getenv(
+    "AFFINITY_MODEL_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "affinity")
+)
+# 상품별로 저장할 함께 구매한 상품 수
+AFFINITY_NEIGHBORS = int(os.getenv("AFFINITY_NEIGHBORS", "50"))
+# 함께 구매한 사용자 수가 적은 쌍의 유사도를 줄이는 수축 계수 (c / (c + shrinkage))
+AFFINITY_SHRINKAGE = float(os.getenv("AFFINITY_SHRINKAGE", "5"))
+
+ARRAY_FILES = ("product_ids", "item_categories", "data", "indices", "indptr")
+
+logger = logging.getLogger(__name__)
+
+
+def _positions(sorted_ids: np.ndarray, ids: np.ndarray) -> np.ndarray:
+    """정렬된 ID 배열에서 각 ID의 위치 (없으면 -1)"""
+    if len(sorted_ids) == 0:
+        return np.full(len(ids), -1, dtype=np.int64)
+    pos = np.minimum(np.searchsorted(sorted_ids, ids), len(sorted_ids) - 1)
+    return np.where(sorted_ids[pos] == ids, pos, -1)
+
+
+class AffinityModel:
+    """함께 구매한 상품 / 카테고리 연관도 희소 행렬 (읽기 전용)"""
+
+    def __init__(
+        self,
+        product_ids: np.ndarray,
+        item_categories: np.ndarray,
+        categories: List[str],
+        matrix: sparse.csr_matrix,
+        meta: Optional[Dict[str, Any]] = None
+    ):
+        self.product_ids = product_ids  # 정렬된 상품 ID (행/상품 열 순서)
+        self.item_categories = item_categories  # 상품별 카테고리 번호
+        self.categories = categories
+        self.matrix = matrix
+        self.meta = meta or {}
+
+    @property
+    def n_items(self) -> int:
+        return len(self.product_ids)
+
+    # ============ 빌드 ============
+
+    @classmethod
+    def build(
+        cls,
+        product_categories: Dict[int, str],
+        purchases: Iterable[Tuple[int, int]],
+        neighbors: int = AFFINITY_NEIGHBORS,
+        shrinkage: float = AFFINITY_SHRINKAGE
+    ) -> "AffinityModel":
+        """
+        Args:
+            product_categories: 상품 ID → 카테고리 (products 테이블 전체)
+            purchases: (user_id, product_id) 구매 목록 (중복 허용)
+        """
+        product_ids = np.array(sorted(product_categories), dtype=np.int64)
+        categories = sorted({category or "기타" for category in product_categories.values()})
+        category_pos = {category: code for code, category in enumerate(categories)}
+        item_categories = np.array(
+            [category_pos[product_categories[pid] or "기타"] for pid in product_ids.tolist()], dtype=np.int32
+        )
+        n_items, n_categories = len(product_ids), len(categories)
+
+        user_ids, item_ids = [], []
+        for user_id, product_id in purchases:
+            user_ids.append(user_id)
+            item_ids.append(product_id)
+        items = _positions(product_ids, np.array(item_ids, dtype=np.int64))
+        known = items >= 0
+        _, users = np.unique(np.array(user_ids, dtype=np.int64)[known], return_inverse=True)
+        items = items[known]
+        n_users = int(users.max()) + 1 if len(users) else 0
+
+        # 사용자 × 상품 구매 여부 (반복 구매는 1로)
+        bought = sparse.csr_matrix(
+            (np.ones(len(items), dtype=np.float32), (users, items)), shape=(n_users, n_items)
+        )
+        bought.sum_duplicates()
+        bought.data[:] = 1.0
+
+        item_similarity = cls._item_similarity(bought, neighbors, shrinkage)
+        category_affinity = cls._category_affinity(bought, item_categories, n_categories)
+        # 상품 행마다 자기 카테고리 행의 연관도를 붙임
+        item_category_rows = sparse.csr_matrix(category_affinity[item_categories])
+        matrix = sparse.hstack([item_similarity, item_category_rows], format="csr", dtype=np.float32)
+        matrix.sort_indices()
+
+        meta = {
+            "built_at": datetime.now().isoformat(timespec="seconds"),
+            "users": n_users,
+            "purchases": int(len(items)),
+            "neighbors": neighbors,
+            "shrinkage": shrinkage,
+        }
+        return cls(product_ids, item_categories, categories, matrix, meta)
+
+    @staticmethod
+    def _item_similarity(bought: sparse.csr_matrix, neighbors: int, shrinkage: float) -> sparse.csr_matrix:
+        """구매자 집합 코사인 유사도 × c / (c + shrinkage), 상품별 상위 neighbors개"""
+        n_items = bought.shape[1]
+        co_counts = (bought.T @ bought).tocsr()
+        buyers = co_counts.diagonal().astype(np.float64)
+        co_counts.setdiag(0)
+        co_counts.eliminate_zeros()
+
+        coo = co_counts.tocoo()
+        counts = coo.data.astype(np.float64)
+        similarity = counts / np.sqrt(buyers[coo.row] * buyers[coo.col]) * (counts / (counts + shrinkage))
+
+        # 행별 상위 neighbors개 (행 → 유사도 내림차순 정렬 후 순위로 자름)
+        order = np.lexsort((-similarity, coo.row))
+        rows, cols, values = coo.row[order], coo.col[order], similarity[order]
+        row_starts = np.searchsorted(rows, np.arange(n_items))
+        rank = np.arange(len(rows)) - row_starts[rows]
+        keep = rank < neighbors
+        return sparse.csr_matrix(
+            (values[keep].astype(np.float32), (rows[keep], cols[keep])), shape=(n_items, n_items)
+        )
+
+    @staticmethod
+    def _category_affinity(bought: sparse.csr_matrix, item_categories: np.ndarray, n_categories: int) -> np.ndarray:
+        """P(카테고리 B 구매 | 카테고리 A 구매) 행렬 (카테고리 × 카테고리, 대각선 1)"""
+        n_items = bought.shape[1]
+        item_to_category = sparse.csr_matrix(
+            (np.ones(n_items, dtype=np.float32), (np.arange(n_items), item_categories)),
+            shape=(n_items, n_categories)
+        )
+        user_categories = (bought @ item_to_category).tocsr()
+        user_categories.data[:] = 1.0
+        co_counts = (user_categories.T @ user_categories).toarray()
+        buyers = np.diag(co_counts).copy()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            affinity = np.where(buyers[:, None] > 0, co_counts / buyers[:, None], 0.0)
+        np.fill_diagonal(affinity, 1.0)
+        return affinity.astype(np.float32)
+
+    # ============ 저장 / 로드 ============
+
+    def save(self, path: str) -> None:
+        """디렉터리에 저장 (임시 디렉터리에 쓴 뒤 교체하므로 실행 중인 서버의 mmap은 그대로 유지)"""
+        path = os.path.abspath(path)
+        staging = f"{path}.tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        # scipy는 indices / indptr가 같은 정수형이어야 복사 없이 사용하므로 둘을 맞춰 저장
+        index_dtype = np.int32 if self.matrix.nnz < np.iinfo(np.int32).max else np.int64
+        arrays = {
+            "product_ids": self.product_ids,
+            "item_categories": self.item_categories,
+            "data": self.matrix.data.astype(np.float32),
+            "indices": self.matrix.indices.astype(index_dtype),
+            "indptr": self.matrix.indptr.astype(index_dtype),
+        }
+        for name, array in arrays.items():
+            np.save(os.path.join(staging, f"{name}.npy"), np.ascontiguousarray(array))
+        with open(os.path.join(staging, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({**self.meta, "categories": self.categories, "shape": list(self.matrix.shape)}, f, ensure_ascii=False)
+
+        previous = f"{path}.old"
+        shutil.rmtree(previous, ignore_errors=True)
+        if os.path.exists(path):
+            os.replace(path, previous)
+        os.replace(staging, path)
+        shutil.rmtree(previous, ignore_errors=True)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "AffinityModel":
+        """저장된 모델 로드 (mmap=True면 배열을 복사하지 않고 파일을 메모리 매핑)"""
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        mode = "r" if mmap else None
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode) for name in ARRAY_FILES}
+        matrix = sparse.csr_matrix(
+            (arrays["data"], arrays["indices"], arrays["indptr"]), shape=tuple(meta.pop("shape")), copy=False
+        )
+        categories = meta.pop("categories")
+        return cls(arrays["product_ids"], arrays["item_categories"], categories, matrix, meta)
+
+    # ============ 조회 ============
+
+    def positions(self, product_ids: Iterable[int]) -> np.ndarray:
+        """상품 ID → 모델 행 번호 (모델에 없는 상품은 -1)"""
+        return _positions(self.product_ids, np.fromiter(product_ids, dtype=np.int64))
+
+    def also_bought(self, product_id: int, limit: int = 10) -> List[Tuple[int, float]]:
+        """이 상품을 산 사용자가 함께 산 상품 (상품 ID, 유사도) 목록"""
+        pos = int(self.positions([product_id])[0])
+        if pos < 0:
+            return []
+        start, end = self.matrix.indptr[pos], self.matrix.indptr[pos + 1]
+        columns = np.asarray(self.matrix.indices[start:end])
+        values = np.asarray(self.matrix.data[start:end])
+        item_columns = columns < self.n_items
+        columns, values = columns[item_columns], values[item_columns]
+        top = np.argsort(-values, kind="stable")[:limit]
+        return [(int(self.product_ids[columns[i]]), round(float(values[i]), 4)) for i in top]
+
+    def user_vector(self, purchase_history: List[Dict[str, Any]]) -> sparse.csr_matrix:
+        """구매이력 → 1 × 상품 수 희소 벡터 (시간 가중치 × 수량 가중치 합)"""
+        product_ids, days_ago, quantities = history_arrays(purchase_history)
+        positions = self.positions(product_ids)
+        known = positions >= 0
+        weights = purchase_weights(days_ago[known], quantities[known])
+        return sparse.csr_matrix(
+            (weights.astype(np.float32), (np.zeros(int(known.sum()), dtype=np.int64), positions[known])),
+            shape=(1, self.n_items)
+        )
+
+    def score(self, purchase_history: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        사용자 구매이력으로 모델 전체 상품을 점수화 (희소 벡터 곱 한 번)
+
+        Returns:
+            (모델 상품 순서의 함께 구매 점수, 카테고리 점수) - 각각 최댓값 1로 정규화
+        """
+        scores = np.asarray((self.user_vector(purchase_history) @ self.matrix).todense()).ravel()
+        item_scores, category_scores = scores[:self.n_items], scores[self.n_items:]
+        for values in (item_scores, category_scores):
+            peak = values.max() if len(values) else 0.0
+            if peak > 0:
+                values /= peak
+        return item_scores, category_scores
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "items": self.n_items,
+            "categories": len(self.categories),
+            "nnz": int(self.matrix.nnz),
+            **self.meta,
+        }
+
+
+# ============ 전역 모델 ============
+
+_model: Optional[AffinityModel] = None
+
+
+def load_affinity_model(path: str = AFFINITY_MODEL_DIR) -> Optional[AffinityModel]:
+    """서버 시작 시 모델 로드 (없거나 비활성화되어 있으면 None, 구매이력 연관 점수 없이 동작)"""
+    global _model
+    if not AFFINITY_ENABLED or not os.path.exists(os.path.join(path, "meta.json")):
+        _model = None
+        return None
+    try:
+        _model = AffinityModel.load(path)
+        logger.info("🛒 구매 연관 모델 로드: 상품 %d개, nnz %d", _model.n_items, _model.matrix.nnz)
+    except Exception as e:
+        logger.warning("⚠️  구매 연관 모델 로드 실패: %s", e)
+        _model = None
+    return _model
+
+
+def get_affinity_model() -> Optional[AffinityModel]:
+    return _model
+
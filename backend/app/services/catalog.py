@@ -0,0 +1,219 @@
+"""
+서버 측 상품 카탈로그
+
+앱 시작 시 카탈로그 스냅샷(catalog_snapshot)을 mmap으로 열고,
+스냅샷이 없으면 products 테이블을 한 번 읽어 메모리에 보관합니다.
+챗봇 요청은 전체 상품 목록 대신 상품 ID 또는 카탈로그 버전만 보내면 됩니다.
+"""
+import hashlib
+import json
+import mmap
+from decimal import Decimal
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Sequence, Union
+from sqlalchemy.orm import Session
+from app.models import Product
+from app.services.catalog_snapshot import CatalogSnapshot
+from app.services.product_index import ProductIndex
+from app.services.retrieval import ProductRetriever
+from app.services.local_ranker import LocalRanker
+
+
+def _to_number(value: Any) -> Any:
+    """Numeric 컬럼 값을 JSON 직렬화 가능한 숫자로 변환"""
+    if value is None:
+        return None
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    return value
+
+
+def product_to_dict(product: Product) -> Dict[str, Any]:
+    """
+    ORM 상품 객체를 프론트엔드 Product 타입과 같은 형태의 딕셔너리로 변환
+
+    (frontend/app/types/product.ts 참고)
+    """
+    return {
+        "id": product.product_id,
+        "name": product.name,
+        "category": product.category or "",
+        "subCategory": product.sub_category,
+        "price": _to_number(product.price),
+        "originalPrice": _to_number(product.original_price),
+        "description": product.description or "",
+        "targetAge": list(product.target_age_groups or []),
+        "targetGender": product.target_gender or "all",
+        "usedIn": list(product.used_in or []),
+        "reviews": product.review_count or 0,
+        "rating": float(product.rating or 0),
+        "image": product.image_url,
+        "tags": list(product.tags or []),
+        "stock": product.stock or 0,
+        "badge": product.badge,
+        "isKurlyOnly": bool(product.is_kurly_only),
+    }
+
+
+def compute_catalog_version(products: Iterable[Dict[str, Any]]) -> str:
+    """상품 목록 내용으로부터 카탈로그 버전(ETag) 계산"""
+    digest = hashlib.sha1()
+    for product in products:
+        digest.update(json.dumps(product, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+class ProductCatalog:
+    """
+    버전이 붙은 읽기 전용 상품 카탈로그
+
+    products는 상품 딕셔너리 list이거나 CatalogSnapshot(mmap, 조회 시 딕셔너리 생성)입니다.
+    """
+
+    def __init__(self, products: Sequence[Dict[str, Any]], version: Optional[str] = None):
+        self.products = products
+        if isinstance(products, CatalogSnapshot):
+            version = version or products.version
+        self.version = version or compute_catalog_version(products)
+        self._index: Optional[ProductIndex] = None
+        self._retriever: Optional[ProductRetriever] = None
+        self._ranker: Optional[LocalRanker] = None
+        self._body: Optional[bytes] = None
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def _snapshot_arrays(self, name: str) -> Optional[Dict[str, Any]]:
+        """스냅샷에 저장된 파생 색인 배열 (없으면 None → 워커에서 생성)"""
+        if isinstance(self.products, CatalogSnapshot):
+            return self.products.derived.get(name)
+        return None
+
+    @property
+    def index(self) -> ProductIndex:
+        """카탈로그 역색인 (최초 접근 시 한 번만 생성, 스냅샷이면 저장된 배열 사용)"""
+        if self._index is None:
+            self._index = ProductIndex(self.products, self._snapshot_arrays("index"))
+        return self._index
+
+    @property
+    def retriever(self) -> ProductRetriever:
+        """카탈로그 벡터 색인 (최초 접근 시 한 번만 생성, 스냅샷이면 저장된 행렬 사용)"""
+        if self._retriever is None:
+            self._retriever = ProductRetriever(self.products, self._snapshot_arrays("retriever"))
+        return self._retriever
+
+    @property
+    def ranker(self) -> LocalRanker:
+        """카탈로그 로컬 추천 엔진 (최초 접근 시 한 번만 생성, 스냅샷이면 저장된 배열 사용)"""
+        if self._ranker is None:
+            self._ranker = LocalRanker(self.index, self.retriever, self._snapshot_arrays("ranker"))
+        return self._ranker
+
+    def derived_arrays(self) -> Dict[str, Dict[str, Any]]:
+        """스냅샷에 저장할 파생 색인 배열 (스냅샷 빌드 시 사용)"""
+        derived = {"index": self.index.arrays, "ranker": self.ranker.arrays}
+        retriever_arrays = self.retriever.to_arrays()
+        if retriever_arrays is not None:
+            derived["retriever"] = retriever_arrays
+        return derived
+
+    @property
+    def body(self) -> Union[bytes, mmap.mmap]:
+        """
+        GET /catalog 응답 본문
+
+        스냅샷이면 빌드 시 저장한 본문을 mmap으로 공유하고,
+        DB에서 읽은 카탈로그(또는 예전 스냅샷)면 처음 요청할 때 한 번만 직렬화합니다.
+        """
+        if isinstance(self.products, CatalogSnapshot) and self.products.body is not None:
+            return self.products.body
+        if self._body is None:
+            payload = {"version": self.version, "count": len(self), "products": list(self.products)}
+            self._body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        return self._body
+
+    def iter_body(self, chunk_size: int = 1 << 20) -> Iterator[bytes]:
+        """응답 본문을 chunk_size 바이트씩 반환 (mmap 본문을 통째로 복사하지 않음)"""
+        body = self.body
+        for start in range(0, len(body), chunk_size):
+            yield body[start:start + chunk_size]
+
+    def warm_up(self) -> None:
+        """첫 요청 전에 역색인/벡터 색인/로컬 추천 엔진 준비"""
+        self.ranker
+
+    def get(self, product_id: int) -> Optional[Dict[str, Any]]:
+        """상품 ID로 상품 조회"""
+        return self.index.get(product_id)
+
+    def get_many(self, product_ids: Iterable[int]) -> List[Dict[str, Any]]:
+        """상품 ID 목록으로 상품 조회 (존재하지 않는 ID는 무시)"""
+        products = (self.index.get(pid) for pid in product_ids)
+        return [p for p in products if p is not None]
+
+
+# 프로세스 전역 카탈로그
+_catalog = ProductCatalog([])
+
+
+def load_catalog(db: Session) -> ProductCatalog:
+    """products 테이블에서 카탈로그를 읽어 교체합니다"""
+    global _catalog
+    rows = db.query(Product).order_by(Product.product_id).all()
+    _catalog = ProductCatalog([product_to_dict(p) for p in rows])
+    _catalog.warm_up()
+    return _catalog
+
+
+def load_catalog_snapshot(snapshot: CatalogSnapshot) -> ProductCatalog:
+    """
+    mmap으로 연 카탈로그 스냅샷으로 교체합니다 (DB 조회 없음)
+
+    상품 데이터는 워커 간에 공유되고, 역색인/벡터 색인 등 파생 색인만 워커별로 만듭니다.
+    """
+    global _catalog
+    _catalog = ProductCatalog(snapshot)
+    _catalog.warm_up()
+    return _catalog
+
+
+def get_catalog() -> ProductCatalog:
+    """현재 카탈로그 반환"""
+    return _catalog
+
+
+def version_for(products: List[Dict[str, Any]]) -> Optional[str]:
+    """상품 목록이 서버 카탈로그이면 카탈로그 버전, 아니면 None"""
+    if products is _catalog.products:
+        return _catalog.version
+    return None
+
+
+def index_for(products: List[Dict[str, Any]]) -> ProductIndex:
+    """
+    상품 목록에 대한 역색인 반환
+
+    서버 카탈로그면 미리 만든 색인을 재사용하고,
+    요청으로 전달된 상품 목록(레거시)이면 새로 생성합니다.
+    """
+    if products is _catalog.products:
+        return _catalog.index
+    return ProductIndex(products)
+
+
+def retriever_for(products: List[Dict[str, Any]]) -> Optional[ProductRetriever]:
+    """
+    상품 목록에 대한 벡터 색인 반환
+
+    요청마다 색인을 학습하지 않도록 서버 카탈로그일 때만 반환합니다.
+    """
+    if products is _catalog.products:
+        return _catalog.retriever
+    return None
+
+
+def ranker_for(products: List[Dict[str, Any]]) -> LocalRanker:
+    """상품 목록에 대한 로컬 추천 엔진 반환 (레거시 목록은 벡터 유사도 없이 생성)"""
+    if products is _catalog.products:
+        return _catalog.ranker
+    return LocalRanker(index_for(products))
@@ -0,0 +1,324 @@
+"""
+메모리 매핑 상품 카탈로그 스냅샷
+
+products 테이블을 열(column) 단위 .npy 파일로 저장해 두고, 모든 워커가 읽기 전용 mmap으로 엽니다.
+상품 데이터는 OS 페이지 캐시에 한 번만 올라가 워커 간에 공유되므로,
+카탈로그가 커지거나 워커 수가 늘어도 워커별 메모리는 거의 늘지 않고 시작 시 DB 조회도 필요 없습니다.
+
+- 숫자 열: product_ids(정렬됨), price, original_price(없으면 NaN), rating, reviews, stock, is_kurly_only
+- 비트마스크: target_age (meta.json의 연령대 목록, 이름순), target_gender (성별 타겟 값 목록 순서)
+- 문자열: UTF-8 바이트 하나(strings.npy)와 (상품, 필드)별 시작 위치 표(string_offsets.npy)
+  목록 필드(usedIn, tags)는 구분자로 이어 붙이고, None은 null_mask 비트로 구분합니다.
+
+상품 딕셔너리는 조회할 때만 만들어지며, 형태는 catalog.product_to_dict와 같습니다.
+
+빌드 시 파생 색인(역색인, TF-IDF 행렬, 로컬 추천 배열)을 {이름}.{배열}.npy로,
+GET /catalog 응답 본문을 catalog.json으로 함께 저장하므로 워커는 이것도 mmap으로 공유합니다.
+
+빌드:
+    python3 backend/database/build_catalog_snapshot.py
+"""
+import os
+import json
+import shutil
+import logging
+from collections.abc import Sequence
+from datetime import datetime
+from mmap import mmap as MemoryMap, ACCESS_READ
+from typing import Any, Dict, Iterable, List, Optional, Union
+import numpy as np
+
+CATALOG_SNAPSHOT_ENABLED = os.getenv("CATALOG_SNAPSHOT_ENABLED", "1") == "1"
+CATALOG_SNAPSHOT_PATH = os.getenv(
+    "CATALOG_SNAPSHOT_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "catalog_snapshot")
+)
+
+# 문자열 필드 (string_offsets 열 순서, null_mask 비트 순서)
+STRING_FIELDS = ("name", "category", "subCategory", "description", "image", "badge", "usedIn", "tags")
+LIST_FIELDS = frozenset(("usedIn", "tags"))
+LIST_SEPARATOR = "\x1f"
+
+BODY_FILE = "catalog.json"
+
+ARRAY_FILES = (
+    "product_ids", "price", "original_price", "rating", "reviews", "stock", "is_kurly_only",
+    "target_age", "target_gender", "null_mask", "string_offsets", "strings",
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _bit(vocabulary: List[str], value: str) -> int:
+    if value not in vocabulary:
+        if len(vocabulary) >= 32:
+            raise ValueError(f"비트마스크 값이 32개를 넘습니다: {value}")
+        vocabulary.append(value)
+    return 1 << vocabulary.index(value)
+
+
+def _number(value: float) -> Union[int, float]:
+    """product_to_dict와 같이 정수 값은 int로 반환"""
+    return int(value) if value.is_integer() else value
+
+
+def write_snapshot(products: Iterable[Dict[str, Any]], path: str) -> Dict[str, Any]:
+    """
+    상품 딕셔너리 목록(product_to_dict 형태, 상품 ID 순)을 스냅샷 디렉터리로 저장
+
+    임시 디렉터리에 쓴 뒤 교체하므로 이미 열려 있는 서버의 mmap은 그대로 유지됩니다.
+
+    Returns:
+        스냅샷 meta (version, count 등)
+    """
+    columns: Dict[str, List[Any]] = {name: [] for name in ARRAY_FILES if name not in ("string_offsets", "strings")}
+    age_vocabulary: List[str] = []
+    gender_vocabulary: List[str] = []
+    blob = bytearray()
+    offsets: List[int] = []
+
+    for product in products:
+        columns["product_ids"].append(product["id"])
+        columns["price"].append(float(product["price"]))
+        original_price = product.get("originalPrice")
+        columns["original_price"].append(np.nan if original_price is None else float(original_price))
+        columns["rating"].append(float(product.get("rating") or 0))
+        columns["reviews"].append(product.get("reviews") or 0)
+        columns["stock"].append(product.get("stock") or 0)
+        columns["is_kurly_only"].append(bool(product.get("isKurlyOnly")))
+
+        age_mask = 0
+        for age in sorted(set(product.get("targetAge") or [])):
+            age_mask |= _bit(age_vocabulary, age)
+        columns["target_age"].append(age_mask)
+        columns["target_gender"].append(_bit(gender_vocabulary, product.get("targetGender") or "all"))
+
+        null_mask = 0
+        for field_no, field in enumerate(STRING_FIELDS):
+            value = product.get(field)
+            offsets.append(len(blob))
+            if value is None:
+                null_mask |= 1 << field_no
+                continue
+            if field in LIST_FIELDS:
+                value = LIST_SEPARATOR.join(value)
+            blob.extend(value.encode("utf-8"))
+        columns["null_mask"].append(null_mask)
+    offsets.append(len(blob))
+
+    product_ids = np.array(columns["product_ids"], dtype=np.int64)
+    if len(product_ids) > 1 and not (np.diff(product_ids) > 0).all():
+        raise ValueError("상품은 ID 순으로 중복 없이 전달해야 합니다")
+    # 연령대 비트를 이름순으로 다시 매겨 targetAge가 항상 정렬된 순서로 나오도록 함
+    age_masks = np.array(columns["target_age"], dtype=np.uint32)
+    target_age = np.zeros_like(age_masks)
+    for new_bit, age in enumerate(sorted(age_vocabulary)):
+        old_bit = age_vocabulary.index(age)
+        target_age |= ((age_masks >> np.uint32(old_bit)) & np.uint32(1)) << np.uint32(new_bit)
+    age_vocabulary = sorted(age_vocabulary)
+    arrays = {
+        "product_ids": product_ids,
+        "price": np.array(columns["price"], dtype=np.float64),
+        "original_price": np.array(columns["original_price"], dtype=np.float64),
+        "rating": np.array(columns["rating"], dtype=np.float64),
+        "reviews": np.array(columns["reviews"], dtype=np.int64),
+        "stock": np.array(columns["stock"], dtype=np.int64),
+        "is_kurly_only": np.array(columns["is_kurly_only"], dtype=bool),
+        "target_age": target_age,
+        "target_gender": np.array(columns["target_gender"], dtype=np.uint32),
+        "null_mask": np.array(columns["null_mask"], dtype=np.uint8),
+        "string_offsets": np.array(offsets, dtype=np.int64),
+        "strings": np.frombuffer(bytes(blob), dtype=np.uint8),
+    }
+
+    path = os.path.abspath(path)
+    staging = f"{path}.tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    for name, array in arrays.items():
+        np.save(os.path.join(staging, f"{name}.npy"), array)
+    meta = {
+        "built_at": datetime.now().isoformat(timespec="seconds"),
+        "count": len(product_ids),
+        "string_fields": list(STRING_FIELDS),
+        "age_groups": age_vocabulary,
+        "target_genders": gender_vocabulary,
+    }
+    _write_meta(staging, meta)
+    # 카탈로그 버전은 스냅샷에서 읽어 들인 상품 기준으로 계산 (서버가 내려주는 내용과 일치)
+    from app.services.catalog import ProductCatalog, compute_catalog_version
+    staged = CatalogSnapshot.open(staging, mmap=False)
+    meta["version"] = compute_catalog_version(staged)
+    staged.version = meta["version"]
+    _write_body(staging, meta["version"], staged)
+    meta["derived"] = {}
+    for name, derived in ProductCatalog(staged).derived_arrays().items():
+        for array_name, array in derived.items():
+            np.save(os.path.join(staging, f"{name}.{array_name}.npy"), np.ascontiguousarray(array))
+        meta["derived"][name] = list(derived)
+    _write_meta(staging, meta)
+
+    previous = f"{path}.old"
+    shutil.rmtree(previous, ignore_errors=True)
+    if os.path.exists(path):
+        os.replace(path, previous)
+    os.replace(staging, path)
+    shutil.rmtree(previous, ignore_errors=True)
+    return meta
+
+
+def _write_meta(path: str, meta: Dict[str, Any]) -> None:
+    with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+
+def _write_body(path: str, version: str, products: Sequence) -> None:
+    """GET /catalog 응답 본문을 상품 하나씩 직렬화해 저장 (JSONResponse와 같은 형식)"""
+    with open(os.path.join(path, BODY_FILE), "w", encoding="utf-8") as f:
+        f.write(f'{{"version":{json.dumps(version)},"count":{len(products)},"products":[')
+        for pos, product in enumerate(products):
+            if pos:
+                f.write(",")
+            f.write(json.dumps(product, ensure_ascii=False, separators=(",", ":")))
+        f.write("]}")
+
+
+class CatalogSnapshot(Sequence):
+    """
+    스냅샷 위의 읽기 전용 상품 목록
+
+    list처럼 인덱스/순회로 상품 딕셔너리를 얻을 수 있고, 딕셔너리는 접근할 때마다 새로 만듭니다.
+    """
+
+    def __init__(
+        self,
+        arrays: Dict[str, np.ndarray],
+        meta: Dict[str, Any],
+        derived: Optional[Dict[str, Dict[str, np.ndarray]]] = None,
+        body: Optional[MemoryMap] = None
+    ):
+        self.meta = meta
+        # 파생 색인 배열 (이름 → 배열들, 예전 스냅샷이면 비어 있음)
+        self.derived = derived or {}
+        # GET /catalog 응답 본문 (mmap, 예전 스냅샷이면 None)
+        self.body = body
+        self.version: Optional[str] = meta.get("version")
+        self.product_ids = arrays["product_ids"]
+        self.price = arrays["price"]
+        self.original_price = arrays["original_price"]
+        self.rating = arrays["rating"]
+        self.reviews = arrays["reviews"]
+        self.stock = arrays["stock"]
+        self.is_kurly_only = arrays["is_kurly_only"]
+        self.target_age = arrays["target_age"]
+        self.target_gender = arrays["target_gender"]
+        self.null_mask = arrays["null_mask"]
+        self.string_offsets = arrays["string_offsets"]
+        self.strings = arrays["strings"]
+        self.age_groups: List[str] = meta["age_groups"]
+        self.target_genders: List[str] = meta["target_genders"]
+        self._n_fields = len(meta["string_fields"])
+
+    @classmethod
+    def open(cls, path: str = CATALOG_SNAPSHOT_PATH, mmap: bool = True) -> "CatalogSnapshot":
+        """스냅샷 열기 (mmap=True면 파일을 복사하지 않고 메모리 매핑)"""
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if tuple(meta["string_fields"]) != STRING_FIELDS:
+            raise ValueError("스냅샷 형식이 다릅니다. 다시 빌드하세요")
+        mode = "r" if mmap else None
+        # np.memmap 인덱싱은 느리므로 같은 매핑을 가리키는 일반 ndarray 뷰로 사용 (복사 없음)
+        arrays = {
+            name: np.asarray(np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode)) for name in ARRAY_FILES
+        }
+        derived = {
+            name: {
+                array_name: np.asarray(np.load(os.path.join(path, f"{name}.{array_name}.npy"), mmap_mode=mode))
+                for array_name in array_names
+            }
+            for name, array_names in meta.get("derived", {}).items()
+        } if mmap else None
+        body = None
+        body_path = os.path.join(path, BODY_FILE)
+        if mmap and os.path.exists(body_path):
+            # 열어 둔 매핑은 스냅샷을 다시 빌드해 파일이 교체되어도 이전 내용을 유지 (버전과 일치)
+            with open(body_path, "rb") as f:
+                body = MemoryMap(f.fileno(), 0, access=ACCESS_READ)
+        return cls(arrays, meta, derived, body)
+
+    def __len__(self) -> int:
+        return len(self.product_ids)
+
+    def __getitem__(self, pos):
+        if isinstance(pos, slice):
+            return [self.product(i) for i in range(*pos.indices(len(self)))]
+        if pos < 0:
+            pos += len(self)
+        if not 0 <= pos < len(self):
+            raise IndexError(pos)
+        return self.product(pos)
+
+    def __iter__(self):
+        for pos in range(len(self)):
+            yield self.product(pos)
+
+    def position(self, product_id: int) -> Optional[int]:
+        """상품 ID → 위치 (이진 탐색, 없으면 None)"""
+        pos = int(np.searchsorted(self.product_ids, product_id))
+        if pos < len(self.product_ids) and self.product_ids[pos] == product_id:
+            return pos
+        return None
+
+    def _strings(self, pos: int) -> Dict[str, Any]:
+        start = pos * self._n_fields
+        bounds = self.string_offsets[start:start + self._n_fields + 1].tolist()
+        raw = bytes(self.strings[bounds[0]:bounds[-1]])
+        base = bounds[0]
+        null_mask = int(self.null_mask[pos])
+        values: Dict[str, Any] = {}
+        for field_no, field in enumerate(STRING_FIELDS):
+            if null_mask >> field_no & 1:
+                values[field] = None
+                continue
+            value = raw[bounds[field_no] - base:bounds[field_no + 1] - base].decode("utf-8")
+            if field in LIST_FIELDS:
+                value = value.split(LIST_SEPARATOR) if value else []
+            values[field] = value
+        return values
+
+    def product(self, pos: int) -> Dict[str, Any]:
+        """위치의 상품 딕셔너리 (product_to_dict와 같은 형태)"""
+        strings = self._strings(pos)
+        original_price = float(self.original_price[pos])
+        age_mask = int(self.target_age[pos])
+        gender_mask = int(self.target_gender[pos])
+        return {
+            "id": int(self.product_ids[pos]),
+            "name": strings["name"],
+            "category": strings["category"],
+            "subCategory": strings["subCategory"],
+            "price": _number(float(self.price[pos])),
+            "originalPrice": None if np.isnan(original_price) else _number(original_price),
+            "description": strings["description"],
+            "targetAge": [age for bit, age in enumerate(self.age_groups) if age_mask >> bit & 1],
+            "targetGender": self.target_genders[gender_mask.bit_length() - 1],
+            "usedIn": strings["usedIn"],
+            "reviews": int(self.reviews[pos]),
+            "rating": float(self.rating[pos]),
+            "image": strings["image"],
+            "tags": strings["tags"],
+            "stock": int(self.stock[pos]),
+            "badge": strings["badge"],
+            "isKurlyOnly": bool(self.is_kurly_only[pos]),
+        }
+
+
+def open_snapshot(path: str = CATALOG_SNAPSHOT_PATH) -> Optional[CatalogSnapshot]:
+    """스냅샷이 있으면 열고, 없거나 비활성화되어 있으면 None"""
+    if not CATALOG_SNAPSHOT_ENABLED or not os.path.exists(os.path.join(path, "meta.json")):
+        return None
+    try:
+        return CatalogSnapshot.open(path)
+    except Exception as e:
+        logger.warning("⚠️  카탈로그 스냅샷 열기 실패: %s", e)
+        return None
@@ -0,0 +1,221 @@
+"""
+대화 내역 저장 (write-behind)
+
+채팅 응답 경로에서는 대화 한 턴(사용자 메시지 + AI 응답)을 메모리 큐에 넣기만 하고,
+백그라운드 작업이 모아서 chat_messages 테이블에 여러 행 INSERT 한 번으로 저장합니다.
+
+- 큐에 CHAT_LOG_BATCH_SIZE 행이 쌓이거나 CHAT_LOG_FLUSH_INTERVAL_MS가 지나면 저장
+- 큐가 CHAT_LOG_QUEUE_MAX 행을 넘으면 새 대화는 버림 (DB가 느려져도 응답 지연에 영향 없음)
+- 저장 실패 시 재시도하고, 그래도 실패하면 버림 (버린 행은 freshmind_chat_log_messages_total로 집계)
+- 서버 종료 시 남은 대화를 모두 저장 (CHAT_LOG_SHUTDOWN_TIMEOUT_SECONDS까지)
+"""
+import os
+import json
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from app.database import AsyncSessionLocal
+from app.models import ChatMessage
+from app.services.observability import CHAT_LOG_MESSAGES
+
+CHAT_LOG_ENABLED = os.getenv("CHAT_LOG_ENABLED", "1") == "1"
+CHAT_LOG_BATCH_SIZE = int(os.getenv("CHAT_LOG_BATCH_SIZE", "500"))
+CHAT_LOG_FLUSH_INTERVAL_MS = float(os.getenv("CHAT_LOG_FLUSH_INTERVAL_MS", "1000"))
+CHAT_LOG_QUEUE_MAX = int(os.getenv("CHAT_LOG_QUEUE_MAX", "20000"))
+CHAT_LOG_MAX_RETRIES = int(os.getenv("CHAT_LOG_MAX_RETRIES", "3"))
+CHAT_LOG_SHUTDOWN_TIMEOUT_SECONDS = float(os.getenv("CHAT_LOG_SHUTDOWN_TIMEOUT_SECONDS", "5"))
+
+# 대화 한 턴 = chat_messages 행 목록 (사용자 메시지, AI 응답)
+Turn = List[Dict[str, Any]]
+
+logger = logging.getLogger(__name__)
+
+
+class ChatLogWriter:
+    """대화 턴을 모아서 저장하는 write-behind 큐"""
+
+    def __init__(
+        self,
+        session_factory=AsyncSessionLocal,
+        batch_size: int = CHAT_LOG_BATCH_SIZE,
+        flush_interval_ms: float = CHAT_LOG_FLUSH_INTERVAL_MS,
+        queue_max: int = CHAT_LOG_QUEUE_MAX
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.queue_max = queue_max
+        self._turns: Deque[Turn] = deque()
+        self._queued_rows = 0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.written = 0
+        self.dropped = 0
+
+    # ============ 응답 경로 ============
+
+    def record(
+        self,
+        user_id: Optional[int],
+        message: str,
+        sentiment: Optional[str],
+        sentiment_score: Optional[float],
+        response_message: str,
+        recommended_product_ids: List[int]
+    ) -> bool:
+        """
+        대화 한 턴을 큐에 추가 (DB 접근 없음, 블로킹 없음)
+
+        Returns:
+            큐에 추가되었으면 True (비활성화, user_id 없음, 큐가 가득 찬 경우 False)
+        """
+        if not CHAT_LOG_ENABLED or user_id is None:
+            return False
+        created_at = datetime.now()
+        turn = [
+            {
+                "user_id": user_id,
+                "sender": "user",
+                "message_text": message,
+                "sentiment": sentiment,
+                "sentiment_score": sentiment_score,
+                "recommended_products": None,
+                "created_at": created_at,
+            },
+            {
+                "user_id": user_id,
+                "sender": "ai",
+                "message_text": response_message,
+                "sentiment": None,
+                "sentiment_score": None,
+                "recommended_products": json.dumps(recommended_product_ids),
+                "created_at": created_at,
+            },
+        ]
+        if self._queued_rows + len(turn) > self.queue_max:
+            self._drop(len(turn), "dropped_queue_full")
+            return False
+        self._turns.append(turn)
+        self._queued_rows += len(turn)
+        if self._queued_rows >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    # ============ 저장 ============
+
+    def _drop(self, rows: int, reason: str) -> None:
+        self.dropped += rows
+        CHAT_LOG_MESSAGES.labels(reason).inc(rows)
+        # 큐가 계속 가득 찬 동안 로그가 넘치지 않도록 처음 한 번과 이후 1000행마다 기록
+        if self.dropped == rows or self.dropped // 1000 != (self.dropped - rows) // 1000:
+            logger.warning("⚠️  대화 내역 %d행 버림 (%s, 누적 %d행)", rows, reason, self.dropped)
+
+    def _take_batch(self) -> List[Turn]:
+        batch: List[Turn] = []
+        rows = 0
+        while self._turns and rows < self.batch_size:
+            turn = self._turns.popleft()
+            batch.append(turn)
+            rows += len(turn)
+        self._queued_rows -= rows
+        return batch
+
+    async def _insert(self, turns: List[Turn]) -> None:
+        """여러 행 INSERT 한 번으로 저장 (턴 안의 행 순서 유지)"""
+        rows = [row for turn in turns for row in turn]
+        async with self.session_factory() as db:
+            await db.execute(insert(ChatMessage).values(rows))
+            await db.commit()
+
+    async def _write(self, turns: List[Turn]) -> None:
+        rows = sum(len(turn) for turn in turns)
+        for attempt in range(CHAT_LOG_MAX_RETRIES + 1):
+            try:
+                await self._insert(turns)
+                self.written += rows
+                CHAT_LOG_MESSAGES.labels("written").inc(rows)
+                return
+            except IntegrityError as e:
+                # 없는 user_id 등: 턴 단위로 나눠 저장하고 실패한 턴만 버림
+                logger.warning("⚠️  대화 내역 일괄 저장 실패, 턴 단위로 재시도: %s", e.orig)
+                await self._write_each(turns)
+                return
+            except Exception as e:
+                if attempt == CHAT_LOG_MAX_RETRIES or self._stopping:
+                    logger.warning("⚠️  대화 내역 저장 실패: %s", e)
+                    self._drop(rows, "dropped_error")
+                    return
+                await asyncio.sleep(0.5 * 2 ** attempt)
+
+    async def _write_each(self, turns: List[Turn]) -> None:
+        for turn in turns:
+            try:
+                await self._insert([turn])
+                self.written += len(turn)
+                CHAT_LOG_MESSAGES.labels("written").inc(len(turn))
+            except Exception:
+                self._drop(len(turn), "dropped_error")
+
+    async def flush(self) -> None:
+        """큐에 있는 대화를 모두 저장"""
+        while self._turns:
+            await self._write(self._take_batch())
+
+    async def run(self) -> None:
+        """백그라운드 저장 루프 (배치 크기 또는 주기마다 저장)"""
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            # 저장하는 동안 들어온 대화도 배치가 차 있으면 바로 이어서 저장
+            while self._turns and not self._stopping:
+                await self._write(self._take_batch())
+                if self._queued_rows < self.batch_size:
+                    break
+
+    def start(self) -> None:
+        """백그라운드 저장 시작 (CHAT_LOG_ENABLED=0이면 사용 안 함)"""
+        if CHAT_LOG_ENABLED and self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """백그라운드 저장 종료 (남은 대화는 CHAT_LOG_SHUTDOWN_TIMEOUT_SECONDS 안에 저장)"""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        try:
+            await asyncio.wait_for(self._task, timeout=CHAT_LOG_SHUTDOWN_TIMEOUT_SECONDS)
+            await asyncio.wait_for(self.flush(), timeout=CHAT_LOG_SHUTDOWN_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            logger.warning("⚠️  대화 내역 저장 종료 시간 초과")
+        finally:
+            self._task.cancel()
+            self._task = None
+        if self._turns:
+            self._drop(self._queued_rows, "dropped_shutdown")
+            self._turns.clear()
+            self._queued_rows = 0
+        logger.info("💾 대화 내역 저장 종료: 저장 %d행, 버림 %d행", self.written, self.dropped)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": CHAT_LOG_ENABLED,
+            "queued": self._queued_rows,
+            "written": self.written,
+            "dropped": self.dropped,
+            "batch_size": self.batch_size,
+            "flush_interval_ms": self.flush_interval * 1000,
+            "queue_max": self.queue_max,
+        }
+
+
+chat_log = ChatLogWriter()
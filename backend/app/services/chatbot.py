@@ -1,55 +1,29 @@
 import os
 import json
-from openai import OpenAI
-import google.generativeai as genai
-from typing import List, Dict, Any, Literal
-from pydantic import BaseModel
-
-# 지원하는 AI 모델 타입
-AIModel = Literal["gpt", "gemini"]
-
-# secret.json 경로 캐싱
-_secret_path = None
-
-def get_secret_path():
-    """secret.json 파일 경로를 반환합니다"""
-    global _secret_path
-    if _secret_path is None:
-        current_file = os.path.abspath(__file__)
-        backend_app_services = os.path.dirname(current_file)
-        backend_app = os.path.dirname(backend_app_services)
-        backend = os.path.dirname(backend_app)
-        project_root = os.path.dirname(backend)
-        _secret_path = os.path.join(project_root, 'secret.json')
-    return _secret_path
-
-
-def load_secrets() -> dict:
-    """secret.json에서 API 키들을 로드합니다"""
-    secret_path = get_secret_path()
-    if not os.path.exists(secret_path):
-        raise FileNotFoundError(f"secret.json not found at {secret_path}")
-    with open(secret_path, 'r') as f:
-        return json.load(f)
-
-
-def get_openai_client():
-    """OpenAI 클라이언트 반환"""
-    secrets = load_secrets()
-    api_key = secrets.get('openai_api_key')
-    if not api_key:
-        raise ValueError("OpenAI API key not found in secret.json")
-    return OpenAI(api_key=api_key)
-
-
-def get_gemini_client():
-    """Gemini 클라이언트 반환"""
-    secrets = load_secrets()
-    api_key = secrets.get('googleai_api_key')
-    if not api_key:
-        raise ValueError("Google AI API key not found in secret.json")
-    genai.configure(api_key=api_key)
-    return genai.GenerativeModel('gemini-2.0-flash')
+import time
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import List, Dict, Any, Literal, Optional, AsyncIterator, Tuple
+import numpy as np
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+from app.services.catalog import index_for, version_for, retriever_for, ranker_for
+from app.services.cohort_insights import CohortInsight, cohort_insights
+from app.services.llm_cache import response_cache, normalize_message, profile_bucket, history_bucket
+from app.services.product_index import ProductIndex
+from app.services.retrieval import RECOMMEND_TOP_K
+from app.services.llm import AIModel, MODEL_LABELS, stream_text
+from app.services.llm_router import routed_json, routed_text
+from app.services.message_classifier import classify
+from app.services.observability import span, SINGLE_SHOT_RESULTS
+
+
+logger = logging.getLogger(__name__)
+
+# 추천 LLM 호출 지연 예산 (ms, 0이면 제한 없음). 초과 시 로컬 추천 결과로 응답
+RECOMMEND_LATENCY_BUDGET_MS = int(os.getenv("RECOMMEND_LATENCY_BUDGET_MS", "0"))
+# 요청에 single_shot이 없을 때 단일 호출 모드 사용 여부
+CHAT_SINGLE_SHOT = os.getenv("CHAT_SINGLE_SHOT", "0") == "1"
 
 
 # ============ 데이터 모델 ============
@@ -76,6 +50,17 @@ class ProductRecommendation(BaseModel):
     relevance_score: float
 
 
+@dataclass
+class ProductCandidates:
+    """LLM에 전달할 추천 후보 (프로필 필터 + 키워드 매칭 + 벡터 검색 결과)"""
+    index: ProductIndex
+    gender: str
+    age_group: str
+    products: List[Dict[str, Any]]  # LLM에 전달할 순서대로 정렬된 후보
+    matched_total: int
+    other_total: int
+
+
 # ============ 키워드 기반 추천 필요 여부 판단 ============
 
 def should_recommend_products(message: str) -> bool:
@@ -101,20 +86,70 @@ def should_recommend_products(message: str) -> bool:
     return False
 
 
+# ============ 로컬 분류기 ============
+
+def local_intent(message: str, force: bool = False) -> Optional[IntentAnalysis]:
+    """
+    로컬 분류기의 의도 판단 (신뢰도가 임계값 미만이면 None)
+    
+    force=True면 신뢰도와 관계없이 분류기 결과를 사용합니다 (로컬 모드).
+    """
+    prediction = classify("intent", message, threshold=0.0 if force else None)
+    if prediction is None:
+        return None
+    return IntentAnalysis(
+        needs_product_recommendation=prediction.label == "product_inquiry",
+        intent_type=prediction.label,
+        reason=f"로컬 분류기 판단 (신뢰도 {prediction.confidence:.2f})"
+    )
+
+
+def local_sentiment(message: str, force: bool = False) -> Optional[SentimentResult]:
+    """로컬 분류기의 감정 판단 (score는 예측 확률, 신뢰도가 임계값 미만이면 None)"""
+    prediction = classify("sentiment", message, threshold=0.0 if force else None)
+    if prediction is None:
+        return None
+    return SentimentResult(
+        sentiment=prediction.label,
+        score=round(prediction.confidence, 2),
+        keywords=message.split()[:3]
+    )
+
+
 # ============ 의도 분석 ============
 
 async def analyze_intent(message: str, model: AIModel = "gpt") -> IntentAnalysis:
     """사용자 메시지의 의도를 분석합니다."""
+    with span("intent", **MODEL_LABELS[model]) as current:
+        # 키워드 기반 강제 판단 (AI보다 우선)
+        if should_recommend_products(message):
+            current.provider, current.model = "local", "keyword"
+            return IntentAnalysis(
+                needs_product_recommendation=True,
+                intent_type="product_inquiry",
+                reason="추천 관련 키워드 감지"
+            )
     
-    # 키워드 기반 강제 판단 (AI보다 우선)
-    if should_recommend_products(message):
-        return IntentAnalysis(
-            needs_product_recommendation=True,
-            intent_type="product_inquiry",
-            reason="추천 관련 키워드 감지"
-        )
+        # 로컬 분류기 (신뢰도가 낮으면 LLM으로, 로컬 모드면 신뢰도와 관계없이 사용)
+        intent = local_intent(message, force=model == "local")
+        if intent is not None:
+            current.provider, current.model = "local", "classifier"
+            return intent
+    
+        if model == "local":
+            return IntentAnalysis(
+                needs_product_recommendation=False,
+                intent_type="casual_chat",
+                reason="로컬 모드 (키워드 미감지)"
+            )
     
-    prompt = f"""
+        normalized = normalize_message(message)
+        cached = await response_cache.get("intent", model, normalized)
+        current.cache = "miss" if cached is None else "hit"
+        if cached is not None:
+            return IntentAnalysis(**cached)
+    
+        prompt = f"""
 다음 사용자 메시지를 분석하여 상품 추천이 필요한지 판단해주세요.
 
 사용자 메시지: "{message}"
@@ -130,50 +165,49 @@ async def analyze_intent(message: str, model: AIModel = "gpt") -> IntentAnalysis
 상품 추천이 필요 없는 경우: 단순 인사, 감사, 일상 대화
 """
     
-    try:
-        if model == "gpt":
-            client = get_openai_client()
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "의도 분석 전문가입니다. JSON으로만 응답하세요."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                response_format={"type": "json_object"}
+        try:
+            result = await routed_json(
+                model, prompt,
+                system="의도 분석 전문가입니다. JSON으로만 응답하세요.",
+                temperature=0.3
             )
-            result = json.loads(response.choices[0].message.content)
-        else:
-            client = get_gemini_client()
-            response = client.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=0.3,
-                    response_mime_type="application/json"
-                )
-            )
-            result = json.loads(response.text)
         
-        return IntentAnalysis(
-            needs_product_recommendation=result['needs_product_recommendation'],
-            intent_type=result['intent_type'],
-            reason=result['reason']
-        )
-    except Exception as e:
-        print(f"의도 분석 오류: {str(e)}")
-        return IntentAnalysis(
-            needs_product_recommendation=False,
-            intent_type="casual_chat",
-            reason="분석 오류"
-        )
+            intent = IntentAnalysis(
+                needs_product_recommendation=result['needs_product_recommendation'],
+                intent_type=result['intent_type'],
+                reason=result['reason']
+            )
+            await response_cache.set("intent", [model, normalized], intent.model_dump())
+            return intent
+        except Exception as e:
+            logger.warning("의도 분석 오류: %s", e)
+            return IntentAnalysis(
+                needs_product_recommendation=False,
+                intent_type="casual_chat",
+                reason="분석 오류"
+            )
 
 
 # ============ 감정 분석 ============
 
 async def analyze_sentiment(message: str, model: AIModel = "gpt") -> SentimentResult:
     """사용자 메시지의 감정을 분석합니다."""
+    with span("sentiment", **MODEL_LABELS[model]) as current:
+        sentiment = local_sentiment(message, force=model == "local")
+        if sentiment is not None:
+            current.provider, current.model = "local", "classifier"
+            return sentiment
     
-    prompt = f"""
+        if model == "local":
+            return SentimentResult(sentiment="neutral", score=0.5, keywords=message.split()[:3])
+    
+        normalized = normalize_message(message)
+        cached = await response_cache.get("sentiment", model, normalized)
+        current.cache = "miss" if cached is None else "hit"
+        if cached is not None:
+            return SentimentResult(**cached)
+    
+        prompt = f"""
 다음 메시지의 감정을 분석하고 키워드를 추출해주세요.
 
 메시지: "{message}"
@@ -186,45 +220,256 @@ async def analyze_sentiment(message: str, model: AIModel = "gpt") -> SentimentRe
 }}
 """
     
-    try:
-        if model == "gpt":
-            client = get_openai_client()
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "감정 분석 전문가입니다. JSON으로만 응답하세요."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                response_format={"type": "json_object"}
+        try:
+            result = await routed_json(
+                model, prompt,
+                system="감정 분석 전문가입니다. JSON으로만 응답하세요.",
+                temperature=0.3
             )
-            result = json.loads(response.choices[0].message.content)
+        
+            sentiment = SentimentResult(
+                sentiment=result['sentiment'],
+                score=result['score'],
+                keywords=result['keywords']
+            )
+            await response_cache.set("sentiment", [model, normalized], sentiment.model_dump())
+            return sentiment
+        except Exception as e:
+            logger.warning("감정 분석 오류: %s", e)
+            return SentimentResult(
+                sentiment="neutral",
+                score=0.5,
+                keywords=message.split()[:3]
+            )
+
+
+# ============ 상품 추천 ============
+
+def prefilter_candidates(
+    message: str,
+    user_profile: Dict[str, Any],
+    all_products: List[Dict[str, Any]],
+    purchase_history: List[Dict[str, Any]] = []
+) -> ProductCandidates:
+    """
+    추천 후보를 미리 선택합니다.
+    
+    LLM 호출 없이 계산되므로 감정 분석 응답을 기다리는 동안 먼저 실행할 수 있습니다.
+    서버 카탈로그는 벡터 검색으로 상위 RECOMMEND_TOP_K개만 고르고
+    (구매 연관 모델이 있으면 구매이력과 함께 구매하는 상품에,
+    구매이력이 없으면 같은 세그먼트 고객이 많이 구매하는 상품에 가산점),
+    요청으로 전달된 상품 목록(레거시)은 키워드 매칭 50개 + 기타 30개를 사용합니다.
+    """
+    with span("candidates"):
+        gender = user_profile.get('gender', 'U')
+        age_group = user_profile.get('ageGroup', '')
+    
+        index = index_for(all_products)
+        retriever = retriever_for(all_products)
+    
+        if retriever is None:
+            # 역색인 기반 후보 선택 (프로필 버킷 ∩ 키워드 매칭)
+            keyword_matched, other_products, matched_total, other_total = index.select_candidates(
+                message, gender, age_group, matched_limit=50, other_limit=30
+            )
+            products = keyword_matched + other_products
         else:
-            client = get_gemini_client()
-            response = client.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=0.3,
-                    response_mime_type="application/json"
-                )
+            # 프로필 필터 + 키워드 매칭 가산점 + 유사도 상위 k개
+            allowed = index.profile_mask(gender, age_group)
+            matched = np.flatnonzero(index.match_mask(message) & allowed)
+            ranker = ranker_for(all_products)
+            cohort = cold_start_cohort(user_profile, purchase_history)
+            if cohort is None:
+                affinity, _ = ranker.copurchase_affinity(purchase_history)
+            else:
+                affinity, _ = ranker.cohort_affinity(cohort)
+            top = retriever.top_k(
+                message,
+                allowed=allowed,
+                boosted=matched,
+                k=RECOMMEND_TOP_K,
+                affinity=affinity
             )
-            result = json.loads(response.text)
-        
-        return SentimentResult(
-            sentiment=result['sentiment'],
-            score=result['score'],
-            keywords=result['keywords']
+            products = [all_products[i] for i in top]
+            matched_total = len(matched)
+            other_total = int(allowed.sum()) - matched_total
+    
+        return ProductCandidates(
+            index=index,
+            gender=gender,
+            age_group=age_group,
+            products=products,
+            matched_total=matched_total,
+            other_total=other_total
         )
-    except Exception as e:
-        print(f"감정 분석 오류: {str(e)}")
-        return SentimentResult(
-            sentiment="neutral",
-            score=0.5,
-            keywords=message.split()[:3]
+
+
+def cold_start_cohort(user_profile: Dict[str, Any], purchase_history: List[Dict[str, Any]]) -> Optional[CohortInsight]:
+    """구매이력이 없는 사용자의 세그먼트 인사이트 (미리 계산된 캐시에서 조회, 없으면 None)"""
+    if purchase_history:
+        return None
+    return cohort_insights.lookup(user_profile)
+
+
+def recommendation_history_bucket(user_profile: Dict[str, Any], purchase_history: List[Dict[str, Any]]) -> str:
+    """
+    추천 캐시 키용 구매이력 버킷
+
+    로컬 추천(후보 선택, 부족분 채우기)은 구매이력으로 개인화되므로 구매이력이 있으면 항상 구분하고,
+    구매이력이 없으면 사용한 세그먼트 인사이트(세그먼트, 계산 시각)로 구분합니다.
+    """
+    if purchase_history:
+        return history_bucket(purchase_history)
+    cohort = cold_start_cohort(user_profile, purchase_history)
+    if cohort is not None:
+        return f"cohort:{cohort.label}:{cohort_insights.computed_at.isoformat()}"
+    return ""
+
+
+def recommend_locally(
+    message: str,
+    user_profile: Dict[str, Any],
+    all_products: List[Dict[str, Any]],
+    purchase_history: List[Dict[str, Any]],
+    limit: int = 5,
+    exclude: Optional[List[int]] = None
+) -> List[ProductRecommendation]:
+    """LLM 없이 로컬 추천 엔진으로 상품을 추천합니다."""
+    ranker = ranker_for(all_products)
+    excluded = set(exclude or [])
+    ranked = ranker.rank(
+        message,
+        user_profile.get('gender', 'U'),
+        user_profile.get('ageGroup', ''),
+        purchase_history,
+        limit=limit + len(excluded),
+        cohort=cold_start_cohort(user_profile, purchase_history)
+    )
+    return [
+        ProductRecommendation(
+            product_id=product['id'],
+            name=product['name'],
+            reason=reason,
+            relevance_score=relevance
         )
+        for product, relevance, reason in ranked
+        if product['id'] not in excluded
+    ][:limit]
 
 
-# ============ 상품 추천 ============
+# 추천 프롬프트 공통 지침
+RECOMMEND_RULES = """**중요**:
+- "밀키트 추천" → 상품명에 [밀키트]가 있는 완제품 선택 (재료 X)
+- "과일 추천" → 과일 카테고리 상품 선택
+- 사용자는 바로 먹을 수 있는 상품을 원합니다"""
+
+
+def simplify_products(products: List[Dict[str, Any]]) -> str:
+    """프롬프트용 상품 목록 (토큰 절약을 위해 설명은 짧게, JSON은 공백 없이)"""
+    return json.dumps(
+        [
+            {
+                "id": p['id'],
+                "name": p['name'],
+                "category": p['category'],
+                "description": (p.get('description') or '')[:60],
+                "price": p.get('price', 0)
+            }
+            for p in products
+        ],
+        ensure_ascii=False,
+        separators=(',', ':')
+    )
+
+
+def to_recommendation(rec: Dict[str, Any], index: ProductIndex) -> Optional[ProductRecommendation]:
+    """LLM이 고른 추천 항목 하나를 추천 결과로 변환 (카탈로그에 없는 ID면 None)"""
+    product = index.get(rec['product_id'])
+    if not product:
+        return None
+    return ProductRecommendation(
+        product_id=rec['product_id'],
+        name=product['name'],
+        reason=rec['reason'],
+        relevance_score=rec.get('relevance_score', 0.8)
+    )
+
+
+def build_recommendations(
+    raw_recommendations: List[Dict[str, Any]],
+    index: ProductIndex,
+    message: str,
+    user_profile: Dict[str, Any],
+    all_products: List[Dict[str, Any]],
+    purchase_history: List[Dict[str, Any]]
+) -> List[ProductRecommendation]:
+    """
+    LLM이 고른 상품 ID를 추천 결과로 변환 (최대 5개)
+
+    카탈로그에 없는 ID는 건너뛰고, 3개보다 적으면 로컬 추천으로 채웁니다.
+    """
+    recommendations = []
+    for rec in raw_recommendations:
+        recommendation = to_recommendation(rec, index)
+        if recommendation is not None:
+            recommendations.append(recommendation)
+    
+    # 최소 3개 보장
+    if len(recommendations) < 3:
+        recommendations += recommend_locally(
+            message, user_profile, all_products, purchase_history,
+            limit=3 - len(recommendations),
+            exclude=[r.product_id for r in recommendations]
+        )
+    return recommendations[:5]
+
+
+RECOMMEND_SYSTEM_PROMPT = "식재료 추천 전문가입니다. JSON으로만 응답하세요."
+
+
+def build_recommend_prompt(message: str, sentiment_result: SentimentResult, candidates: ProductCandidates) -> str:
+    """추천 프롬프트 생성 (응답은 {"recommendations": [...]} JSON)"""
+    return f"""
+사용자 정보:
+- 성별: {candidates.gender}
+- 연령대: {candidates.age_group}
+- 메시지: "{message}"
+- 키워드: {', '.join(sentiment_result.keywords)}
+
+추천 가능한 상품 목록:
+{simplify_products(candidates.products)}
+
+사용자의 요청에 가장 적합한 **완제품 상품** 3~5개를 추천하세요.
+
+{RECOMMEND_RULES}
+
+응답 형식 (JSON만):
+{{
+    "recommendations": [
+        {{
+            "product_id": 상품ID(숫자),
+            "reason": "추천 이유 (한 문장)",
+            "relevance_score": 0.0~1.0
+        }}
+    ]
+}}
+"""
+
+
+def recommendation_cache_parts(
+    model: AIModel,
+    message: str,
+    user_profile: Dict[str, Any],
+    all_products: List[Dict[str, Any]],
+    purchase_history: List[Dict[str, Any]]
+) -> Tuple[Optional[str], List[Any]]:
+    """(카탈로그 버전, 추천 캐시 키 구성 요소) - 카탈로그 버전이 없으면(요청 상품 목록) 캐시하지 않음"""
+    catalog_version = version_for(all_products)
+    return catalog_version, [
+        model, normalize_message(message), profile_bucket(user_profile),
+        catalog_version, recommendation_history_bucket(user_profile, purchase_history)
+    ]
+
 
 async def recommend_products(
     message: str,
@@ -232,107 +477,286 @@ async def recommend_products(
     user_profile: Dict[str, Any],
     all_products: List[Dict[str, Any]],
     purchase_history: List[Dict[str, Any]] = [],
-    model: AIModel = "gpt"
+    model: AIModel = "gpt",
+    candidates: Optional[ProductCandidates] = None,
+    latency_budget_ms: Optional[int] = None
 ) -> List[ProductRecommendation]:
     """
     사용자 메시지와 프로필 기반으로 상품을 추천합니다.
     
     로직:
     1. 프로필 필터링 (targetAge, targetGender)
-    2. 키워드 매칭 상품 우선 배치
+    2. 키워드 매칭 + 벡터 유사도로 후보 선정
     3. AI가 최종 3~5개 선택
+    
+    candidates가 주어지면 1~2단계를 건너뜁니다 (prefilter_candidates 결과 재사용).
+    model="local"이면 LLM 없이 로컬 추천 엔진만 사용하고,
+    LLM이 latency_budget_ms 안에 응답하지 못하거나 실패하면 로컬 추천 결과로 대체합니다.
     """
+    with span("recommend", **MODEL_LABELS[model]) as current:
+        logger.info("🎯 상품 추천 시작: %s", message)
     
-    print(f"🎯 상품 추천 시작: {message}")
+        if model == "local":
+            recommendations = recommend_locally(message, user_profile, all_products, purchase_history)
+            logger.info("✅ 로컬 추천 완료: %s", [r.name for r in recommendations])
+            return recommendations
     
-    message_lower = message.lower()
-    gender = user_profile.get('gender', 'U')
-    age_group = user_profile.get('ageGroup', '')
+        if latency_budget_ms is None:
+            latency_budget_ms = RECOMMEND_LATENCY_BUDGET_MS
     
-    # 키워드 매칭 상품 분리
-    keyword_matched = []
-    other_products = []
-    
-    for product in all_products:
-        # 프로필 필터링
-        target_gender = product.get('targetGender', 'all')
-        target_ages = product.get('targetAge', [])
-        
-        gender_match = (
-            target_gender == 'all' or
-            (gender == 'M' and target_gender in ['male', 'male-oriented']) or
-            (gender == 'F' and target_gender in ['female', 'female-oriented']) or
-            target_gender == 'unisex'
+        # 서버 카탈로그를 쓰는 경우에만 캐시 (카탈로그 버전이 키에 포함됨)
+        catalog_version, cache_parts = recommendation_cache_parts(
+            model, message, user_profile, all_products, purchase_history
         )
-        age_match = not target_ages or age_group in target_ages
-        
-        if not (gender_match and age_match):
-            continue
+        if catalog_version is not None:
+            cached = await response_cache.get("recommendation", *cache_parts)
+            current.cache = "miss" if cached is None else "hit"
+            if cached is not None:
+                logger.info("⚡ 추천 캐시 적중")
+                return [ProductRecommendation(**r) for r in cached]
+    
+        if candidates is None:
+            candidates = prefilter_candidates(message, user_profile, all_products, purchase_history)
+    
+        index = candidates.index
+        logger.info("   키워드 매칭: %d개, 기타: %d개", candidates.matched_total, candidates.other_total)
+        logger.info("   AI에 전달: %d개", len(candidates.products))
+    
+        with span("prompt_build", **MODEL_LABELS[model]):
+            prompt = build_recommend_prompt(message, sentiment_result, candidates)
+    
+        try:
+            call = routed_json(model, prompt, system=RECOMMEND_SYSTEM_PROMPT, temperature=0.7)
+            if latency_budget_ms:
+                result = await asyncio.wait_for(call, timeout=latency_budget_ms / 1000)
+            else:
+                result = await call
         
-        # 키워드 매칭 체크
-        name_lower = product['name'].lower()
-        category_lower = product.get('category', '').lower()
+            recommendations = build_recommendations(
+                result.get('recommendations', []), index,
+                message, user_profile, all_products, purchase_history
+            )
         
-        is_match = False
-        if '밀키트' in message_lower and ('밀키트' in name_lower or '밀키트' in category_lower):
-            is_match = True
-        elif '간편식' in message_lower and ('간편식' in name_lower or '간편식' in category_lower):
-            is_match = True
-        elif '과일' in message_lower and ('과일' in name_lower or '과일' in category_lower):
-            is_match = True
-        elif '채소' in message_lower and ('채소' in name_lower or '채소' in category_lower):
-            is_match = True
-        elif ('고기' in message_lower or '육류' in message_lower) and ('고기' in name_lower or '육류' in category_lower):
-            is_match = True
-        elif '해산물' in message_lower and ('해산물' in name_lower or '해산물' in category_lower):
-            is_match = True
-        elif '음료' in message_lower and ('음료' in name_lower or '음료' in category_lower):
-            is_match = True
-        elif '간식' in message_lower and ('간식' in name_lower or '스낵' in category_lower or '과자' in category_lower):
-            is_match = True
+            logger.info("✅ 추천 완료: %s", [r.name for r in recommendations])
+            if catalog_version is not None:
+                await response_cache.set(
+                    "recommendation", cache_parts, [r.model_dump() for r in recommendations]
+                )
+            return recommendations
         
-        if is_match:
-            keyword_matched.append(product)
-        else:
-            other_products.append(product)
-    
-    # 키워드 매칭 우선 + 나머지
-    products_to_send = keyword_matched[:50] + other_products[:30]
-    
-    print(f"   키워드 매칭: {len(keyword_matched)}개, 기타: {len(other_products)}개")
-    print(f"   AI에 전달: {len(products_to_send)}개")
-    
-    # AI 프롬프트 구성
-    simplified_products = [
-        {
-            "id": p['id'],
-            "name": p['name'],
-            "category": p['category'],
-            "description": p.get('description', ''),
-            "price": p.get('price', 0)
-        }
-        for p in products_to_send
-    ]
-    
-    prompt = f"""
+        except asyncio.TimeoutError:
+            logger.warning("⏱️  추천 지연 예산 초과 (%dms), 로컬 추천으로 대체", latency_budget_ms)
+            return recommend_locally(message, user_profile, all_products, purchase_history)
+        except Exception as e:
+            logger.error("❌ 추천 오류: %s", e)
+            # 폴백: 로컬 추천 엔진
+            return recommend_locally(message, user_profile, all_products, purchase_history)
+
+
+class JsonArrayItems:
+    """
+    스트리밍 JSON 응답에서 첫 번째 배열의 객체 원소를 완성되는 대로 꺼내는 파서
+
+    {"recommendations": [{...}, {...}]} 응답의 청크를 feed()로 넣으면
+    닫힌 객체부터 순서대로 반환합니다 (문자열 안의 괄호는 무시).
+    """
+
+    def __init__(self):
+        self._depth = 0
+        self._array_depth: Optional[int] = None
+        self._in_string = False
+        self._escaped = False
+        # 진행 중인 원소의 글자 (원소 밖이면 None)
+        self._item: Optional[List[str]] = None
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        items = []
+        for char in chunk:
+            if self._item is not None:
+                self._item.append(char)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in '[{':
+                self._depth += 1
+                if char == '[' and self._array_depth is None:
+                    self._array_depth = self._depth
+                elif char == '{' and self._array_depth is not None and self._depth == self._array_depth + 1:
+                    self._item = [char]
+            elif char in ']}':
+                if self._item is not None and self._depth == self._array_depth + 1:
+                    try:
+                        items.append(json.loads("".join(self._item)))
+                    except ValueError:
+                        pass
+                    self._item = None
+                self._depth -= 1
+        return items
+
+
+async def stream_recommendations(
+    message: str,
+    sentiment_result: SentimentResult,
+    user_profile: Dict[str, Any],
+    all_products: List[Dict[str, Any]],
+    purchase_history: List[Dict[str, Any]] = [],
+    model: AIModel = "gpt",
+    candidates: Optional[ProductCandidates] = None,
+    latency_budget_ms: Optional[int] = None
+) -> AsyncIterator[ProductRecommendation]:
+    """
+    recommend_products의 스트리밍 버전 (최대 5개)
+
+    LLM의 JSON 응답을 스트리밍으로 받아 추천 항목이 완성되는 대로 하나씩 내보냅니다.
+    캐시 적중이나 로컬 모드는 결과를 바로 내보내고, 3개보다 적으면 마지막에 로컬 추천으로 채웁니다.
+    LLM이 latency_budget_ms 안에 끝나지 않거나 실패하면 이미 보낸 상품을 제외한 로컬 추천으로 채웁니다.
+    """
+    with span("recommend", **MODEL_LABELS[model]) as current:
+        logger.info("🎯 상품 추천 시작 (스트리밍): %s", message)
+
+        if model == "local":
+            for recommendation in recommend_locally(message, user_profile, all_products, purchase_history):
+                yield recommendation
+            return
+
+        if latency_budget_ms is None:
+            latency_budget_ms = RECOMMEND_LATENCY_BUDGET_MS
+
+        catalog_version, cache_parts = recommendation_cache_parts(
+            model, message, user_profile, all_products, purchase_history
+        )
+        if catalog_version is not None:
+            cached = await response_cache.get("recommendation", *cache_parts)
+            current.cache = "miss" if cached is None else "hit"
+            if cached is not None:
+                logger.info("⚡ 추천 캐시 적중")
+                for r in cached:
+                    yield ProductRecommendation(**r)
+                return
+
+        if candidates is None:
+            candidates = prefilter_candidates(message, user_profile, all_products, purchase_history)
+        with span("prompt_build", **MODEL_LABELS[model]):
+            prompt = build_recommend_prompt(message, sentiment_result, candidates)
+
+        recommendations: List[ProductRecommendation] = []
+        completed = False
+        deadline = time.monotonic() + latency_budget_ms / 1000 if latency_budget_ms else None
+        chunks = stream_text(model, prompt, system=RECOMMEND_SYSTEM_PROMPT, temperature=0.7, json_mode=True)
+        parser = JsonArrayItems()
+        try:
+            while True:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), timeout=timeout)
+                except StopAsyncIteration:
+                    completed = True
+                    break
+                for item in parser.feed(chunk):
+                    try:
+                        recommendation = to_recommendation(item, candidates.index)
+                    except (KeyError, TypeError):
+                        recommendation = None
+                    if (
+                        recommendation is None
+                        or len(recommendations) == 5
+                        or any(r.product_id == recommendation.product_id for r in recommendations)
+                    ):
+                        continue
+                    recommendations.append(recommendation)
+                    yield recommendation
+        except asyncio.TimeoutError:
+            logger.warning("⏱️  추천 지연 예산 초과 (%dms), 로컬 추천으로 채움", latency_budget_ms)
+        except Exception as e:
+            logger.error("❌ 추천 스트리밍 오류: %s", e)
+        finally:
+            await chunks.aclose()
+
+        # 정상 응답은 최소 3개, 실패/지연 시에는 로컬 추천으로 5개까지 채움
+        target = 3 if completed else 5
+        if len(recommendations) < target:
+            padding = recommend_locally(
+                message, user_profile, all_products, purchase_history,
+                limit=target - len(recommendations),
+                exclude=[r.product_id for r in recommendations]
+            )
+            for recommendation in padding:
+                recommendations.append(recommendation)
+                yield recommendation
+
+        logger.info("✅ 추천 완료: %s", [r.name for r in recommendations])
+        if completed and catalog_version is not None:
+            await response_cache.set(
+                "recommendation", cache_parts, [r.model_dump() for r in recommendations]
+            )
+
+
+# ============ 단일 호출 분석 (의도 + 감정 + 추천) ============
+
+class SingleShotRecommendation(BaseModel):
+    """단일 호출 응답의 추천 항목"""
+    model_config = ConfigDict(extra="forbid", strict=True)
+
+    product_id: int
+    reason: str
+    relevance_score: float = Field(ge=0.0, le=1.0)
+
+
+class SingleShotResponse(BaseModel):
+    """단일 호출 응답 스키마 (필드 누락/추가, 타입 불일치는 모두 검증 실패)"""
+    model_config = ConfigDict(extra="forbid", strict=True)
+
+    needs_product_recommendation: bool
+    intent_type: Literal["greeting", "casual_chat", "product_inquiry"]
+    intent_reason: str
+    sentiment: Literal["positive", "neutral", "negative"]
+    sentiment_score: float = Field(ge=0.0, le=1.0)
+    keywords: List[str]
+    recommendations: List[SingleShotRecommendation] = Field(max_length=5)
+
+
+@dataclass
+class SingleShotAnalysis:
+    """단일 호출 분석 결과"""
+    intent: IntentAnalysis
+    sentiment: SentimentResult
+    recommendations: List[ProductRecommendation]  # 추천이 필요 없으면 빈 목록
+
+
+def build_single_shot_prompt(message: str, candidates: ProductCandidates) -> str:
+    """의도/감정/추천을 한 번에 요청하는 프롬프트"""
+    return f"""
 사용자 정보:
-- 성별: {gender}
-- 연령대: {age_group}
+- 성별: {candidates.gender}
+- 연령대: {candidates.age_group}
 - 메시지: "{message}"
-- 키워드: {', '.join(sentiment_result.keywords)}
 
 추천 가능한 상품 목록:
-{json.dumps(simplified_products, ensure_ascii=False, indent=2)}
+{simplify_products(candidates.products)}
 
-사용자의 요청에 가장 적합한 **완제품 상품** 3~5개를 추천하세요.
+다음 세 가지를 한 번에 분석하세요.
+1. 의도: 상품 추천이 필요한지 판단
+   - 필요한 경우: 음식, 식재료, 요리 관련 질문/추천 요청
+   - 필요 없는 경우: 단순 인사, 감사, 일상 대화
+2. 감정: 메시지의 감정과 키워드
+3. 추천: 상품 추천이 필요하면 사용자의 요청에 가장 적합한 **완제품 상품** 3~5개 (필요 없으면 빈 배열)
 
-**중요**:
-- "밀키트 추천" → 상품명에 [밀키트]가 있는 완제품 선택 (재료 X)
-- "과일 추천" → 과일 카테고리 상품 선택
-- 사용자는 바로 먹을 수 있는 상품을 원합니다
+{RECOMMEND_RULES}
 
-응답 형식 (JSON만):
+응답 형식 (JSON만, 아래 필드 외 다른 필드 없이):
 {{
+    "needs_product_recommendation": true 또는 false,
+    "intent_type": "greeting" 또는 "casual_chat" 또는 "product_inquiry",
+    "intent_reason": "판단 이유",
+    "sentiment": "positive" 또는 "neutral" 또는 "negative",
+    "sentiment_score": 0.0에서 1.0 사이의 숫자,
+    "keywords": ["키워드1", "키워드2", ...],
     "recommendations": [
         {{
             "product_id": 상품ID(숫자),
@@ -342,89 +766,130 @@ async def recommend_products(
     ]
 }}
 """
+
+
+def use_single_shot(requested: Optional[bool], model: AIModel) -> bool:
+    """요청별 단일 호출 모드 사용 여부 (요청 값이 없으면 CHAT_SINGLE_SHOT, local 모델은 사용 안 함)"""
+    if model == "local":
+        return False
+    return CHAT_SINGLE_SHOT if requested is None else requested
+
+
+async def analyze_single_shot(
+    message: str,
+    user_profile: Dict[str, Any],
+    all_products: List[Dict[str, Any]],
+    purchase_history: List[Dict[str, Any]] = [],
+    model: AIModel = "gpt",
+    candidates: Optional[ProductCandidates] = None
+) -> Optional[SingleShotAnalysis]:
+    """
+    의도 분석, 감정 분석, 상품 추천을 LLM 한 번으로 처리합니다.
     
-    try:
-        if model == "gpt":
-            client = get_openai_client()
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "식재료 추천 전문가입니다. JSON으로만 응답하세요."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                response_format={"type": "json_object"}
-            )
-            result = json.loads(response.choices[0].message.content)
-        else:
-            client = get_gemini_client()
-            response = client.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=0.7,
-                    response_mime_type="application/json"
+    응답이 SingleShotResponse 스키마를 통과하지 못하거나 호출이 실패하면 None을 반환하며,
+    이때 호출 측은 기존 다중 호출(analyze_intent / analyze_sentiment / recommend_products)로 처리합니다.
+    추천 관련 키워드가 있으면 LLM 판단과 관계없이 추천합니다.
+    로컬 분류기가 의도와 감정을 모두 확신하면 추천이 필요할 때만 recommend_products로 LLM을 호출합니다.
+    """
+    labels = MODEL_LABELS[model]
+    with span("single_shot", **labels) as current:
+        # 로컬 분류기가 의도와 감정을 모두 확신하면 LLM은 추천에만 사용
+        sentiment = local_sentiment(message)
+        if sentiment is not None:
+            if should_recommend_products(message):
+                intent = IntentAnalysis(
+                    needs_product_recommendation=True,
+                    intent_type="product_inquiry",
+                    reason="추천 관련 키워드 감지"
                 )
-            )
-            result = json.loads(response.text)
+            else:
+                intent = local_intent(message)
+            if intent is not None:
+                current.provider, current.model = "local", "classifier"
+                SINGLE_SHOT_RESULTS.labels(labels["provider"], labels["model"], "local").inc()
+                recommendations: List[ProductRecommendation] = []
+                if intent.needs_product_recommendation:
+                    recommendations = await recommend_products(
+                        message, sentiment, user_profile, all_products, purchase_history,
+                        model=model, candidates=candidates
+                    )
+                return SingleShotAnalysis(intent=intent, sentiment=sentiment, recommendations=recommendations)
         
-        recommendations = []
-        for rec in result.get('recommendations', []):
-            product_id = rec['product_id']
-            product = next((p for p in all_products if p['id'] == product_id), None)
-            if product:
-                recommendations.append(ProductRecommendation(
-                    product_id=product_id,
-                    name=product['name'],
-                    reason=rec['reason'],
-                    relevance_score=rec.get('relevance_score', 0.8)
-                ))
+        if candidates is None:
+            candidates = prefilter_candidates(message, user_profile, all_products, purchase_history)
         
-        # 최소 3개 보장
-        if len(recommendations) < 3:
-            fallback = sorted(keyword_matched + other_products, key=lambda x: x.get('reviews', 0), reverse=True)
-            for p in fallback:
-                if len(recommendations) >= 3:
-                    break
-                if p['id'] not in [r.product_id for r in recommendations]:
-                    recommendations.append(ProductRecommendation(
-                        product_id=p['id'],
-                        name=p['name'],
-                        reason="인기 상품입니다.",
-                        relevance_score=0.7
-                    ))
+        catalog_version, cache_parts = recommendation_cache_parts(
+            model, message, user_profile, all_products, purchase_history
+        )
+        cached = None
+        if catalog_version is not None:
+            cached = await response_cache.get("single_shot", *cache_parts)
+            current.cache = "miss" if cached is None else "hit"
+        
+        if cached is not None:
+            response = SingleShotResponse.model_validate(cached)
+        else:
+            with span("prompt_build", **labels):
+                prompt = build_single_shot_prompt(message, candidates)
+            try:
+                result = await routed_json(
+                    model, prompt,
+                    system="쇼핑 대화 분석 및 식재료 추천 전문가입니다. JSON으로만 응답하세요.",
+                    temperature=0.3
+                )
+                response = SingleShotResponse.model_validate(result)
+            except ValidationError as e:
+                logger.warning("⚠️  단일 호출 응답 검증 실패, 다중 호출로 대체: %s", e.errors()[:3])
+                SINGLE_SHOT_RESULTS.labels(labels["provider"], labels["model"], "invalid").inc()
+                return None
+            except asyncio.TimeoutError:
+                logger.warning("⏱️  단일 호출 지연 예산 초과, 다중 호출로 대체")
+                SINGLE_SHOT_RESULTS.labels(labels["provider"], labels["model"], "timeout").inc()
+                return None
+            except Exception as e:
+                logger.warning("⚠️  단일 호출 실패, 다중 호출로 대체: %s", e)
+                SINGLE_SHOT_RESULTS.labels(labels["provider"], labels["model"], "error").inc()
+                return None
+            SINGLE_SHOT_RESULTS.labels(labels["provider"], labels["model"], "ok").inc()
+            if catalog_version is not None:
+                await response_cache.set("single_shot", cache_parts, response.model_dump())
         
-        print(f"✅ 추천 완료: {[r.name for r in recommendations[:5]]}")
-        return recommendations[:5]
+        intent = IntentAnalysis(
+            needs_product_recommendation=response.needs_product_recommendation,
+            intent_type=response.intent_type,
+            reason=response.intent_reason
+        )
+        # 키워드 기반 강제 판단 (AI보다 우선)
+        if not intent.needs_product_recommendation and should_recommend_products(message):
+            intent = IntentAnalysis(
+                needs_product_recommendation=True,
+                intent_type="product_inquiry",
+                reason="추천 관련 키워드 감지"
+            )
+        sentiment = SentimentResult(
+            sentiment=response.sentiment,
+            score=response.sentiment_score,
+            keywords=response.keywords
+        )
         
-    except Exception as e:
-        print(f"❌ 추천 오류: {str(e)}")
-        # 폴백: 인기 상품
-        fallback = sorted(keyword_matched + other_products, key=lambda x: x.get('reviews', 0), reverse=True)[:3]
-        return [
-            ProductRecommendation(
-                product_id=p['id'],
-                name=p['name'],
-                reason="인기 상품입니다.",
-                relevance_score=0.6
+        recommendations = []
+        if intent.needs_product_recommendation:
+            recommendations = build_recommendations(
+                [rec.model_dump() for rec in response.recommendations], candidates.index,
+                message, user_profile, all_products, purchase_history
             )
-            for p in fallback
-        ]
+            logger.info("✅ 단일 호출 추천 완료: %s", [r.name for r in recommendations])
+        return SingleShotAnalysis(intent=intent, sentiment=sentiment, recommendations=recommendations)
 
 
 # ============ 일반 대화 응답 ============
 
-async def generate_casual_response(
-    message: str,
-    sentiment_result: SentimentResult,
-    intent_analysis: IntentAnalysis,
-    user_profile: Dict[str, Any],
-    model: AIModel = "gpt"
-) -> str:
-    """상품 추천 없이 일반 대화 응답을 생성합니다."""
-    
-    user_name = user_profile.get('name', '고객')
-    
-    prompt = f"""
+CASUAL_SYSTEM_PROMPT = "친근한 쇼핑 도우미입니다."
+
+
+def build_casual_prompt(message: str, sentiment_result: SentimentResult, user_name: str) -> str:
+    """일반 대화 응답 프롬프트 생성"""
+    return f"""
 당신은 친근한 FreshMind AI 쇼핑 도우미입니다.
 
 사용자: {user_name}님
@@ -440,26 +905,69 @@ async def generate_casual_response(
 
 응답만 작성 (JSON 아님):
 """
+
+
+def casual_fallback_message(user_name: str) -> str:
+    """일반 대화 응답 생성 실패 시 기본 메시지"""
+    return f"안녕하세요, {user_name}님! 😊 무엇을 도와드릴까요? 음식이나 식재료 관련해서 추천해드릴 수 있어요!"
+
+
+async def generate_casual_response(
+    message: str,
+    sentiment_result: SentimentResult,
+    intent_analysis: IntentAnalysis,
+    user_profile: Dict[str, Any],
+    model: AIModel = "gpt"
+) -> str:
+    """상품 추천 없이 일반 대화 응답을 생성합니다."""
+    with span("casual_response", **MODEL_LABELS[model]):
+        user_name = user_profile.get('name', '고객')
+        if model == "local":
+            return casual_fallback_message(user_name)
+        prompt = build_casual_prompt(message, sentiment_result, user_name)
     
-    try:
-        if model == "gpt":
-            client = get_openai_client()
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "친근한 쇼핑 도우미입니다."},
-                    {"role": "user", "content": prompt}
-                ],
+        try:
+            return await routed_text(
+                model, prompt,
+                system=CASUAL_SYSTEM_PROMPT,
                 temperature=0.8
             )
-            return response.choices[0].message.content.strip()
-        else:
-            client = get_gemini_client()
-            response = client.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(temperature=0.8)
-            )
-            return response.text.strip()
+        except Exception as e:
+            logger.warning("응답 생성 오류: %s", e)
+            return casual_fallback_message(user_name)
+
+
+async def stream_casual_response(
+    message: str,
+    sentiment_result: SentimentResult,
+    intent_analysis: IntentAnalysis,
+    user_profile: Dict[str, Any],
+    model: AIModel = "gpt"
+) -> AsyncIterator[str]:
+    """
+    일반 대화 응답을 토큰 단위로 스트리밍합니다.
+    
+    첫 토큰 전에 오류가 나면 기본 메시지를 한 번에 보내고,
+    이미 일부를 보낸 뒤 오류가 나면 응답이 잘린 것이므로 예외를 그대로 전달합니다.
+    """
+    
+    user_name = user_profile.get('name', '고객')
+    if model == "local":
+        yield casual_fallback_message(user_name)
+        return
+    prompt = build_casual_prompt(message, sentiment_result, user_name)
+    
+    started = False
+    try:
+        async for chunk in stream_text(model, prompt, system=CASUAL_SYSTEM_PROMPT, temperature=0.8):
+            if not started:
+                chunk = chunk.lstrip()
+                if not chunk:
+                    continue
+                started = True
+            yield chunk
     except Exception as e:
-        print(f"응답 생성 오류: {str(e)}")
-        return f"안녕하세요, {user_name}님! 😊 무엇을 도와드릴까요? 음식이나 식재료 관련해서 추천해드릴 수 있어요!"
+        logger.warning("응답 스트리밍 오류: %s", e)
+        if started:
+            raise
+        yield casual_fallback_message(user_name)
@@ -0,0 +1,369 @@
+"""
+세그먼트(코호트)별 구매 인사이트
+
+사용자 프로필(성별, 연령대, 직업, 결혼 여부) 세그먼트마다 인기 상품, 반복 구매 상품,
+카테고리 선호도를 계산해 프로세스 메모리에 보관하고 COHORT_REFRESH_INTERVAL_SECONDS마다 갱신합니다.
+
+- 집계 쿼리 한 번: (세그먼트, 상품)별 구매자 수 / 구매 횟수 / 반복 구매자 수 / 가중치 점수
+  (상품별 가중치 점수는 purchase_insights와 같은 시간/수량/반복 구매 가중치)
+- 상위 세그먼트(성별+연령대+직업, 성별+연령대, 성별, 전체)는 NumPy로 같은 결과를 다시 묶어 계산
+- 구매이력이 없는 사용자(콜드 스타트)는 구매자가 COHORT_MIN_BUYERS명 이상인 가장 세밀한 세그먼트의
+  인사이트를 추천 prior로 사용합니다 (요청마다 집계하지 않음)
+"""
+import os
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from sqlalchemy import case, func, select, Select
+from app.database import AsyncSessionLocal
+from app.models import Product, PurchaseHistory, User
+from app.services.purchase_insights import product_stats_columns
+
+COHORT_INSIGHTS_ENABLED = os.getenv("COHORT_INSIGHTS_ENABLED", "1") == "1"
+COHORT_PERIOD_DAYS = int(os.getenv("COHORT_PERIOD_DAYS", "90"))
+COHORT_REFRESH_INTERVAL_SECONDS = float(os.getenv("COHORT_REFRESH_INTERVAL_SECONDS", "3600"))
+# 이보다 구매자가 적은 세그먼트는 상위 세그먼트로 대체
+COHORT_MIN_BUYERS = int(os.getenv("COHORT_MIN_BUYERS", "20"))
+# API로 보여줄 인기 상품 수 / 추천 prior로 쓸 상품 수
+COHORT_TOP_PRODUCTS = int(os.getenv("COHORT_TOP_PRODUCTS", "10"))
+COHORT_PRIOR_PRODUCTS = int(os.getenv("COHORT_PRIOR_PRODUCTS", "50"))
+
+# 세그먼트 필드 (users 컬럼, 프론트엔드 프로필 키)
+SEGMENT_FIELDS: Tuple[Tuple[str, str], ...] = (
+    ("gender", "gender"),
+    ("age_group", "ageGroup"),
+    ("occupation", "occupation"),
+    ("marital_status", "maritalStatus"),
+)
+# 세그먼트 단계 (가장 세밀 → 전체), 각 단계에서 사용하는 SEGMENT_FIELDS 수
+SEGMENT_LEVELS = (4, 3, 2, 1, 0)
+# 단계에서 사용하지 않는 필드 값
+ANY = "*"
+# 반복 구매로 보는 사용자당 구매 횟수 (purchase_insights와 같음)
+REPEAT_MIN_COUNT = 3
+
+SegmentKey = Tuple[str, ...]
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class CohortInsight:
+    """세그먼트 하나의 구매 인사이트"""
+    key: SegmentKey
+    users: int
+    buyers: int
+    total_purchases: int
+    top_products: List[Dict[str, Any]]
+    repeat_purchases: List[Dict[str, Any]]
+    category_preferences: Dict[str, float]
+    # 추천 prior: 가중치 점수 상위 상품 ID와 0~1 점수
+    prior_product_ids: np.ndarray = field(repr=False)
+    prior_scores: np.ndarray = field(repr=False)
+
+    @property
+    def segment(self) -> Dict[str, str]:
+        return {column: value for (column, _), value in zip(SEGMENT_FIELDS, self.key) if value != ANY}
+
+    @property
+    def label(self) -> str:
+        return "|".join(self.key)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "segment": self.segment,
+            "users": self.users,
+            "buyers": self.buyers,
+            "total_purchases": self.total_purchases,
+            "insights": {
+                "top_products": self.top_products,
+                "repeat_purchases": self.repeat_purchases,
+                "category_preferences": self.category_preferences,
+            },
+        }
+
+
+# ============ 집계 쿼리 ============
+
+def _segment_columns() -> List[Any]:
+    return [getattr(User, column) for column, _ in SEGMENT_FIELDS]
+
+
+def cohort_stats_query(start_date: datetime, now: datetime) -> Select:
+    """
+    (세그먼트, 상품)별 구매 통계 집계 쿼리
+
+    사용자×상품 통계(product_stats_columns)를 먼저 구한 뒤 users와 조인해 세그먼트 단위로 합칩니다.
+    """
+    per_user = select(
+        PurchaseHistory.user_id.label("user_id"),
+        *product_stats_columns(now)
+    ).where(
+        PurchaseHistory.purchased_at >= start_date
+    ).group_by(PurchaseHistory.user_id, PurchaseHistory.product_id).subquery()
+
+    segment = _segment_columns()
+    return select(
+        *segment,
+        per_user.c.product_id,
+        Product.name,
+        Product.category,
+        func.count().label("buyers"),
+        func.sum(per_user.c.purchase_count).label("purchase_count"),
+        func.sum(case((per_user.c.purchase_count >= REPEAT_MIN_COUNT, 1), else_=0)).label("repeat_buyers"),
+        func.sum(per_user.c.weighted_score).label("weighted_score"),
+    ).join(
+        User, User.user_id == per_user.c.user_id
+    ).join(
+        Product, Product.product_id == per_user.c.product_id
+    ).group_by(*segment, per_user.c.product_id, Product.name, Product.category)
+
+
+def cohort_buyers_query(start_date: datetime) -> Select:
+    """세그먼트별 사용자 수와 기간 내 구매자 수 (idx_gender_age)"""
+    bought = select(PurchaseHistory.user_id).where(PurchaseHistory.purchased_at >= start_date).distinct().subquery()
+    segment = _segment_columns()
+    return select(
+        *segment,
+        func.count().label("users"),
+        func.count(bought.c.user_id).label("buyers"),
+    ).select_from(User).outerjoin(
+        bought, bought.c.user_id == User.user_id
+    ).group_by(*segment)
+
+
+# ============ NumPy 집계 ============
+
+def _field_codes(values: Sequence[Optional[str]], vocabulary: Dict[str, int]) -> np.ndarray:
+    return np.fromiter((vocabulary.setdefault(v or "", len(vocabulary)) for v in values), dtype=np.int64, count=len(values))
+
+
+def _level_codes(field_codes: List[np.ndarray], sizes: List[int], level: int) -> Tuple[np.ndarray, List[int]]:
+    """앞 level개 필드로 만든 세그먼트 번호 (전체 단계는 0)"""
+    if level == 0:
+        return np.zeros(len(field_codes[0]), dtype=np.int64), []
+    return np.ravel_multi_index(field_codes[:level], sizes[:level]), sizes[:level]
+
+
+def build_cohort_insights(user_rows: Sequence[Any], stat_rows: Sequence[Any]) -> Dict[SegmentKey, CohortInsight]:
+    """
+    집계 쿼리 결과로 모든 단계의 세그먼트 인사이트를 계산
+
+    Args:
+        user_rows: cohort_buyers_query 결과
+        stat_rows: cohort_stats_query 결과
+    """
+    n_fields = len(SEGMENT_FIELDS)
+    vocabularies: List[Dict[str, int]] = [{} for _ in SEGMENT_FIELDS]
+    user_codes = [_field_codes([row[i] for row in user_rows], vocabularies[i]) for i in range(n_fields)]
+    stat_codes = [_field_codes([row[i] for row in stat_rows], vocabularies[i]) for i in range(n_fields)]
+    sizes = [max(len(v), 1) for v in vocabularies]
+    names = [[value for value, _ in sorted(v.items(), key=lambda x: x[1])] for v in vocabularies]
+
+    segment_users = np.array([row.users for row in user_rows], dtype=np.int64)
+    segment_buyers = np.array([row.buyers for row in user_rows], dtype=np.int64)
+
+    product_ids, product_pos = np.unique(np.array([row.product_id for row in stat_rows], dtype=np.int64), return_inverse=True)
+    product_names: Dict[int, str] = {}
+    product_categories: Dict[int, str] = {}
+    for row in stat_rows:
+        product_names[row.product_id] = row.name
+        product_categories[row.product_id] = row.category or "기타"
+    category_names, category_of_product = np.unique(
+        np.array([product_categories[pid] for pid in product_ids.tolist()], dtype=object), return_inverse=True
+    )
+    buyers = np.array([row.buyers for row in stat_rows], dtype=np.int64)
+    purchases = np.array([row.purchase_count for row in stat_rows], dtype=np.int64)
+    repeat_buyers = np.array([row.repeat_buyers for row in stat_rows], dtype=np.int64)
+    weighted = np.array([float(row.weighted_score) for row in stat_rows], dtype=np.float64)
+    n_products = len(product_ids)
+
+    insights: Dict[SegmentKey, CohortInsight] = {}
+    for level in SEGMENT_LEVELS:
+        user_segments, level_sizes = _level_codes(user_codes, sizes, level)
+        stat_segments, _ = _level_codes(stat_codes, sizes, level)
+        n_segments = int(np.prod(level_sizes)) if level_sizes else 1
+        users_by_segment = np.bincount(user_segments, weights=segment_users, minlength=n_segments)
+        buyers_by_segment = np.bincount(user_segments, weights=segment_buyers, minlength=n_segments)
+
+        # (세그먼트, 상품) 쌍별 합계
+        pairs, pair_of_row = np.unique(stat_segments * max(n_products, 1) + product_pos, return_inverse=True)
+        pair_segment, pair_product = np.divmod(pairs, max(n_products, 1))
+        pair_buyers = np.bincount(pair_of_row, weights=buyers, minlength=len(pairs))
+        pair_purchases = np.bincount(pair_of_row, weights=purchases, minlength=len(pairs))
+        pair_repeat = np.bincount(pair_of_row, weights=repeat_buyers, minlength=len(pairs))
+        pair_weighted = np.bincount(pair_of_row, weights=weighted, minlength=len(pairs))
+
+        # 세그먼트 순, 세그먼트 안에서는 가중치 점수 내림차순(동점이면 상품 ID 순)
+        order = np.lexsort((product_ids[pair_product], -pair_weighted, pair_segment))
+        segment_starts = np.searchsorted(pair_segment[order], np.arange(n_segments + 1))
+
+        for segment_no in np.flatnonzero(users_by_segment > 0).tolist():
+            rows = order[segment_starts[segment_no]:segment_starts[segment_no + 1]]
+            codes = np.unravel_index(segment_no, level_sizes) if level_sizes else ()
+            key = tuple(names[i][int(codes[i])] if i < level else ANY for i in range(n_fields))
+            insights[key] = _segment_insight(
+                key,
+                int(users_by_segment[segment_no]),
+                int(buyers_by_segment[segment_no]),
+                rows,
+                pair_product, pair_buyers, pair_purchases, pair_repeat, pair_weighted,
+                product_ids, product_names, category_names, category_of_product
+            )
+    return insights
+
+
+def _segment_insight(
+    key: SegmentKey,
+    users: int,
+    segment_buyers: int,
+    rows: np.ndarray,
+    pair_product: np.ndarray,
+    pair_buyers: np.ndarray,
+    pair_purchases: np.ndarray,
+    pair_repeat: np.ndarray,
+    pair_weighted: np.ndarray,
+    product_ids: np.ndarray,
+    product_names: Dict[int, str],
+    category_names: np.ndarray,
+    category_of_product: np.ndarray
+) -> CohortInsight:
+    """정렬된 (세그먼트, 상품) 행 위치로 세그먼트 인사이트 구성"""
+    products = pair_product[rows]
+    weighted = pair_weighted[rows]
+
+    top_products = []
+    for row, pos in zip(rows[:COHORT_TOP_PRODUCTS].tolist(), products[:COHORT_TOP_PRODUCTS].tolist()):
+        product_id = int(product_ids[pos])
+        top_products.append({
+            "product_id": product_id,
+            "product_name": product_names[product_id],
+            "buyers": int(pair_buyers[row]),
+            "purchase_count": int(pair_purchases[row]),
+            "weighted_score": round(float(pair_weighted[row]), 2),
+        })
+
+    # 반복 구매자 수 내림차순 (같으면 가중치 점수 순서 유지)
+    repeating = rows[pair_repeat[rows] > 0]
+    repeating = repeating[np.argsort(-pair_repeat[repeating], kind="stable")][:3]
+    repeat_purchases = []
+    for row in repeating.tolist():
+        product_id = int(product_ids[pair_product[row]])
+        repeat_purchases.append({
+            "product_id": product_id,
+            "product_name": product_names[product_id],
+            "repeat_buyers": int(pair_repeat[row]),
+            "repeat_rate": round(float(pair_repeat[row] / pair_buyers[row]), 3),
+        })
+
+    category_scores = np.bincount(category_of_product[products], weights=weighted, minlength=len(category_names))
+    total_score = float(category_scores.sum())
+    category_preferences = {
+        str(category_names[i]): round(float(category_scores[i]) / total_score, 4)
+        for i in np.argsort(-category_scores, kind="stable").tolist()
+        if category_scores[i] > 0
+    } if total_score > 0 else {}
+
+    prior = products[:COHORT_PRIOR_PRODUCTS]
+    peak = float(weighted[0]) if len(weighted) else 0.0
+    prior_scores = weighted[:COHORT_PRIOR_PRODUCTS] / peak if peak > 0 else np.zeros(len(prior))
+
+    return CohortInsight(
+        key=key,
+        users=users,
+        buyers=segment_buyers,
+        total_purchases=int(pair_purchases[rows].sum()),
+        top_products=top_products,
+        repeat_purchases=repeat_purchases,
+        category_preferences=category_preferences,
+        prior_product_ids=product_ids[prior],
+        prior_scores=prior_scores,
+    )
+
+
+# ============ 캐시 / 갱신 ============
+
+class CohortInsightStore:
+    """세그먼트 인사이트 캐시 (주기적으로 전체를 다시 계산해 교체)"""
+
+    def __init__(self, session_factory=AsyncSessionLocal, period_days: int = COHORT_PERIOD_DAYS):
+        self.session_factory = session_factory
+        self.period_days = period_days
+        self.insights: Dict[SegmentKey, CohortInsight] = {}
+        self.computed_at: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def refresh(self) -> int:
+        """모든 세그먼트 인사이트를 다시 계산 (집계 쿼리 2번 + NumPy 계산)"""
+        now = datetime.now()
+        start_date = now - timedelta(days=self.period_days)
+        async with self.session_factory() as db:
+            user_rows = (await db.execute(cohort_buyers_query(start_date))).all()
+            stat_rows = (await db.execute(cohort_stats_query(start_date, now))).all()
+        # 세그먼트/상품이 많을 때 이벤트 루프가 막히지 않도록 스레드에서 계산
+        insights = await asyncio.to_thread(build_cohort_insights, user_rows, stat_rows)
+        self.insights = insights
+        self.computed_at = now
+        return len(insights)
+
+    def get(self, key: SegmentKey) -> Optional[CohortInsight]:
+        return self.insights.get(key)
+
+    def lookup(self, user_profile: Dict[str, Any]) -> Optional[CohortInsight]:
+        """
+        프로필에 맞는 가장 세밀한 세그먼트 인사이트 (구매자가 COHORT_MIN_BUYERS명 미만이면 상위 단계로 대체)
+
+        프로필에 없는 필드는 그 필드를 쓰지 않는 단계부터 찾습니다.
+        """
+        if not self.insights:
+            return None
+        values = [user_profile.get(profile_key) or "" for _, profile_key in SEGMENT_FIELDS]
+        for level in SEGMENT_LEVELS:
+            if not all(values[:level]):
+                continue
+            key = tuple(values[:level]) + (ANY,) * (len(SEGMENT_FIELDS) - level)
+            insight = self.insights.get(key)
+            if insight is not None and (insight.buyers >= COHORT_MIN_BUYERS or level == 0):
+                return insight
+        return None
+
+    async def run(self) -> None:
+        """백그라운드 갱신 루프"""
+        while True:
+            try:
+                count = await self.refresh()
+                logger.info("👥 세그먼트 인사이트 갱신: %d개 세그먼트", count)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("⚠️  세그먼트 인사이트 갱신 실패: %s", e)
+            await asyncio.sleep(COHORT_REFRESH_INTERVAL_SECONDS)
+
+    def start(self) -> None:
+        """백그라운드 갱신 시작 (COHORT_INSIGHTS_ENABLED=0이면 사용 안 함)"""
+        if COHORT_INSIGHTS_ENABLED and self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """백그라운드 갱신 종료"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": COHORT_INSIGHTS_ENABLED,
+            "segments": len(self.insights),
+            "period_days": self.period_days,
+            "computed_at": self.computed_at.isoformat() if self.computed_at else None,
+        }
+
+
+cohort_insights = CohortInsightStore()
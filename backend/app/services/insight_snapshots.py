@@ -0,0 +1,346 @@
+"""
+사용자별 구매 인사이트 스냅샷
+
+purchase-summary(배너) 응답을 user_purchase_insights 테이블에 미리 계산해 두고,
+조회는 프로세스 내 캐시 → 기본 키 조회 순으로 처리합니다.
+
+- 증분 갱신: 백그라운드 작업이 purchase_id 워터마크 이후 구매가 생긴 사용자만 다시 계산
+  (재시작 시 워터마크는 스냅샷의 last_purchase_id 최댓값)
+- 일일 갱신: 날짜가 바뀌면 오늘 계산되지 않은 스냅샷을 다시 계산해 시간 가중치 구간 재적용
+- 조회 시 오늘 계산된 스냅샷이 없으면 즉시 계산해 저장
+- 백그라운드 갱신은 잠금(PostgreSQL advisory lock / 파일 잠금)을 잡은 워커 하나만 실행
+"""
+import os
+import json
+import asyncio
+import hashlib
+import logging
+import tempfile
+from contextlib import asynccontextmanager
+from datetime import datetime, date
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
+from sqlalchemy import select, func, distinct
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import AsyncSessionLocal
+from app.models import PurchaseHistory, UserPurchaseInsight
+from app.services.llm_cache import MemoryCache
+from app.services.purchase_insights import (
+    PURCHASE_SUMMARY_BATCH_SIZE,
+    get_purchase_summary,
+    iter_purchase_summaries,
+)
+
+INSIGHTS_CACHE_MAX_ENTRIES = int(os.getenv("INSIGHTS_CACHE_MAX_ENTRIES", "50000"))
+# 다른 워커가 갱신한 스냅샷이 반영되기까지의 최대 지연
+INSIGHTS_CACHE_TTL_SECONDS = float(os.getenv("INSIGHTS_CACHE_TTL_SECONDS", "60"))
+INSIGHTS_REFRESH_ENABLED = os.getenv("INSIGHTS_REFRESH_ENABLED", "1") == "1"
+INSIGHTS_POLL_INTERVAL_SECONDS = float(os.getenv("INSIGHTS_POLL_INTERVAL_SECONDS", "30"))
+# 스냅샷을 만들 수 있는 분석 기간 범위 (기간마다 사용자별 스냅샷이 따로 저장되고 매일 갱신됨)
+INSIGHTS_MIN_PERIOD_DAYS = 1
+INSIGHTS_MAX_PERIOD_DAYS = int(os.getenv("INSIGHTS_MAX_PERIOD_DAYS", "365"))
+# 백그라운드 갱신 잠금 키 (pg_try_advisory_lock)
+INSIGHTS_REFRESH_LOCK_KEY = 724_001
+
+SnapshotKey = Tuple[int, int]
+
+logger = logging.getLogger(__name__)
+
+
+def _upsert_statement(db: AsyncSession, values: Union[Dict[str, Any], List[Dict[str, Any]]]):
+    """(user_id, period_days) 기준 INSERT ... ON CONFLICT DO UPDATE (여러 행이면 한 문장으로)"""
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(UserPurchaseInsight).values(values)
+    return stmt.on_conflict_do_update(
+        index_elements=[UserPurchaseInsight.user_id, UserPurchaseInsight.period_days],
+        set_={
+            "summary": stmt.excluded.summary,
+            "last_purchase_id": stmt.excluded.last_purchase_id,
+            "computed_at": stmt.excluded.computed_at,
+        }
+    )
+
+
+def _valid_period():
+    """갱신 대상 분석 기간 조건 (범위 밖의 예전 스냅샷은 갱신하지 않음)"""
+    return UserPurchaseInsight.period_days.between(INSIGHTS_MIN_PERIOD_DAYS, INSIGHTS_MAX_PERIOD_DAYS)
+
+
+class InsightSnapshotStore:
+    """구매 인사이트 스냅샷 조회/갱신"""
+
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self.session_factory = session_factory
+        self.cache = MemoryCache(INSIGHTS_CACHE_MAX_ENTRIES, INSIGHTS_CACHE_TTL_SECONDS)
+        # 같은 사용자에 대한 동시 계산을 하나로 합침
+        self._inflight: Dict[SnapshotKey, asyncio.Future] = {}
+        # 증분 갱신 기준 (이 ID 이후의 구매만 확인)
+        self.watermark: Optional[int] = None
+        self.refreshed_on: Optional[date] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _cache_key(user_id: int, period_days: int) -> str:
+        return f"{user_id}:{period_days}"
+
+    # ============ 조회 ============
+
+    async def get(self, db: AsyncSession, user_id: int, period_days: int = 30) -> Optional[Dict[str, Any]]:
+        """
+        구매 요약 조회 (캐시 → 스냅샷 기본 키 조회 → 없으면 계산)
+
+        Returns:
+            구매 요약 정보 (사용자가 없으면 None)
+        """
+        cache_key = self._cache_key(user_id, period_days)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        key = (user_id, period_days)
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            summary = await self._load(db, user_id, period_days)
+            future.set_result(summary)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 기다리는 요청이 없어도 "exception was never retrieved" 경고가 나지 않도록
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+        if summary is not None:
+            self.cache.set(cache_key, summary)
+        return summary
+
+    async def _load(self, db: AsyncSession, user_id: int, period_days: int) -> Optional[Dict[str, Any]]:
+        try:
+            snapshot = await db.get(UserPurchaseInsight, (user_id, period_days))
+        except SQLAlchemyError as e:
+            # 스냅샷 테이블이 아직 없는 DB 등: 직접 계산
+            logger.warning("⚠️  구매 인사이트 스냅샷 조회 실패, 직접 계산: %s", e)
+            await db.rollback()
+            return await get_purchase_summary(db, user_id, period_days)
+
+        if snapshot is not None and snapshot.computed_at.date() == date.today():
+            return json.loads(snapshot.summary)
+        return await self.compute(db, user_id, period_days)
+
+    # ============ 계산/저장 ============
+
+    async def compute(self, db: AsyncSession, user_id: int, period_days: int) -> Optional[Dict[str, Any]]:
+        """구매 요약을 다시 계산해 스냅샷으로 저장"""
+        # 요약보다 먼저 읽어서, 계산 중 들어온 구매는 다음 증분 갱신에서 다시 반영되도록 함
+        last_purchase_id = await db.scalar(
+            select(func.coalesce(func.max(PurchaseHistory.purchase_id), 0))
+            .where(PurchaseHistory.user_id == user_id)
+        )
+        summary = await get_purchase_summary(db, user_id, period_days)
+        if summary is None:
+            return None
+
+        await db.execute(_upsert_statement(db, {
+            "user_id": user_id,
+            "period_days": period_days,
+            "summary": json.dumps(summary, ensure_ascii=False),
+            "last_purchase_id": last_purchase_id,
+            "computed_at": datetime.now(),
+        }))
+        await db.commit()
+        self.cache.set(self._cache_key(user_id, period_days), summary)
+        return summary
+
+    async def _recompute(self, db: AsyncSession, keys: List[SnapshotKey]) -> int:
+        """
+        스냅샷 일괄 재계산
+
+        분석 기간별로 PURCHASE_SUMMARY_BATCH_SIZE명씩 집계 쿼리 한 번으로 계산하고 한 문장으로 저장합니다.
+        """
+        user_ids_by_period: Dict[int, List[int]] = {}
+        for user_id, period_days in keys:
+            user_ids_by_period.setdefault(period_days, []).append(user_id)
+
+        refreshed = 0
+        for period_days, user_ids in user_ids_by_period.items():
+            for offset in range(0, len(user_ids), PURCHASE_SUMMARY_BATCH_SIZE):
+                chunk = user_ids[offset:offset + PURCHASE_SUMMARY_BATCH_SIZE]
+                # 요약보다 먼저 읽어서, 계산 중 들어온 구매는 다음 증분 갱신에서 다시 반영되도록 함
+                last_purchase_ids = dict((await db.execute(
+                    select(PurchaseHistory.user_id, func.max(PurchaseHistory.purchase_id))
+                    .where(PurchaseHistory.user_id.in_(chunk))
+                    .group_by(PurchaseHistory.user_id)
+                )).all())
+                computed_at = datetime.now()
+                summaries = [
+                    (user_id, summary)
+                    async for user_id, summary in iter_purchase_summaries(db, chunk, period_days)
+                    if summary is not None
+                ]
+                if not summaries:
+                    continue
+                await db.execute(_upsert_statement(db, [
+                    {
+                        "user_id": user_id,
+                        "period_days": period_days,
+                        "summary": json.dumps(summary, ensure_ascii=False),
+                        "last_purchase_id": last_purchase_ids.get(user_id, 0),
+                        "computed_at": computed_at,
+                    }
+                    for user_id, summary in summaries
+                ]))
+                await db.commit()
+                for user_id, summary in summaries:
+                    self.cache.set(self._cache_key(user_id, period_days), summary)
+                refreshed += len(summaries)
+        return refreshed
+
+    # ============ 백그라운드 갱신 ============
+
+    async def refresh_new_purchases(self) -> int:
+        """
+        마지막 확인 이후 구매가 생긴 사용자의 스냅샷만 다시 계산
+
+        처음 실행할 때는 스냅샷에 저장된 last_purchase_id의 최댓값을 워터마크로 사용합니다.
+        스냅샷마다 계산 시점의 마지막 구매 ID가 저장되므로, 서버가 꺼져 있던 동안의 구매는 모두 이보다 큰 ID이고
+        구매이력 전체를 집계하지 않고 purchase_id 범위 조회로 찾습니다.
+        늦게 커밋된 트랜잭션처럼 워터마크보다 작은 ID로 들어온 구매는 일일 갱신에서 반영됩니다.
+
+        Returns:
+            다시 계산한 스냅샷 수
+        """
+        async with self.session_factory() as db:
+            latest_id = await db.scalar(select(func.coalesce(func.max(PurchaseHistory.purchase_id), 0)))
+            if self.watermark is None:
+                self.watermark = await db.scalar(
+                    select(func.coalesce(func.max(UserPurchaseInsight.last_purchase_id), 0)).where(_valid_period())
+                )
+            if latest_id <= self.watermark:
+                return 0
+
+            changed_users = select(distinct(PurchaseHistory.user_id)).where(
+                PurchaseHistory.purchase_id > self.watermark,
+                PurchaseHistory.purchase_id <= latest_id
+            )
+            stale = select(UserPurchaseInsight.user_id, UserPurchaseInsight.period_days).where(
+                UserPurchaseInsight.user_id.in_(changed_users),
+                _valid_period()
+            )
+            keys = [tuple(row) for row in await db.execute(stale)]
+            refreshed = await self._recompute(db, keys)
+            self.watermark = latest_id
+            return refreshed
+
+    async def refresh_daily(self) -> int:
+        """
+        오늘 계산되지 않은 스냅샷을 모두 다시 계산 (시간 가중치 구간 재적용)
+
+        Returns:
+            다시 계산한 스냅샷 수
+        """
+        today = date.today()
+        async with self.session_factory() as db:
+            today_start = datetime.combine(today, datetime.min.time())
+            stale = select(UserPurchaseInsight.user_id, UserPurchaseInsight.period_days).where(
+                UserPurchaseInsight.computed_at < today_start,
+                _valid_period()
+            )
+            keys = [tuple(row) for row in await db.execute(stale)]
+            refreshed = await self._recompute(db, keys)
+        self.refreshed_on = today
+        return refreshed
+
+    @asynccontextmanager
+    async def refresh_lock(self) -> AsyncIterator[bool]:
+        """
+        여러 워커 중 하나만 백그라운드 갱신을 실행하기 위한 잠금 (잡았으면 True)
+
+        PostgreSQL은 advisory lock, 그 외(SQLite)는 DB URL별 파일 잠금을 사용하며,
+        잠금을 잡은 워커가 종료되면 자동으로 풀립니다.
+        """
+        async with self.session_factory() as db:
+            if db.bind.dialect.name == "postgresql":
+                acquired = bool(await db.scalar(select(func.pg_try_advisory_lock(INSIGHTS_REFRESH_LOCK_KEY))))
+                try:
+                    yield acquired
+                finally:
+                    if acquired:
+                        await db.scalar(select(func.pg_advisory_unlock(INSIGHTS_REFRESH_LOCK_KEY)))
+                return
+            url = db.bind.url.render_as_string(hide_password=True)
+
+        try:
+            import fcntl
+        except ImportError:
+            # 파일 잠금을 쓸 수 없는 환경 (단일 워커로 실행하거나 INSIGHTS_REFRESH_ENABLED=0으로 조정)
+            yield True
+            return
+        digest = hashlib.sha1(url.encode("utf-8")).hexdigest()[:12]
+        path = os.path.join(tempfile.gettempdir(), f"freshmind-insights-{digest}.lock")
+        with open(path, "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    async def refresh(self) -> None:
+        """일일 갱신(날짜가 바뀌었을 때) + 증분 갱신 한 번 (잠금을 잡지 못하면 건너뜀)"""
+        async with self.refresh_lock() as acquired:
+            if not acquired:
+                return
+            if self.refreshed_on != date.today():
+                refreshed = await self.refresh_daily()
+                logger.info("🔄 구매 인사이트 일일 갱신: %d건", refreshed)
+            refreshed = await self.refresh_new_purchases()
+            if refreshed:
+                logger.info("🔄 구매 인사이트 증분 갱신: %d건", refreshed)
+
+    async def run(self) -> None:
+        """백그라운드 갱신 루프"""
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("⚠️  구매 인사이트 갱신 실패: %s", e)
+            await asyncio.sleep(INSIGHTS_POLL_INTERVAL_SECONDS)
+
+    def start(self) -> None:
+        """백그라운드 갱신 시작 (INSIGHTS_REFRESH_ENABLED=0이면 사용 안 함)"""
+        if INSIGHTS_REFRESH_ENABLED and self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """백그라운드 갱신 종료"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+insight_snapshots = InsightSnapshotStore()
+
+
+async def get_purchase_summary_snapshot(db: AsyncSession, user_id: int, period_days: int = 30) -> Optional[Dict[str, Any]]:
+    """스냅샷 기반 구매 요약 조회"""
+    return await insight_snapshots.get(db, user_id, period_days)
@@ -0,0 +1,360 @@
+"""
+비동기 LLM 클라이언트 계층
+
+OpenAI / Gemini 호출을 이벤트 루프를 막지 않는 비동기 방식으로 수행합니다.
+- OpenAI: 공유 HTTP 커넥션 풀을 사용하는 AsyncOpenAI
+- Gemini: generate_content_async
+- 토큰 스트리밍 (stream_text)
+- 제공자별 동시 요청 수 제한(세마포어) 및 타임아웃
+- secret.json과 제공자 클라이언트는 ProviderRegistry에 캐시
+- 대기/호출/파싱 시간과 호출 결과를 메트릭으로 기록
+"""
+import os
+import json
+import time
+import asyncio
+from typing import Dict, Any, Literal, Optional, AsyncIterator
+import httpx
+from openai import AsyncOpenAI
+import google.generativeai as genai
+from app.services.observability import span, LLM_CALLS, STAGE_DURATION
+
+# 지원하는 AI 모델 타입 ("local"은 LLM 없이 로컬 엔진만 사용)
+AIModel = Literal["gpt", "gemini", "local"]
+
+OPENAI_MODEL = "gpt-4o-mini"
+GEMINI_MODEL = "gemini-2.0-flash"
+
+# 메트릭 라벨: 모델 타입 → (제공자, 모델명)
+MODEL_LABELS: Dict[str, Dict[str, str]] = {
+    "gpt": {"provider": "openai", "model": OPENAI_MODEL},
+    "gemini": {"provider": "google", "model": GEMINI_MODEL},
+    "local": {"provider": "local", "model": "local"},
+}
+
+# 환경 변수로 조정 가능한 설정
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "20"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "32"))
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "32"))
+
+# secret.json 경로 캐싱
+_secret_path = None
+
+
+def get_secret_path():
+    """secret.json 파일 경로를 반환합니다 (SECRET_JSON_PATH 환경 변수로 변경 가능)"""
+    global _secret_path
+    if _secret_path is None and os.getenv("SECRET_JSON_PATH"):
+        _secret_path = os.getenv("SECRET_JSON_PATH")
+    if _secret_path is None:
+        current_file = os.path.abspath(__file__)
+        backend_app_services = os.path.dirname(current_file)
+        backend_app = os.path.dirname(backend_app_services)
+        backend = os.path.dirname(backend_app)
+        project_root = os.path.dirname(backend)
+        _secret_path = os.path.join(project_root, 'secret.json')
+    return _secret_path
+
+
+def load_secrets() -> dict:
+    """secret.json에서 API 키들을 로드합니다 (디스크에서 직접 읽음)"""
+    secret_path = get_secret_path()
+    if not os.path.exists(secret_path):
+        raise FileNotFoundError(f"secret.json not found at {secret_path}")
+    with open(secret_path, 'r') as f:
+        return json.load(f)
+
+
+class _LoopResources:
+    """이벤트 루프별 공유 자원 (HTTP 커넥션 풀, 제공자별 세마포어, OpenAI 클라이언트)"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_MAX_CONNECTIONS
+            ),
+            timeout=httpx.Timeout(LLM_TIMEOUT_SECONDS, connect=5.0)
+        )
+        self.semaphores: Dict[str, asyncio.Semaphore] = {
+            "gpt": asyncio.Semaphore(OPENAI_MAX_CONCURRENCY),
+            "gemini": asyncio.Semaphore(GEMINI_MAX_CONCURRENCY),
+        }
+        self.openai_client: Optional[AsyncOpenAI] = None
+
+
+class ProviderRegistry:
+    """
+    프로세스 전역 LLM 제공자 레지스트리
+
+    secret.json은 한 번만 읽고, 제공자 클라이언트는 재사용합니다.
+    secret.json이 바뀌면 reload()로 다시 읽습니다.
+    """
+
+    def __init__(self):
+        self._secrets: Optional[dict] = None
+        self._secrets_mtime: Optional[float] = None
+        self._gemini_model = None
+        self._resources: Optional[_LoopResources] = None
+
+    def secrets(self) -> dict:
+        """캐시된 API 키 반환 (최초 호출 시 로드)"""
+        if self._secrets is None:
+            self._secrets = load_secrets()
+            self._secrets_mtime = os.path.getmtime(get_secret_path())
+        return self._secrets
+
+    def resources(self) -> _LoopResources:
+        """현재 이벤트 루프에 묶인 공유 자원 반환 (루프가 바뀌면 새로 생성)"""
+        loop = asyncio.get_running_loop()
+        if self._resources is None or self._resources.loop is not loop:
+            self._resources = _LoopResources(loop)
+        return self._resources
+
+    def openai(self) -> AsyncOpenAI:
+        """공유 커넥션 풀을 사용하는 비동기 OpenAI 클라이언트 반환"""
+        resources = self.resources()
+        if resources.openai_client is None:
+            api_key = self.secrets().get('openai_api_key')
+            if not api_key:
+                raise ValueError("OpenAI API key not found in secret.json")
+            resources.openai_client = AsyncOpenAI(
+                api_key=api_key,
+                http_client=resources.http_client,
+                timeout=LLM_TIMEOUT_SECONDS
+            )
+        return resources.openai_client
+
+    def gemini(self):
+        """Gemini 모델 반환 (genai.configure는 한 번만 호출)"""
+        if self._gemini_model is None:
+            api_key = self.secrets().get('googleai_api_key')
+            if not api_key:
+                raise ValueError("Google AI API key not found in secret.json")
+            genai.configure(api_key=api_key)
+            self._gemini_model = genai.GenerativeModel(GEMINI_MODEL)
+        return self._gemini_model
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        secret.json이 바뀌었으면 키와 클라이언트를 다시 만듭니다.
+
+        HTTP 커넥션 풀은 유지됩니다.
+
+        Returns:
+            다시 로드했는지 여부
+        """
+        if not force and self._secrets is not None:
+            try:
+                if os.path.getmtime(get_secret_path()) == self._secrets_mtime:
+                    return False
+            except OSError:
+                pass
+        self._secrets = None
+        self._secrets_mtime = None
+        self._gemini_model = None
+        if self._resources is not None:
+            self._resources.openai_client = None
+        return True
+
+    async def close(self) -> None:
+        """공유 HTTP 커넥션 풀 종료"""
+        if self._resources is not None:
+            await self._resources.http_client.aclose()
+            self._resources = None
+
+
+providers = ProviderRegistry()
+
+
+async def close_llm_clients() -> None:
+    """공유 HTTP 커넥션 풀 종료 (서버 종료 시 호출)"""
+    await providers.close()
+
+
+def reload_providers(force: bool = False) -> bool:
+    """secret.json 변경 시 제공자 키/클라이언트 다시 로드"""
+    return providers.reload(force=force)
+
+
+def get_openai_client() -> AsyncOpenAI:
+    """OpenAI 클라이언트 반환"""
+    return providers.openai()
+
+
+def get_gemini_client():
+    """Gemini 클라이언트 반환"""
+    return providers.gemini()
+
+
+# ============ 호출 ============
+
+async def _call_openai(prompt: str, system: str, temperature: float, json_mode: bool) -> str:
+    client = get_openai_client()
+    kwargs: Dict[str, Any] = {}
+    if json_mode:
+        kwargs["response_format"] = {"type": "json_object"}
+    response = await client.chat.completions.create(
+        model=OPENAI_MODEL,
+        messages=[
+            {"role": "system", "content": system},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=temperature,
+        **kwargs
+    )
+    return response.choices[0].message.content
+
+
+async def _call_gemini(prompt: str, temperature: float, json_mode: bool) -> str:
+    client = get_gemini_client()
+    config_kwargs: Dict[str, Any] = {"temperature": temperature}
+    if json_mode:
+        config_kwargs["response_mime_type"] = "application/json"
+    response = await client.generate_content_async(
+        prompt,
+        generation_config=genai.types.GenerationConfig(**config_kwargs)
+    )
+    return response.text
+
+
+async def generate(
+    model: AIModel,
+    prompt: str,
+    system: str,
+    temperature: float,
+    json_mode: bool = False
+) -> str:
+    """
+    LLM 호출 (비동기)
+
+    제공자별 동시 요청 수를 제한하고, LLM_TIMEOUT_SECONDS를 넘기면 asyncio.TimeoutError를 발생시킵니다.
+    Gemini는 system 프롬프트를 사용하지 않습니다.
+    """
+    labels = MODEL_LABELS[model]
+    semaphore = providers.resources().semaphores[model]
+    with span("llm_queue", **labels):
+        await semaphore.acquire()
+    outcome = "error"
+    try:
+        with span("llm_call", **labels):
+            if model == "gpt":
+                call = _call_openai(prompt, system, temperature, json_mode)
+            else:
+                call = _call_gemini(prompt, temperature, json_mode)
+            result = await asyncio.wait_for(call, timeout=LLM_TIMEOUT_SECONDS)
+        outcome = "ok"
+        return result
+    except asyncio.TimeoutError:
+        outcome = "timeout"
+        raise
+    except asyncio.CancelledError:
+        outcome = "cancelled"
+        raise
+    finally:
+        semaphore.release()
+        LLM_CALLS.labels(labels["provider"], labels["model"], outcome).inc()
+
+
+async def generate_json(model: AIModel, prompt: str, system: str, temperature: float) -> Dict[str, Any]:
+    """JSON 응답 모드로 LLM을 호출하고 파싱된 결과를 반환"""
+    text = await generate(model, prompt, system, temperature, json_mode=True)
+    with span("response_parse", **MODEL_LABELS[model]):
+        return json.loads(text)
+
+
+async def generate_text(model: AIModel, prompt: str, system: str, temperature: float) -> str:
+    """일반 텍스트 응답 생성"""
+    return (await generate(model, prompt, system, temperature)).strip()
+
+
+# ============ 스트리밍 ============
+
+async def _stream_openai(prompt: str, system: str, temperature: float, json_mode: bool) -> AsyncIterator[str]:
+    client = get_openai_client()
+    kwargs: Dict[str, Any] = {}
+    if json_mode:
+        kwargs["response_format"] = {"type": "json_object"}
+    stream = await client.chat.completions.create(
+        model=OPENAI_MODEL,
+        messages=[
+            {"role": "system", "content": system},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=temperature,
+        stream=True,
+        **kwargs
+    )
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+async def _stream_gemini(prompt: str, temperature: float, json_mode: bool) -> AsyncIterator[str]:
+    client = get_gemini_client()
+    config_kwargs: Dict[str, Any] = {"temperature": temperature}
+    if json_mode:
+        config_kwargs["response_mime_type"] = "application/json"
+    response = await client.generate_content_async(
+        prompt,
+        generation_config=genai.types.GenerationConfig(**config_kwargs),
+        stream=True
+    )
+    async for chunk in response:
+        if chunk.text:
+            yield chunk.text
+
+
+async def stream_text(
+    model: AIModel,
+    prompt: str,
+    system: str,
+    temperature: float,
+    json_mode: bool = False
+) -> AsyncIterator[str]:
+    """
+    텍스트 응답을 토큰(청크) 단위로 스트리밍 (json_mode면 JSON 응답 모드)
+
+    청크 사이 대기 시간이 LLM_TIMEOUT_SECONDS를 넘기면 asyncio.TimeoutError를 발생시킵니다.
+    스트림이 끝날 때까지 제공자 세마포어를 점유합니다.
+    첫 청크까지의 시간(llm_first_token)과 전체 스트림 시간(llm_stream)을 기록합니다.
+    """
+    labels = MODEL_LABELS[model]
+    semaphore = providers.resources().semaphores[model]
+    with span("llm_queue", **labels):
+        await semaphore.acquire()
+    outcome = "error"
+    started = time.perf_counter()
+    first_token = True
+    try:
+        with span("llm_stream", **labels):
+            if model == "gpt":
+                chunks = _stream_openai(prompt, system, temperature, json_mode)
+            else:
+                chunks = _stream_gemini(prompt, temperature, json_mode)
+            try:
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), timeout=LLM_TIMEOUT_SECONDS)
+                    except StopAsyncIteration:
+                        break
+                    if first_token:
+                        first_token = False
+                        STAGE_DURATION.labels("llm_first_token", labels["provider"], labels["model"], "none").observe(
+                            time.perf_counter() - started
+                        )
+                    yield chunk
+            finally:
+                await chunks.aclose()
+        outcome = "ok"
+    except asyncio.TimeoutError:
+        outcome = "timeout"
+        raise
+    except (asyncio.CancelledError, GeneratorExit):
+        outcome = "cancelled"
+        raise
+    finally:
+        semaphore.release()
+        LLM_CALLS.labels(labels["provider"], labels["model"], outcome).inc()
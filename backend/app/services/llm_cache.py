@@ -0,0 +1,236 @@
+"""
+LLM 응답 캐시
+
+거의 같은 메시지("밀키트 추천해줘" / "밀키트 추천 좀")에 대해 LLM을 다시 호출하지 않도록
+정규화된 메시지 + 프로필 버킷 + 카탈로그 버전으로 결과를 캐시합니다.
+
+- 1차: 프로세스 내 LRU/TTL 캐시
+- 2차(선택): SQLite 디스크 캐시 (LLM_CACHE_SQLITE_PATH 지정 시)
+"""
+import os
+import re
+import json
+import hashlib
+import time
+import asyncio
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from app.services.observability import CACHE_REQUESTS
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "3600"))
+LLM_CACHE_SQLITE_PATH = os.getenv("LLM_CACHE_SQLITE_PATH", "")
+
+# 의미 없이 붙는 요청/완곡 표현 (캐시 키에서 제거)
+_FILLER_TOKENS = {
+    '좀', '조금', '해줘', '해줘요', '해주세요', '해주라', '줘', '줘요', '주세요',
+    '부탁해', '부탁해요', '부탁드려요', '해봐', '해줄래', '해줄래요', '있어', '있어요',
+    'please', 'pls',
+}
+# 어미만 다른 동사형을 같은 키로 묶기 위한 접두어
+_STEM_PREFIXES = ('추천',)
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+# 키 구성(정규화 규칙)이 바뀌면 올려서 디스크 캐시의 이전 키를 무시
+CACHE_KEY_VERSION = "2"
+
+
+def normalize_message(message: str) -> str:
+    """
+    캐시 키용 메시지 정규화
+
+    소문자화, 문장부호 제거, 요청 표현 제거, "추천해줘"/"추천 좀" 같은 변형을 통합합니다.
+    어순은 의미를 바꿀 수 있으므로("고기 말고 채소" / "채소 말고 고기") 토큰 순서는 유지합니다.
+    """
+    tokens = _PUNCTUATION.sub(" ", message.lower()).split()
+    normalized = []
+    for token in tokens:
+        if token in _FILLER_TOKENS:
+            continue
+        for prefix in _STEM_PREFIXES:
+            if token.startswith(prefix):
+                token = prefix
+                break
+        normalized.append(token)
+    return " ".join(normalized)
+
+
+def profile_bucket(user_profile: Dict[str, Any]) -> str:
+    """캐시 키용 프로필 버킷 (성별/연령대)"""
+    gender = user_profile.get('gender') or 'U'
+    age_group = user_profile.get('ageGroup') or ''
+    return f"{gender}:{age_group}"
+
+
+def history_bucket(purchase_history: List[Dict[str, Any]]) -> str:
+    """캐시 키용 구매이력 버킷 (구매한 상품 ID 집합의 해시, 구매이력이 없으면 빈 문자열)"""
+    product_ids = sorted({
+        str(item.get('productId', item.get('product_id')))
+        for item in purchase_history
+        if item.get('productId', item.get('product_id')) is not None
+    })
+    if not product_ids:
+        return ""
+    return hashlib.sha1(json.dumps(product_ids).encode("utf-8")).hexdigest()[:12]
+
+
+# ============ 캐시 계층 ============
+
+class MemoryCache:
+    """프로세스 내 LRU + TTL 캐시"""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCache:
+    """SQLite 기반 디스크 캐시 (프로세스 재시작/워커 간 공유)"""
+
+    name = "sqlite"
+
+    def __init__(self, path: str, ttl_seconds: float):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "cache_key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM llm_cache WHERE cache_key = ?", (key,)
+            ).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (cache_key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), time.time() + self.ttl_seconds)
+            )
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+
+class ResponseCache:
+    """
+    다단계 LLM 응답 캐시
+
+    메모리 계층을 먼저 조회하고, 없으면 디스크 계층을 조회해 메모리에 다시 채웁니다.
+    네임스페이스(intent, sentiment, recommendation)별 적중/실패 횟수를 기록합니다.
+    """
+
+    def __init__(self, memory: MemoryCache, disk: Optional[SQLiteCache] = None, enabled: bool = True):
+        self.memory = memory
+        self.disk = disk
+        self.enabled = enabled
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    @staticmethod
+    def make_key(namespace: str, *parts: Any) -> str:
+        return "|".join([f"v{CACHE_KEY_VERSION}", namespace] + [str(p) for p in parts])
+
+    def _count(self, namespace: str, field: str) -> None:
+        stats = self._stats.setdefault(namespace, {"memory_hits": 0, "disk_hits": 0, "misses": 0, "sets": 0})
+        stats[field] += 1
+        CACHE_REQUESTS.labels(namespace, field).inc()
+
+    async def get(self, namespace: str, *parts: Any) -> Optional[Any]:
+        """캐시 조회 (메모리 적중 시 스레드 전환 없이 바로 반환)"""
+        if not self.enabled:
+            return None
+        key = self.make_key(namespace, *parts)
+        value = self.memory.get(key)
+        if value is not None:
+            self._count(namespace, "memory_hits")
+            return value
+        if self.disk is not None:
+            value = await asyncio.to_thread(self.disk.get, key)
+            if value is not None:
+                self.memory.set(key, value)
+                self._count(namespace, "disk_hits")
+                return value
+        self._count(namespace, "misses")
+        return None
+
+    async def set(self, namespace: str, parts: List[Any], value: Any) -> None:
+        """캐시 저장 (value는 JSON 직렬화 가능해야 함)"""
+        if not self.enabled:
+            return
+        key = self.make_key(namespace, *parts)
+        self.memory.set(key, value)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, key, value)
+        self._count(namespace, "sets")
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """네임스페이스별 적중률 통계"""
+        namespaces = {}
+        for namespace, stats in self._stats.items():
+            hits = stats["memory_hits"] + stats["disk_hits"]
+            total = hits + stats["misses"]
+            namespaces[namespace] = dict(stats, hit_rate=round(hits / total, 4) if total else 0.0)
+        return {
+            "enabled": self.enabled,
+            "memory_entries": len(self.memory),
+            "disk_enabled": self.disk is not None,
+            "namespaces": namespaces,
+        }
+
+
+def _build_default_cache() -> ResponseCache:
+    disk = SQLiteCache(LLM_CACHE_SQLITE_PATH, LLM_CACHE_TTL_SECONDS) if LLM_CACHE_SQLITE_PATH else None
+    return ResponseCache(
+        MemoryCache(LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL_SECONDS),
+        disk=disk,
+        enabled=LLM_CACHE_ENABLED
+    )
+
+
+response_cache = _build_default_cache()
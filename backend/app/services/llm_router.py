@@ -0,0 +1,268 @@
+"""
+LLM 제공자 라우팅 / 헤지 요청 / 요청 지연 예산
+
+- 제공자(gpt, gemini)별 지연 시간 EWMA, 오류율 EWMA, 최근 지연 시간 분포(p90)를 추적
+- 요청한 제공자보다 다른 제공자의 예상 응답 시간이 확실히 짧으면 그쪽을 먼저 호출
+- 첫 호출이 해당 제공자의 p90을 넘기면 다른 제공자로 헤지 요청을 보내고, 먼저 성공한 응답을 사용
+  (진 쪽은 취소, 첫 호출이 실패하면 바로 다른 제공자로 재시도)
+- request_deadline()으로 설정한 요청 지연 예산을 넘기면 asyncio.TimeoutError
+  (예산은 요청마다 달라지므로 헤지 시점과 제공자 통계에는 반영하지 않음)
+
+API 키가 없는 제공자는 헤지 대상에서 제외됩니다.
+"""
+import os
+import time
+import random
+import asyncio
+import logging
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterator, List, Optional
+from app.services.llm import AIModel, providers, generate_json, generate_text
+from app.services.observability import LLM_HEDGES
+
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "1") == "1"
+# 샘플이 충분하지 않을 때 헤지 요청까지 기다리는 시간
+LLM_HEDGE_DEFAULT_DELAY_MS = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY_MS", "2000"))
+LLM_HEDGE_MIN_DELAY_MS = float(os.getenv("LLM_HEDGE_MIN_DELAY_MS", "100"))
+LLM_HEDGE_QUANTILE = float(os.getenv("LLM_HEDGE_QUANTILE", "0.9"))
+LLM_ROUTER_WINDOW = int(os.getenv("LLM_ROUTER_WINDOW", "200"))
+LLM_ROUTER_MIN_SAMPLES = int(os.getenv("LLM_ROUTER_MIN_SAMPLES", "20"))
+LLM_ROUTER_EWMA_ALPHA = float(os.getenv("LLM_ROUTER_EWMA_ALPHA", "0.2"))
+# 다른 제공자의 예상 응답 시간이 이 배수만큼 짧아야 먼저 호출 (잦은 전환 방지)
+LLM_ROUTER_SWITCH_RATIO = float(os.getenv("LLM_ROUTER_SWITCH_RATIO", "1.5"))
+# 순서를 바꾼 상태에서도 요청한 제공자를 먼저 호출하는 비율 (회복 여부 확인용)
+LLM_ROUTER_PROBE_RATE = float(os.getenv("LLM_ROUTER_PROBE_RATE", "0.05"))
+# 요청 전체 LLM 지연 예산 기본값 (ms, 0이면 제한 없음)
+CHAT_LATENCY_BUDGET_MS = int(os.getenv("CHAT_LATENCY_BUDGET_MS", "0"))
+
+ROUTABLE_MODELS = ("gpt", "gemini")
+API_KEY_NAMES = {"gpt": "openai_api_key", "gemini": "googleai_api_key"}
+
+logger = logging.getLogger(__name__)
+
+
+# ============ 요청 지연 예산 ============
+
+# 현재 요청의 LLM 응답 마감 시각 (time.monotonic 기준)
+_deadline: ContextVar[Optional[float]] = ContextVar("llm_deadline", default=None)
+
+
+@contextmanager
+def request_deadline(budget_ms: Optional[int] = None) -> Iterator[Optional[float]]:
+    """
+    블록 안(같은 컨텍스트에서 만든 태스크 포함)의 라우팅된 LLM 호출에 지연 예산 적용
+
+    budget_ms가 없으면 CHAT_LATENCY_BUDGET_MS를 사용하고, 0이면 제한 없음
+    """
+    if budget_ms is None:
+        budget_ms = CHAT_LATENCY_BUDGET_MS
+    deadline = time.monotonic() + budget_ms / 1000 if budget_ms else None
+    token = _deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _deadline.reset(token)
+
+
+# ============ 제공자 통계 ============
+
+class ProviderStats:
+    """제공자별 지연 시간 / 오류율 추적"""
+
+    def __init__(self, window: int = LLM_ROUTER_WINDOW, alpha: float = LLM_ROUTER_EWMA_ALPHA):
+        self.alpha = alpha
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.ewma_latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.calls = 0
+        self.errors = 0
+
+    def _observe_latency(self, seconds: float) -> None:
+        self.latencies.append(seconds)
+        if self.ewma_latency is None:
+            self.ewma_latency = seconds
+        else:
+            self.ewma_latency += self.alpha * (seconds - self.ewma_latency)
+
+    def record_success(self, seconds: float) -> None:
+        self.calls += 1
+        self._observe_latency(seconds)
+        self.error_rate -= self.alpha * self.error_rate
+
+    def record_failure(self) -> None:
+        self.calls += 1
+        self.errors += 1
+        self.error_rate += self.alpha * (1.0 - self.error_rate)
+
+    def record_abandoned(self, seconds: float) -> None:
+        """
+        헤지에서 져서 취소된 호출
+
+        실제 지연은 최소 seconds 이상이므로 그 값을 지연 시간으로 반영합니다.
+        (느려진 제공자가 계속 취소되기만 하고 통계에는 안 잡히는 일을 막음)
+        """
+        self._observe_latency(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if len(self.latencies) < LLM_ROUTER_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def hedge_delay(self) -> float:
+        """헤지 요청까지 기다릴 시간 (초)"""
+        delay = self.quantile(LLM_HEDGE_QUANTILE)
+        if delay is None:
+            delay = LLM_HEDGE_DEFAULT_DELAY_MS / 1000
+        return max(delay, LLM_HEDGE_MIN_DELAY_MS / 1000)
+
+    def expected_latency(self) -> Optional[float]:
+        """성공 응답까지의 예상 시간 (오류율만큼 재시도한다고 가정)"""
+        if self.ewma_latency is None or len(self.latencies) < LLM_ROUTER_MIN_SAMPLES:
+            return None
+        return self.ewma_latency / max(0.05, 1.0 - self.error_rate)
+
+    def snapshot(self) -> Dict[str, Any]:
+        p90 = self.quantile(0.9)
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "error_rate": round(self.error_rate, 4),
+            "ewma_latency_ms": None if self.ewma_latency is None else round(self.ewma_latency * 1000, 1),
+            "p90_ms": None if p90 is None else round(p90 * 1000, 1),
+            "hedge_delay_ms": round(self.hedge_delay() * 1000, 1),
+            "samples": len(self.latencies),
+        }
+
+
+# ============ 라우터 ============
+
+class LLMRouter:
+    """제공자 선택 및 헤지 요청"""
+
+    def __init__(self):
+        self.stats: Dict[str, ProviderStats] = {model: ProviderStats() for model in ROUTABLE_MODELS}
+
+    @staticmethod
+    def available(model: str) -> bool:
+        """API 키가 있는 제공자인지 확인"""
+        try:
+            return bool(providers.secrets().get(API_KEY_NAMES[model]))
+        except Exception:
+            return False
+
+    def route(self, preferred: AIModel) -> List[str]:
+        """
+        호출 순서 결정 ([먼저 호출할 제공자, 헤지 대상])
+
+        요청한 제공자를 우선하되, 다른 제공자의 예상 응답 시간이
+        LLM_ROUTER_SWITCH_RATIO배 이상 짧으면 순서를 바꿉니다.
+        바꾼 상태에서도 LLM_ROUTER_PROBE_RATE 비율로는 요청한 제공자를 먼저 호출해 통계를 갱신합니다.
+        """
+        if preferred not in self.stats:
+            return [preferred]
+        alternate = next(m for m in ROUTABLE_MODELS if m != preferred)
+        if not LLM_HEDGE_ENABLED or not self.available(alternate):
+            return [preferred]
+
+        preferred_expected = self.stats[preferred].expected_latency()
+        alternate_expected = self.stats[alternate].expected_latency()
+        if (
+            preferred_expected is not None
+            and alternate_expected is not None
+            and alternate_expected * LLM_ROUTER_SWITCH_RATIO < preferred_expected
+            and random.random() >= LLM_ROUTER_PROBE_RATE
+        ):
+            return [alternate, preferred]
+        return [preferred, alternate]
+
+    async def call(self, preferred: AIModel, make_call: Callable[[str], Awaitable[Any]]) -> Any:
+        """
+        make_call(제공자)를 라우팅/헤지해서 실행하고 먼저 성공한 결과를 반환
+
+        Raises:
+            asyncio.TimeoutError: 요청 지연 예산 초과
+            Exception: 모든 제공자 호출 실패 (마지막 오류)
+        """
+        deadline = _deadline.get()
+        if deadline is not None and deadline <= time.monotonic():
+            raise asyncio.TimeoutError()
+
+        order = self.route(preferred)
+        primary = order[0]
+        hedge = order[1] if len(order) > 1 else None
+        attempts: Dict[asyncio.Task, tuple] = {}
+
+        def launch(model: str) -> None:
+            attempts[asyncio.ensure_future(make_call(model))] = (model, time.monotonic())
+
+        launch(primary)
+        hedge_at = None
+        if hedge is not None and primary in self.stats:
+            # 예산이 짧다고 헤지를 앞당기지 않음 (짧은 예산마다 두 제공자를 호출하게 됨)
+            hedge_at = time.monotonic() + self.stats[primary].hedge_delay()
+
+        last_error: Optional[BaseException] = None
+        winner: Optional[str] = None
+        try:
+            while True:
+                pending = [task for task in attempts if not task.done()]
+                if not pending:
+                    raise last_error
+
+                wake_times = [t for t in (hedge_at, deadline) if t is not None]
+                timeout = max(0.0, min(wake_times) - time.monotonic()) if wake_times else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                for task in done:
+                    model, started = attempts[task]
+                    error = asyncio.CancelledError() if task.cancelled() else task.exception()
+                    stats = self.stats.get(model)
+                    if error is None:
+                        if stats is not None:
+                            stats.record_success(time.monotonic() - started)
+                        winner = model
+                        return task.result()
+                    if stats is not None:
+                        stats.record_failure()
+                    last_error = error
+                    logger.warning("⚠️  LLM 호출 실패 (%s): %s", model, error)
+                    # 먼저 호출한 제공자가 실패하면 헤지 대기 없이 바로 다른 제공자 호출
+                    if hedge_at is not None:
+                        hedge_at = None
+                        launch(hedge)
+
+                now = time.monotonic()
+                if deadline is not None and now >= deadline:
+                    # 요청별 예산 초과는 제공자 오류가 아니므로 통계에 반영하지 않음
+                    raise asyncio.TimeoutError()
+                if hedge_at is not None and now >= hedge_at:
+                    hedge_at = None
+                    launch(hedge)
+        finally:
+            for task, (model, started) in attempts.items():
+                if not task.done():
+                    task.cancel()
+                    if winner is not None and model in self.stats:
+                        self.stats[model].record_abandoned(time.monotonic() - started)
+            if len(attempts) > 1:
+                LLM_HEDGES.labels(primary, hedge, winner or "none").inc()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """제공자별 통계"""
+        return {model: stats.snapshot() for model, stats in self.stats.items()}
+
+
+llm_router = LLMRouter()
+
+
+async def routed_json(model: AIModel, prompt: str, system: str, temperature: float) -> Dict[str, Any]:
+    """generate_json의 라우팅/헤지 버전"""
+    return await llm_router.call(model, lambda m: generate_json(m, prompt, system, temperature))
+
+
+async def routed_text(model: AIModel, prompt: str, system: str, temperature: float) -> str:
+    """generate_text의 라우팅/헤지 버전"""
+    return await llm_router.call(model, lambda m: generate_text(m, prompt, system, temperature))
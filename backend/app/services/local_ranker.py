@@ -0,0 +1,229 @@
+"""
+LLM 없이 동작하는 로컬 추천 엔진
+
+키워드/역색인 매칭, 벡터 유사도, 프로필 타겟팅, 구매이력 선호도를
+카탈로그 전체에 대해 NumPy 벡터 연산으로 합산해 수 ms 안에 추천합니다.
+구매이력 가중치는 purchase_insights와 같은 구간을 사용하고,
+구매 연관 모델(affinity)이 있으면 함께 구매한 상품/카테고리 점수도 더합니다.
+구매이력이 없는 사용자는 세그먼트 인사이트(cohort_insights)를 prior로 사용합니다.
+"""
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+import numpy as np
+from app.services.affinity import AffinityModel, get_affinity_model
+from app.services.cohort_insights import CohortInsight
+from app.services.product_index import ProductIndex
+from app.services.retrieval import ProductRetriever
+from app.services.purchase_insights import history_arrays, purchase_weights, product_scores
+
+# 점수 가중치
+WEIGHT_SIMILARITY = 1.0
+WEIGHT_KEYWORD = 0.6
+WEIGHT_TARGETING = 0.1
+WEIGHT_CATEGORY_AFFINITY = 0.3
+WEIGHT_PRODUCT_AFFINITY = 0.2
+WEIGHT_COPURCHASE = 0.3
+WEIGHT_RELATED_CATEGORY = 0.1
+WEIGHT_COHORT = 0.3
+WEIGHT_COHORT_CATEGORY = 0.2
+WEIGHT_POPULARITY = 0.05
+
+
+def build_ranker_arrays(products: Sequence[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """카테고리 코드, 성별 타겟, 인기도 배열 생성 (스냅샷 빌드 시 저장)"""
+    categories = np.array([p.get('category') or '기타' for p in products], dtype=str)
+    category_names, category_codes = np.unique(categories, return_inverse=True)
+
+    target_genders = [p.get('targetGender', 'all') for p in products]
+    log_reviews = np.log1p(np.array([p.get('reviews', 0) or 0 for p in products], dtype=np.float64))
+    peak = float(log_reviews.max()) if len(log_reviews) else 0.0
+    return {
+        "category_names": category_names,
+        "category_codes": category_codes.astype(np.int32),
+        "targets_male": np.array([g in ('male', 'male-oriented') for g in target_genders], dtype=bool),
+        "targets_female": np.array([g in ('female', 'female-oriented') for g in target_genders], dtype=bool),
+        "popularity": log_reviews / peak if peak > 0 else log_reviews,
+    }
+
+
+class LocalRanker:
+    """카탈로그 단위로 미리 계산한 배열을 사용하는 추천 점수 계산기"""
+
+    def __init__(
+        self,
+        index: ProductIndex,
+        retriever: Optional[ProductRetriever] = None,
+        arrays: Optional[Dict[str, np.ndarray]] = None
+    ):
+        """
+        Args:
+            arrays: 스냅샷에 저장된 카탈로그 배열 (없으면 상품 목록으로 계산)
+        """
+        self.index = index
+        self.retriever = retriever
+        self.arrays = arrays if arrays is not None else build_ranker_arrays(index.products)
+        self.category_names = self.arrays["category_names"]
+        self.category_codes = self.arrays["category_codes"]
+        self.targets_male = self.arrays["targets_male"]
+        self.targets_female = self.arrays["targets_female"]
+        self.popularity = self.arrays["popularity"]
+
+        # 구매 연관 모델의 행 번호 (모델이 바뀌면 다시 계산)
+        self._affinity_model: Optional[AffinityModel] = None
+        self._affinity_positions = np.zeros(0, dtype=np.int64)
+
+    def purchase_affinity(self, purchase_history: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        구매이력으로 상품별/카테고리별 선호도 계산 (0~1 정규화)
+
+        Returns:
+            (상품 선호도 배열, 카탈로그 상품별 카테고리 선호도 배열)
+        """
+        n = len(self.index.products)
+        category_affinity = np.zeros(n, dtype=np.float64)
+
+        product_ids, days_ago, quantities = history_arrays(purchase_history)
+        positions = self.index.positions(product_ids)
+        known = positions >= 0
+        if not known.any():
+            return np.zeros(n, dtype=np.float64), category_affinity
+
+        product_affinity = product_scores(
+            positions[known], purchase_weights(days_ago[known], quantities[known]), n
+        )
+
+        category_scores = np.bincount(self.category_codes, weights=product_affinity, minlength=len(self.category_names))
+        total = category_scores.sum()
+        if total > 0:
+            category_affinity = category_scores[self.category_codes] / total
+        peak = product_affinity.max()
+        if peak > 0:
+            product_affinity /= peak
+        return product_affinity, category_affinity
+
+    def copurchase_affinity(self, purchase_history: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        구매 연관 모델로 계산한 점수 (0~1 정규화, 모델이나 구매이력이 없으면 0)
+
+        Returns:
+            (함께 구매 점수 배열, 연관 카테고리 점수 배열) - 카탈로그 상품 순서
+        """
+        n = len(self.index.products)
+        model = get_affinity_model()
+        if model is None or model.n_items == 0 or not purchase_history:
+            return np.zeros(n), np.zeros(n)
+        if self._affinity_model is not model:
+            self._affinity_positions = model.positions(self.index.product_ids)
+            self._affinity_model = model
+
+        item_scores, category_scores = model.score(purchase_history)
+        known = self._affinity_positions >= 0
+        positions = np.maximum(self._affinity_positions, 0)
+        copurchase = np.where(known, item_scores[positions], 0.0)
+        related_category = np.where(known, category_scores[model.item_categories[positions]], 0.0)
+        return copurchase, related_category
+
+    def cohort_affinity(self, cohort: Optional[CohortInsight]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        세그먼트 인사이트로 만든 prior (미리 계산된 값을 카탈로그 순서로 옮기기만 함)
+
+        Returns:
+            (세그먼트 인기 상품 점수 배열, 카탈로그 상품별 세그먼트 카테고리 선호도 배열)
+        """
+        n = len(self.index.products)
+        if cohort is None:
+            return np.zeros(n), np.zeros(n)
+        cohort_products = np.zeros(n, dtype=np.float64)
+        positions = self.index.positions(cohort.prior_product_ids)
+        known = positions >= 0
+        cohort_products[positions[known]] = cohort.prior_scores[known]
+
+        category_scores = np.array(
+            [cohort.category_preferences.get(name, 0.0) for name in self.category_names.tolist()], dtype=np.float64
+        )
+        return cohort_products, category_scores[self.category_codes]
+
+    def rank(
+        self,
+        message: str,
+        gender: str,
+        age_group: str,
+        purchase_history: List[Dict[str, Any]],
+        limit: int = 5,
+        cohort: Optional[CohortInsight] = None
+    ) -> List[Tuple[Dict[str, Any], float, str]]:
+        """
+        로컬 점수 상위 상품 반환
+
+        Args:
+            cohort: 구매이력이 없을 때 사용할 세그먼트 인사이트
+
+        Returns:
+            (상품, 0~1 관련도, 추천 이유) 목록
+        """
+        n = len(self.index.products)
+        if n == 0:
+            return []
+        allowed = self.index.profile_mask(gender, age_group)
+
+        similarity = self.retriever.scores(message) if self.retriever is not None else np.zeros(n)
+        keyword = self.index.match_mask(message).astype(np.float64)
+        if gender == 'M':
+            targeting = self.targets_male.astype(np.float64)
+        elif gender == 'F':
+            targeting = self.targets_female.astype(np.float64)
+        else:
+            targeting = np.zeros(n)
+        product_affinity, category_affinity = self.purchase_affinity(purchase_history)
+        copurchase, related_category = self.copurchase_affinity(purchase_history)
+        cohort_products, cohort_category = self.cohort_affinity(cohort)
+
+        components = {
+            "similarity": WEIGHT_SIMILARITY * similarity,
+            "keyword": WEIGHT_KEYWORD * keyword,
+            "targeting": WEIGHT_TARGETING * targeting,
+            "category": WEIGHT_CATEGORY_AFFINITY * category_affinity,
+            "repurchase": WEIGHT_PRODUCT_AFFINITY * product_affinity,
+            "copurchase": WEIGHT_COPURCHASE * copurchase,
+            "related_category": WEIGHT_RELATED_CATEGORY * related_category,
+            "cohort": WEIGHT_COHORT * cohort_products,
+            "cohort_category": WEIGHT_COHORT_CATEGORY * cohort_category,
+            "popularity": WEIGHT_POPULARITY * self.popularity,
+        }
+        scores = np.where(allowed, sum(components.values()), -np.inf)
+
+        k = min(limit, int(allowed.sum()))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+
+        best = float(scores[top[0]])
+        results = []
+        for pos in top.tolist():
+            product = self.index.products[pos]
+            # 1위 대비 상대 점수를 0.5~0.95 구간으로 변환
+            relevance = round(0.5 + 0.45 * float(scores[pos]) / best, 2) if best > 0 else 0.5
+            results.append((product, relevance, self._reason(product, {name: values[pos] for name, values in components.items()})))
+        return results
+
+    @staticmethod
+    def _reason(product: Dict[str, Any], contributions: Dict[str, float]) -> str:
+        """가장 크게 기여한 요소로 추천 이유 생성"""
+        top_factor = max(contributions, key=contributions.get)
+        if top_factor in ("similarity", "keyword"):
+            return "요청하신 내용과 잘 맞는 상품이에요."
+        if top_factor == "category":
+            return f"자주 구매하시는 {product.get('category', '')} 카테고리 상품이에요."
+        if top_factor == "repurchase":
+            return "자주 다시 구매하시는 상품이에요."
+        if top_factor == "copurchase":
+            return "구매하신 상품과 함께 많이 구매하는 상품이에요."
+        if top_factor == "related_category":
+            return f"비슷한 고객들이 함께 찾는 {product.get('category', '')} 상품이에요."
+        if top_factor == "cohort":
+            return "비슷한 고객들이 많이 구매하는 상품이에요."
+        if top_factor == "cohort_category":
+            return f"비슷한 고객들이 즐겨 찾는 {product.get('category', '')} 상품이에요."
+        if top_factor == "targeting":
+            return "고객님 취향에 맞춘 상품이에요."
+        return "인기 상품입니다."
@@ -0,0 +1,275 @@
+"""
+로컬 의도 / 감정 분류기 (문자 n-gram + 로지스틱 회귀)
+
+짧고 명확한 메시지("고마워요", "삼겹살 있어요?")는 LLM 없이 판단하고,
+신뢰도가 임계값보다 낮을 때만 LLM 분석으로 넘깁니다.
+
+- 학습: scikit-learn (TfidfVectorizer char_wb + LogisticRegression)
+- 추론: 학습된 어휘/IDF/가중치 배열만으로 직접 계산 (메시지 1건당 수십 µs)
+- 모델: MESSAGE_CLASSIFIER_PATH의 .npz 파일 (backend/classifier/train.py로 생성),
+  파일이 없으면 번들된 시드 데이터(app/data/message_classifier_seed.jsonl)로 학습
+"""
+import os
+import json
+import math
+import logging
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from app.services.observability import LOCAL_CLASSIFIER_DECISIONS
+
+MESSAGE_CLASSIFIER_ENABLED = os.getenv("MESSAGE_CLASSIFIER_ENABLED", "1") == "1"
+MESSAGE_CLASSIFIER_PATH = os.getenv(
+    "MESSAGE_CLASSIFIER_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "message_classifier.npz")
+)
+SEED_DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "message_classifier_seed.jsonl")
+# 이 신뢰도(예측 클래스 확률) 이상이면 LLM을 호출하지 않음
+# (시드 데이터 5-fold 교차 검증에서 0.8 이상으로 일상 대화/인사로 확정한 상품 문의 없음: evaluate.py --cross-validate 5)
+MESSAGE_CLASSIFIER_INTENT_THRESHOLD = float(os.getenv("MESSAGE_CLASSIFIER_INTENT_THRESHOLD", "0.85"))
+MESSAGE_CLASSIFIER_SENTIMENT_THRESHOLD = float(os.getenv("MESSAGE_CLASSIFIER_SENTIMENT_THRESHOLD", "0.8"))
+# 이보다 긴 메시지는 항상 LLM으로 판단 (짧은 메시지 위주로 학습됨)
+MESSAGE_CLASSIFIER_MAX_CHARS = int(os.getenv("MESSAGE_CLASSIFIER_MAX_CHARS", "60"))
+# 로컬에서 확정할 수 있는 라벨 (그 외는 신뢰도와 관계없이 LLM으로 판단)
+# 불만(negative) 메시지는 LLM 응답이 필요하므로 로컬에서 확정하지 않음
+LOCAL_LABELS = {
+    "intent": ("greeting", "casual_chat", "product_inquiry"),
+    "sentiment": ("positive", "neutral"),
+}
+
+TASKS = ("intent", "sentiment")
+INTENT_LABELS = ("greeting", "casual_chat", "product_inquiry")
+SENTIMENT_LABELS = ("positive", "neutral", "negative")
+NGRAM_RANGE = (1, 3)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Prediction:
+    """분류 결과"""
+    label: str
+    confidence: float
+
+
+def _analyzer() -> Callable[[str], List[str]]:
+    """학습/추론 공통 문자 n-gram 추출기 (소문자화 + 단어 경계 n-gram)"""
+    return TfidfVectorizer(analyzer='char_wb', ngram_range=NGRAM_RANGE).build_analyzer()
+
+
+class MessageClassifier:
+    """
+    공유 TF-IDF 어휘 위에 작업(intent, sentiment)별 선형 분류기
+
+    가중치는 항상 (어휘 크기, 클래스 수) 형태로 저장합니다.
+    (이진 분류면 [-w/2, w/2]로 펼쳐 softmax가 sigmoid와 같아지도록 함)
+    """
+
+    def __init__(
+        self,
+        terms: Sequence[str],
+        idf: np.ndarray,
+        heads: Dict[str, Dict[str, np.ndarray]]
+    ):
+        self.vocabulary: Dict[str, int] = {term: i for i, term in enumerate(terms)}
+        self.idf = np.asarray(idf, dtype=np.float64)
+        self.heads = heads
+        self.analyze = _analyzer()
+
+    # ============ 학습 ============
+
+    @classmethod
+    def fit(
+        cls,
+        texts: List[str],
+        labels: Dict[str, List[Optional[str]]],
+        C: float = 10.0
+    ) -> "MessageClassifier":
+        """
+        Args:
+            texts: 메시지 목록
+            labels: 작업별 정답 (texts와 같은 길이, 정답이 없는 행은 None)
+        """
+        from sklearn.linear_model import LogisticRegression
+
+        vectorizer = TfidfVectorizer(analyzer='char_wb', ngram_range=NGRAM_RANGE, sublinear_tf=True)
+        matrix = vectorizer.fit_transform(texts)
+        terms = vectorizer.get_feature_names_out()
+
+        heads: Dict[str, Dict[str, np.ndarray]] = {}
+        for task, task_labels in labels.items():
+            rows = [i for i, label in enumerate(task_labels) if label is not None]
+            classes = sorted({task_labels[i] for i in rows})
+            if len(classes) < 2:
+                logger.warning("⚠️  %s 분류기 학습 생략: 클래스가 2개 미만", task)
+                continue
+            model = LogisticRegression(C=C, max_iter=1000)
+            model.fit(matrix[rows], [task_labels[i] for i in rows])
+            coef, intercept = model.coef_, model.intercept_
+            if coef.shape[0] == 1:
+                coef = np.vstack([-coef / 2, coef / 2])
+                intercept = np.array([-intercept[0] / 2, intercept[0] / 2])
+            heads[task] = {
+                "classes": np.asarray(model.classes_, dtype=str),
+                "coef": np.ascontiguousarray(coef.T, dtype=np.float64),  # (어휘, 클래스)
+                "intercept": np.asarray(intercept, dtype=np.float64),
+            }
+        return cls(terms, vectorizer.idf_, heads)
+
+    # ============ 저장 / 로드 ============
+
+    def save(self, path: str) -> None:
+        terms = np.empty(len(self.vocabulary), dtype=object)
+        for term, i in self.vocabulary.items():
+            terms[i] = term
+        arrays = {"terms": terms.astype(str), "idf": self.idf}
+        for task, head in self.heads.items():
+            for key, value in head.items():
+                arrays[f"{task}_{key}"] = value
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "MessageClassifier":
+        with np.load(path, allow_pickle=False) as data:
+            heads = {
+                task: {key: data[f"{task}_{key}"] for key in ("classes", "coef", "intercept")}
+                for task in TASKS
+                if f"{task}_coef" in data
+            }
+            return cls(data["terms"].tolist(), data["idf"], heads)
+
+    # ============ 추론 ============
+
+    def _features(self, message: str):
+        """TfidfVectorizer(sublinear_tf, L2 정규화)와 같은 희소 벡터 (어휘 위치, 값)"""
+        positions, values = [], []
+        for term, count in Counter(self.analyze(message)).items():
+            position = self.vocabulary.get(term)
+            if position is not None:
+                positions.append(position)
+                values.append((1.0 + math.log(count)) * self.idf[position])
+        values = np.asarray(values, dtype=np.float64)
+        norm = float(np.sqrt(values @ values)) if len(values) else 0.0
+        return positions, (values / norm if norm > 0 else values)
+
+    def predict(self, task: str, message: str) -> Optional[Prediction]:
+        """작업(intent, sentiment)의 예측 클래스와 확률 (모델에 없는 작업이면 None)"""
+        head = self.heads.get(task)
+        if head is None:
+            return None
+        positions, values = self._features(message)
+        logits = head["intercept"] + values @ head["coef"][positions]
+        probabilities = np.exp(logits - logits.max())
+        probabilities /= probabilities.sum()
+        best = int(probabilities.argmax())
+        return Prediction(label=str(head["classes"][best]), confidence=float(probabilities[best]))
+
+
+# ============ 시드 데이터 ============
+
+def load_examples(path: str = SEED_DATA_PATH) -> List[Dict[str, Optional[str]]]:
+    """JSONL 학습 데이터 ({"text", "intent", "sentiment"}, 정답이 없는 작업은 생략 가능)"""
+    examples = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                examples.append({"text": row["text"], **{task: row.get(task) for task in TASKS}})
+    return examples
+
+
+def fit_examples(examples: List[Dict[str, Optional[str]]], C: float = 10.0) -> MessageClassifier:
+    return MessageClassifier.fit(
+        [e["text"] for e in examples],
+        {task: [e.get(task) for e in examples] for task in TASKS},
+        C=C
+    )
+
+
+# ============ 전역 분류기 ============
+
+_classifier: Optional[MessageClassifier] = None
+_loaded = False
+_lock = threading.Lock()
+
+
+def _load_classifier() -> Optional[MessageClassifier]:
+    """
+    MESSAGE_CLASSIFIER_PATH 파일이 있으면 로드하고, 없으면 시드 데이터로 학습합니다.
+    비활성화되었거나 로드에 실패하면 None (항상 LLM으로 판단)
+    """
+    if not MESSAGE_CLASSIFIER_ENABLED:
+        return None
+    try:
+        if os.path.exists(MESSAGE_CLASSIFIER_PATH):
+            classifier = MessageClassifier.load(MESSAGE_CLASSIFIER_PATH)
+            logger.info("🧠 로컬 분류기 로드: %s", MESSAGE_CLASSIFIER_PATH)
+        else:
+            classifier = fit_examples(load_examples())
+            logger.info("🧠 로컬 분류기 시드 데이터로 학습 (%d개 n-gram)", len(classifier.vocabulary))
+        return classifier
+    except Exception as e:
+        logger.warning("⚠️  로컬 분류기 로드 실패, LLM으로만 판단: %s", e)
+        return None
+
+
+def get_classifier() -> Optional[MessageClassifier]:
+    """전역 분류기 (처음 호출할 때 한 번 로드)"""
+    global _classifier, _loaded
+    if _loaded:
+        return _classifier
+    with _lock:
+        if not _loaded:
+            _classifier = _load_classifier()
+            _loaded = True
+    return _classifier
+
+
+def reload_classifier() -> Optional[MessageClassifier]:
+    """
+    모델 파일을 다시 로드 (재학습 후 재시작 없이 반영)
+
+    새 분류기를 다 만든 뒤 교체하므로, 로드 중에도 요청은 기존 분류기를 사용합니다.
+    """
+    global _classifier, _loaded
+    classifier = _load_classifier()
+    with _lock:
+        _classifier = classifier
+        _loaded = True
+    return classifier
+
+
+def classify(task: str, message: str, threshold: Optional[float] = None) -> Optional[Prediction]:
+    """
+    로컬 분류기로 판단할 수 있으면 예측 결과, 아니면 None (LLM으로 판단)
+
+    Args:
+        task: "intent" 또는 "sentiment"
+        threshold: 신뢰도 임계값 (생략 시 작업별 기본값, 0이면 항상 분류기 결과 사용)
+
+    임계값을 적용할 때는 LOCAL_LABELS에 있는 라벨만 로컬에서 확정합니다.
+    """
+    classifier = get_classifier()
+    if classifier is None:
+        return None
+    if threshold is None:
+        threshold = (
+            MESSAGE_CLASSIFIER_INTENT_THRESHOLD if task == "intent"
+            else MESSAGE_CLASSIFIER_SENTIMENT_THRESHOLD
+        )
+    prediction = classifier.predict(task, message)
+    if threshold > 0:
+        confident = (
+            prediction is not None
+            and prediction.confidence >= threshold
+            and prediction.label in LOCAL_LABELS[task]
+            and len(message) <= MESSAGE_CLASSIFIER_MAX_CHARS
+        )
+        LOCAL_CLASSIFIER_DECISIONS.labels(task, "local" if confident else "escalated").inc()
+        if not confident:
+            return None
+    return prediction
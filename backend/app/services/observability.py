@@ -0,0 +1,219 @@
+"""
+로깅 / 지연 시간 측정 / Prometheus 메트릭
+
+- 로깅: app.* 로거를 큐 핸들러로 연결해 stdout 쓰기는 별도 스레드에서 처리 (LOG_LEVEL)
+- span(): 단계별 소요 시간을 히스토그램(stage, provider, model, cache 라벨)에 기록
+- track_request(): 요청 하나의 단계별 소요 시간 수집 (Server-Timing 헤더, SSE done 이벤트)
+- instrument_engine(): SQLAlchemy 엔진의 모든 쿼리 시간 기록
+- /metrics 응답 생성 (PROMETHEUS_MULTIPROC_DIR 지정 시 멀티 워커 집계)
+"""
+import os
+import sys
+import time
+import queue
+import atexit
+import logging
+import logging.handlers
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    REGISTRY,
+    CONTENT_TYPE_LATEST,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s %(message)s"
+
+# 1ms ~ 30s
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0)
+
+STAGE_DURATION = Histogram(
+    "freshmind_stage_duration_seconds",
+    "챗봇 파이프라인 단계별 소요 시간",
+    ["stage", "provider", "model", "cache"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_QUERY_DURATION = Histogram(
+    "freshmind_db_query_duration_seconds",
+    "DB 쿼리 소요 시간",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_CALLS = Counter(
+    "freshmind_llm_calls_total",
+    "LLM 호출 수",
+    ["provider", "model", "outcome"],
+)
+LLM_HEDGES = Counter(
+    "freshmind_llm_hedges_total",
+    "다른 제공자로 보낸 헤지 요청 수 (winner: 먼저 응답한 제공자, none: 둘 다 실패)",
+    ["primary", "hedge", "winner"],
+)
+SINGLE_SHOT_RESULTS = Counter(
+    "freshmind_single_shot_total",
+    "단일 호출(의도+감정+추천) 결과 (invalid/error/timeout이면 기존 다중 호출로 대체, local: 로컬 분류기로 판단)",
+    ["provider", "model", "outcome"],
+)
+LOCAL_CLASSIFIER_DECISIONS = Counter(
+    "freshmind_local_classifier_total",
+    "로컬 분류기 판단 수 (local: 분류기 결과 사용, escalated: 신뢰도 미달로 LLM 호출)",
+    ["task", "outcome"],
+)
+CHAT_LOG_MESSAGES = Counter(
+    "freshmind_chat_log_messages_total",
+    "대화 내역 저장 결과 (행 단위, written 외에는 버려진 행)",
+    ["outcome"],
+)
+CACHE_REQUESTS = Counter(
+    "freshmind_llm_cache_requests_total",
+    "LLM 응답 캐시 조회 수",
+    ["namespace", "result"],
+)
+
+logger = logging.getLogger(__name__)
+
+
+# ============ 로깅 ============
+
+_log_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def setup_logging(level: str = LOG_LEVEL) -> None:
+    """
+    app.* 로거 설정 (여러 번 호출해도 한 번만 적용)
+
+    로그 레코드는 큐에 넣기만 하고, 실제 출력은 QueueListener 스레드가 담당하므로
+    요청 처리 중 stdout 쓰기로 이벤트 루프가 막히지 않습니다.
+    """
+    global _log_listener
+    if _log_listener is not None:
+        return
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    _log_listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _log_listener.start()
+    atexit.register(_log_listener.stop)
+
+    app_logger = logging.getLogger("app")
+    app_logger.setLevel(level)
+    app_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    app_logger.propagate = False
+
+
+# ============ 단계별 소요 시간 ============
+
+class Span:
+    """측정 중인 단계 (라벨은 측정 중에 바꿀 수 있음)"""
+
+    __slots__ = ("stage", "provider", "model", "cache", "duration")
+
+    def __init__(self, stage: str, provider: str, model: str, cache: str):
+        self.stage = stage
+        self.provider = provider
+        self.model = model
+        self.cache = cache
+        self.duration = 0.0
+
+
+# 현재 요청에서 측정된 (단계, 소요 시간) 목록
+_request_spans: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_spans", default=None)
+
+
+def _record(stage: str, duration: float) -> None:
+    spans = _request_spans.get()
+    if spans is not None:
+        spans.append((stage, duration))
+
+
+@contextmanager
+def span(stage: str, provider: str = "none", model: str = "none", cache: str = "none") -> Iterator[Span]:
+    """
+    단계 소요 시간 측정
+
+    예외가 나도 기록되며, 블록 안에서 current.cache = "hit"처럼 라벨을 바꿀 수 있습니다.
+    """
+    current = Span(stage, provider, model, cache)
+    started = time.perf_counter()
+    try:
+        yield current
+    finally:
+        current.duration = time.perf_counter() - started
+        STAGE_DURATION.labels(current.stage, current.provider, current.model, current.cache).observe(current.duration)
+        _record(current.stage, current.duration)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "span stage=%s provider=%s model=%s cache=%s duration_ms=%.1f",
+                current.stage, current.provider, current.model, current.cache, current.duration * 1000
+            )
+
+
+@contextmanager
+def track_request() -> Iterator[List[Tuple[str, float]]]:
+    """
+    블록 안(같은 컨텍스트에서 만든 태스크 포함)에서 측정된 단계를 모읍니다.
+    """
+    spans: List[Tuple[str, float]] = []
+    token = _request_spans.set(spans)
+    try:
+        yield spans
+    finally:
+        _request_spans.reset(token)
+
+
+def summarize_spans(spans: List[Tuple[str, float]]) -> Dict[str, float]:
+    """단계별 합계 (ms)"""
+    totals: Dict[str, float] = {}
+    for stage, duration in spans:
+        totals[stage] = totals.get(stage, 0.0) + duration
+    return {stage: round(duration * 1000, 1) for stage, duration in totals.items()}
+
+
+def server_timing_header(spans: List[Tuple[str, float]]) -> str:
+    """Server-Timing 헤더 값 (브라우저 개발자 도구에서 확인 가능)"""
+    return ", ".join(f"{stage};dur={duration}" for stage, duration in summarize_spans(spans).items())
+
+
+# ============ DB 쿼리 ============
+
+def instrument_engine(engine) -> None:
+    """
+    동기 엔진(비동기 엔진은 .sync_engine)의 쿼리 시간 기록
+
+    시작 시각은 실행 컨텍스트(문장 하나)에 저장하므로, 실패한 문장(after_cursor_execute 없음)이
+    풀에 반환된 커넥션의 다음 쿼리 시간에 영향을 주지 않습니다.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context.query_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "query_started", None)
+        if started is None:
+            return
+        duration = time.perf_counter() - started
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "UNKNOWN"
+        DB_QUERY_DURATION.labels(operation).observe(duration)
+        _record("db_query", duration)
+
+
+# ============ /metrics ============
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Prometheus 텍스트 형식 메트릭과 Content-Type"""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,258 @@
+"""
+상품 후보 검색용 역색인
+
+상품명 토큰, 카테고리, 서브카테고리, 태그, 요리 용도(used_in)를 색인하고
+성별/연령대 프로필 버킷을 미리 계산해 둡니다.
+추천 후보 선택은 전체 상품 순회 대신 배열 연산으로 처리됩니다.
+
+색인은 모두 NumPy 배열(정렬된 용어 배열 + CSR 형태의 상품 위치 목록, 프로필 bool 마스크)이므로
+카탈로그 스냅샷에 저장해 두면 워커마다 다시 만들지 않고 mmap으로 공유합니다.
+"""
+import re
+from typing import List, Dict, Any, Optional, Sequence, Set, Tuple
+import numpy as np
+
+# 메시지 키워드 → 상품명/카테고리에서 찾을 키워드 (기존 if/elif 규칙과 동일)
+KEYWORD_RULES: List[Tuple[Tuple[str, ...], Tuple[str, ...], Tuple[str, ...]]] = [
+    # (메시지 트리거, 상품명 매칭, 카테고리 매칭)
+    (('밀키트',), ('밀키트',), ('밀키트',)),
+    (('간편식',), ('간편식',), ('간편식',)),
+    (('과일',), ('과일',), ('과일',)),
+    (('채소',), ('채소',), ('채소',)),
+    (('고기', '육류'), ('고기',), ('육류',)),
+    (('해산물',), ('해산물',), ('해산물',)),
+    (('음료',), ('음료',), ('음료',)),
+    (('간식',), ('간식',), ('스낵', '과자')),
+]
+
+# 성별 → 매칭되는 targetGender 값
+GENDER_TARGETS: Dict[str, Tuple[str, ...]] = {
+    'M': ('all', 'unisex', 'male', 'male-oriented'),
+    'F': ('all', 'unisex', 'female', 'female-oriented'),
+    '': ('all', 'unisex'),
+}
+
+# 메시지에서 조회할 부분 문자열 최대 길이
+_MAX_TERM_LENGTH = 12
+
+_TOKEN_SPLIT = re.compile(r"[\s\[\]\(\)/,·+&\-]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """문자열을 소문자 토큰으로 분리"""
+    return [t for t in _TOKEN_SPLIT.split(text.lower()) if t]
+
+
+def message_terms(message: str) -> Set[str]:
+    """
+    메시지에서 색인 조회에 사용할 후보 용어 생성
+
+    한국어 조사("샐러드를", "과일은")를 고려해 각 토큰의 2글자 이상 부분 문자열을 모두 사용합니다.
+    메시지 길이에만 비례하므로 카탈로그 크기와 무관합니다.
+    """
+    terms: Set[str] = set()
+    for token in tokenize(message):
+        length = len(token)
+        for start in range(length):
+            for end in range(start + 2, min(length, start + _MAX_TERM_LENGTH) + 1):
+                terms.add(token[start:end])
+    return terms
+
+
+def product_terms(product: Dict[str, Any]) -> Set[str]:
+    """상품에서 색인할 용어 (상품명 토큰, 카테고리, 태그, 요리 용도)"""
+    terms = set(tokenize(product['name']))
+    for field in ('category', 'subCategory'):
+        value = product.get(field)
+        if value:
+            terms.add(value.lower())
+            terms.update(tokenize(value))
+    for field in ('tags', 'usedIn'):
+        for value in product.get(field) or []:
+            terms.add(value.lower())
+            terms.update(tokenize(value))
+    return terms
+
+
+def _postings(groups: Dict[Any, Set[int]], keys: List[Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """키 순서대로 상품 위치 집합을 CSR 형태 (offsets, positions)로 변환"""
+    offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+    chunks = []
+    for i, key in enumerate(keys):
+        positions = np.array(sorted(groups.get(key, ())), dtype=np.int32)
+        offsets[i + 1] = offsets[i] + len(positions)
+        chunks.append(positions)
+    positions = np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.int32)
+    return offsets, positions
+
+
+def build_index_arrays(products: Sequence[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """
+    상품 목록으로 역색인 배열 생성 (스냅샷 빌드 시 저장, 요청으로 전달된 상품 목록은 즉시 생성)
+
+    - term_keys / term_offsets / term_positions: 용어(정렬) → 상품 위치 목록
+    - rule_offsets / rule_positions: 키워드 규칙 번호 → 상품 위치 목록
+    - gender_masks: GENDER_TARGETS 순서의 성별 버킷 (bool, 성별 × 상품)
+    - age_keys / age_masks / any_age_mask: 연령대 버킷 (연령대 타겟이 없는 상품 포함)
+    """
+    n = len(products)
+    terms: Dict[str, Set[int]] = {}
+    rules: Dict[int, Set[int]] = {}
+    gender_values: Dict[str, Set[int]] = {}
+    age_values: Dict[str, Set[int]] = {}
+    any_age_mask = np.zeros(n, dtype=bool)
+
+    for pos, product in enumerate(products):
+        name_lower = product['name'].lower()
+        category_lower = (product.get('category') or '').lower()
+
+        for term in product_terms(product):
+            terms.setdefault(term, set()).add(pos)
+
+        for rule_no, (_, name_keys, category_keys) in enumerate(KEYWORD_RULES):
+            if any(k in name_lower for k in name_keys) or any(k in category_lower for k in category_keys):
+                rules.setdefault(rule_no, set()).add(pos)
+
+        gender_values.setdefault(product.get('targetGender', 'all'), set()).add(pos)
+        target_ages = product.get('targetAge') or []
+        if not target_ages:
+            any_age_mask[pos] = True
+        for age in target_ages:
+            age_values.setdefault(age, set()).add(pos)
+
+    term_keys = sorted(terms)
+    term_offsets, term_positions = _postings(terms, term_keys)
+    rule_offsets, rule_positions = _postings(rules, list(range(len(KEYWORD_RULES))))
+
+    gender_masks = np.zeros((len(GENDER_TARGETS), n), dtype=bool)
+    for row, targets in enumerate(GENDER_TARGETS.values()):
+        for target in targets:
+            gender_masks[row, sorted(gender_values.get(target, ()))] = True
+
+    age_keys = sorted(age_values)
+    age_masks = np.zeros((len(age_keys), n), dtype=bool)
+    for row, age in enumerate(age_keys):
+        age_masks[row, sorted(age_values[age])] = True
+    age_masks |= any_age_mask
+
+    return {
+        "term_keys": np.array(term_keys, dtype=str),
+        "term_offsets": term_offsets,
+        "term_positions": term_positions,
+        "rule_offsets": rule_offsets,
+        "rule_positions": rule_positions,
+        "gender_masks": gender_masks,
+        "age_keys": np.array(age_keys, dtype=str),
+        "age_masks": age_masks,
+        "any_age_mask": any_age_mask,
+    }
+
+
+class ProductIndex:
+    """상품 목록에 대한 역색인 및 프로필 버킷"""
+
+    def __init__(self, products: Sequence[Dict[str, Any]], arrays: Optional[Dict[str, np.ndarray]] = None):
+        """
+        Args:
+            products: 상품 딕셔너리 목록 또는 CatalogSnapshot
+            arrays: 스냅샷에 저장된 색인 배열 (없으면 상품 목록으로 생성)
+        """
+        self.products = products
+        # 상품 ID → 위치 조회용 정렬된 ID 배열 (스냅샷은 이미 ID 순)
+        if hasattr(products, 'product_ids'):
+            self.product_ids = np.asarray(products.product_ids)
+            self._sorted_ids = self.product_ids
+            self._id_order: Optional[np.ndarray] = None
+        else:
+            self.product_ids = np.fromiter((p['id'] for p in products), dtype=np.int64, count=len(products))
+            self._id_order = np.argsort(self.product_ids, kind='stable')
+            self._sorted_ids = self.product_ids[self._id_order]
+
+        self.arrays = arrays if arrays is not None else build_index_arrays(products)
+        self.term_keys = self.arrays["term_keys"]
+        self.term_offsets = self.arrays["term_offsets"]
+        self.term_positions = self.arrays["term_positions"]
+        self.rule_offsets = self.arrays["rule_offsets"]
+        self.rule_positions = self.arrays["rule_positions"]
+        self.gender_masks = self.arrays["gender_masks"]
+        self.age_keys = self.arrays["age_keys"].tolist()
+        self.age_masks = self.arrays["age_masks"]
+        self.any_age_mask = self.arrays["any_age_mask"]
+        self._gender_rows = {gender: row for row, gender in enumerate(GENDER_TARGETS)}
+
+        self._mask_cache: Dict[Tuple[str, str], np.ndarray] = {}
+
+    def positions(self, product_ids: np.ndarray) -> np.ndarray:
+        """상품 ID 배열 → 위치 배열 (이진 탐색, 없는 ID는 -1)"""
+        product_ids = np.asarray(product_ids, dtype=np.int64)
+        if len(self._sorted_ids) == 0:
+            return np.full(len(product_ids), -1, dtype=np.int64)
+        found = np.minimum(np.searchsorted(self._sorted_ids, product_ids), len(self._sorted_ids) - 1)
+        positions = found if self._id_order is None else self._id_order[found]
+        return np.where(self._sorted_ids[found] == product_ids, positions, -1)
+
+    def position(self, product_id: int) -> Optional[int]:
+        """상품 ID → 위치 (없으면 None)"""
+        pos = int(self.positions(np.array([product_id]))[0])
+        return None if pos < 0 else pos
+
+    def get(self, product_id: int) -> Optional[Dict[str, Any]]:
+        """상품 ID로 상품 조회"""
+        pos = self.position(product_id)
+        return None if pos is None else self.products[pos]
+
+    def profile_mask(self, gender: str, age_group: str) -> np.ndarray:
+        """프로필(성별, 연령대)에 맞는 상품 여부를 bool 배열로 반환 (버킷별 캐시)"""
+        gender_key = gender if gender in ('M', 'F') else ''
+        key = (gender_key, age_group or '')
+        mask = self._mask_cache.get(key)
+        if mask is None:
+            if age_group in self.age_keys:
+                ages = self.age_masks[self.age_keys.index(age_group)]
+            else:
+                ages = self.any_age_mask
+            mask = self.gender_masks[self._gender_rows[gender_key]] & ages
+            self._mask_cache[key] = mask
+        return mask
+
+    def match_mask(self, message: str) -> np.ndarray:
+        """메시지 키워드와 매칭되는 상품 여부를 bool 배열로 반환"""
+        message_lower = message.lower()
+        matched = np.zeros(len(self.products), dtype=bool)
+        for rule_no, (triggers, _, _) in enumerate(KEYWORD_RULES):
+            if any(t in message_lower for t in triggers):
+                matched[self.rule_positions[self.rule_offsets[rule_no]:self.rule_offsets[rule_no + 1]]] = True
+        terms = np.array(sorted(message_terms(message_lower)), dtype=str)
+        if len(terms) and len(self.term_keys):
+            found = np.minimum(np.searchsorted(self.term_keys, terms), len(self.term_keys) - 1)
+            for i in found[self.term_keys[found] == terms].tolist():
+                matched[self.term_positions[self.term_offsets[i]:self.term_offsets[i + 1]]] = True
+        return matched
+
+    def select_candidates(
+        self,
+        message: str,
+        gender: str,
+        age_group: str,
+        matched_limit: int = 50,
+        other_limit: int = 30,
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], int, int]:
+        """
+        추천 후보 선택
+
+        Returns:
+            (키워드 매칭 상품, 기타 상품, 키워드 매칭 총 개수, 기타 총 개수)
+        """
+        profile = self.profile_mask(gender, age_group)
+        matched = self.match_mask(message) & profile
+        other = profile & ~matched
+
+        matched_positions = np.flatnonzero(matched)
+        other_positions = np.flatnonzero(other)
+
+        return (
+            [self.products[i] for i in matched_positions[:matched_limit].tolist()],
+            [self.products[i] for i in other_positions[:other_limit].tolist()],
+            len(matched_positions),
+            len(other_positions),
+        )
@@ -1,215 +1,554 @@
 """
 구매이력 기반 인사이트 분석 서비스
 """
+import os
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from typing import List, Dict, Any, Tuple, Optional, Iterable, AsyncIterator
+import numpy as np
+from sqlalchemy import func, desc, case, select, Select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models import PurchaseHistory, Product, User
 
+# 일괄 조회 시 한 번의 쿼리로 처리할 사용자 수
+PURCHASE_SUMMARY_BATCH_SIZE = int(os.getenv("PURCHASE_SUMMARY_BATCH_SIZE", "1000"))
+
+# ============ 가중치 구간 ============
+# (경계값, 가중치) - 위에서부터 순서대로 비교
+
+# 경과 일수 이하 → 시간 가중치 (그 이전은 TIME_WEIGHT_DEFAULT)
+TIME_WEIGHT_BUCKETS: List[Tuple[int, float]] = [
+    (7, 1.5),   # 최근 1주일
+    (30, 1.2),  # 최근 1개월
+    (90, 1.0),  # 최근 3개월
+]
+TIME_WEIGHT_DEFAULT = 0.7
+
+# 구매 횟수 이상 → 반복 구매 보너스
+REPEAT_BONUS_BUCKETS: List[Tuple[int, float]] = [
+    (6, 2.0),
+    (4, 1.5),
+    (2, 1.3),
+]
+REPEAT_BONUS_DEFAULT = 1.0
+
+# 수량 이상 → 수량 가중치
+QUANTITY_WEIGHT_BUCKETS: List[Tuple[int, float]] = [
+    (4, 1.5),
+    (2, 1.2),
+]
+QUANTITY_WEIGHT_DEFAULT = 1.0
+
 
 def calculate_time_weight(purchased_at: datetime) -> float:
     """시간 가중치 계산"""
     now = datetime.now()
     days_ago = (now - purchased_at).days
     
-    if days_ago <= 7:
-        return 1.5  # 최근 1주일
-    elif days_ago <= 30:
-        return 1.2  # 최근 1개월
-    elif days_ago <= 90:
-        return 1.0  # 최근 3개월
-    else:
-        return 0.7  # 그 이전
+    for max_days, weight in TIME_WEIGHT_BUCKETS:
+        if days_ago <= max_days:
+            return weight
+    return TIME_WEIGHT_DEFAULT
 
 
 def calculate_repeat_bonus(purchase_count: int) -> float:
     """반복 구매 보너스 계산"""
-    if purchase_count >= 6:
-        return 2.0
-    elif purchase_count >= 4:
-        return 1.5
-    elif purchase_count >= 2:
-        return 1.3
-    else:
-        return 1.0
+    for min_count, bonus in REPEAT_BONUS_BUCKETS:
+        if purchase_count >= min_count:
+            return bonus
+    return REPEAT_BONUS_DEFAULT
 
 
 def calculate_quantity_weight(quantity: int) -> float:
     """수량 가중치 계산"""
-    if quantity >= 4:
-        return 1.5
-    elif quantity >= 2:
-        return 1.2
+    for min_quantity, weight in QUANTITY_WEIGHT_BUCKETS:
+        if quantity >= min_quantity:
+            return weight
+    return QUANTITY_WEIGHT_DEFAULT
+
+
+def parse_purchased_at(value: Any) -> Optional[datetime]:
+    """요청으로 받은 구매 시각(datetime 또는 ISO 문자열)을 timezone 없는 datetime으로 변환"""
+    if isinstance(value, datetime):
+        parsed = value
+    elif not value:
+        return None
     else:
-        return 1.0
+        try:
+            parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    # timezone이 있으면 서버 로컬 시각으로 변환 (datetime.now()와 비교)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone()
+    return parsed.replace(tzinfo=None)
+
+
+def parse_int(value: Any) -> Optional[int]:
+    """요청으로 받은 정수 값(상품 ID, 수량) 변환 (숫자가 아니면 None)"""
+    if isinstance(value, bool):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+# ============ 벡터 연산 버전 ============
+
+def time_weights(days_ago: np.ndarray) -> np.ndarray:
+    """경과 일수 배열 → 시간 가중치 배열"""
+    return np.select(
+        [days_ago <= max_days for max_days, _ in TIME_WEIGHT_BUCKETS],
+        [weight for _, weight in TIME_WEIGHT_BUCKETS],
+        default=TIME_WEIGHT_DEFAULT
+    )
+
+
+def repeat_bonuses(purchase_counts: np.ndarray) -> np.ndarray:
+    """구매 횟수 배열 → 반복 구매 보너스 배열"""
+    return np.select(
+        [purchase_counts >= min_count for min_count, _ in REPEAT_BONUS_BUCKETS],
+        [bonus for _, bonus in REPEAT_BONUS_BUCKETS],
+        default=REPEAT_BONUS_DEFAULT
+    )
 
 
-def get_purchase_summary(db: Session, user_id: int, period_days: int = 30) -> Dict[str, Any]:
+def quantity_weights(quantities: np.ndarray) -> np.ndarray:
+    """수량 배열 → 수량 가중치 배열"""
+    return np.select(
+        [quantities >= min_quantity for min_quantity, _ in QUANTITY_WEIGHT_BUCKETS],
+        [weight for _, weight in QUANTITY_WEIGHT_BUCKETS],
+        default=QUANTITY_WEIGHT_DEFAULT
+    )
+
+
+def history_arrays(
+    purchase_history: Iterable[Dict[str, Any]],
+    now: Optional[datetime] = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
     """
-    사용자의 구매 요약 정보 반환
-    
+    요청으로 받은 구매이력 → (상품 ID, 경과 일수, 수량) 배열
+
+    상품 ID나 구매 시각이 없거나 해석할 수 없는 항목은 건너뛰고, 수량을 해석할 수 없으면 1로 봅니다.
+    """
+    now = now or datetime.now()
+    product_ids, purchased, quantities = [], [], []
+    for item in purchase_history:
+        product_id = parse_int(item.get('productId', item.get('product_id')))
+        purchased_at = parse_purchased_at(item.get('purchasedAt', item.get('purchased_at')))
+        if product_id is None or purchased_at is None:
+            continue
+        product_ids.append(product_id)
+        purchased.append(purchased_at)
+        quantities.append(parse_int(item.get('quantity', 1)) or 1)
+    # (now - purchased_at).days와 같이 내림한 일수
+    elapsed = np.datetime64(now, 'us') - np.array(purchased, dtype='datetime64[us]')
+    days_ago = elapsed // np.timedelta64(1, 'D')
+    return (
+        np.array(product_ids, dtype=np.int64),
+        days_ago.astype(np.int64),
+        np.array(quantities, dtype=np.int64),
+    )
+
+
+def purchase_weights(days_ago: np.ndarray, quantities: np.ndarray) -> np.ndarray:
+    """구매 건별 시간 가중치 × 수량 가중치"""
+    return time_weights(days_ago) * quantity_weights(quantities)
+
+
+def product_scores(positions: np.ndarray, weights: np.ndarray, size: int) -> np.ndarray:
+    """
+    상품 위치별 가중치 합 × 반복 구매 보너스 (구매이력 전체를 한 번에 계산)
+
     Args:
-        db: 데이터베이스 세션
-        user_id: 사용자 ID
-        period_days: 분석 기간 (일)
-    
-    Returns:
-        구매 요약 정보 딕셔너리
+        positions: 구매 건별 상품 위치 (0 ~ size-1)
+        weights: 구매 건별 가중치 (purchase_weights)
+        size: 상품 수
     """
-    # 사용자 정보 조회
-    user = db.query(User).filter(User.user_id == user_id).first()
-    if not user:
-        return None
-    
-    # 기간 설정
-    start_date = datetime.now() - timedelta(days=period_days)
-    
-    # 구매이력 조회 (최근 period_days일)
-    purchases = db.query(
-        PurchaseHistory,
-        Product
-    ).join(
-        Product, PurchaseHistory.product_id == Product.product_id
-    ).filter(
+    scores = np.bincount(positions, weights=weights, minlength=size)
+    return scores * repeat_bonuses(np.bincount(positions, minlength=size))
+
+
+# ============ SQL 버전 ============
+
+def time_weight_case(purchased_at, now: datetime):
+    """
+    시간 가중치 CASE 식
+
+    calculate_time_weight의 (now - purchased_at).days <= N 조건은
+    purchased_at > now - (N + 1)일과 같습니다.
+    """
+    return case(
+        *[
+            (purchased_at > now - timedelta(days=max_days + 1), weight)
+            for max_days, weight in TIME_WEIGHT_BUCKETS
+        ],
+        else_=TIME_WEIGHT_DEFAULT
+    )
+
+
+def quantity_weight_case(quantity):
+    """수량 가중치 CASE 식"""
+    return case(
+        *[(quantity >= min_quantity, weight) for min_quantity, weight in QUANTITY_WEIGHT_BUCKETS],
+        else_=QUANTITY_WEIGHT_DEFAULT
+    )
+
+
+def repeat_bonus_case(purchase_count):
+    """반복 구매 보너스 CASE 식"""
+    return case(
+        *[(purchase_count >= min_count, bonus) for min_count, bonus in REPEAT_BONUS_BUCKETS],
+        else_=REPEAT_BONUS_DEFAULT
+    )
+
+
+def product_stats_columns(now: datetime) -> List[Any]:
+    """
+    상품별 구매 통계 집계 컬럼
+
+    (product_id, purchase_count, total_quantity, weighted_score, last_purchased)
+    """
+    purchase_count = func.count(PurchaseHistory.purchase_id)
+    weighted_sum = func.sum(
+        time_weight_case(PurchaseHistory.purchased_at, now) * quantity_weight_case(PurchaseHistory.quantity)
+    )
+    return [
+        PurchaseHistory.product_id.label("product_id"),
+        purchase_count.label("purchase_count"),
+        func.sum(PurchaseHistory.quantity).label("total_quantity"),
+        (weighted_sum * repeat_bonus_case(purchase_count)).label("weighted_score"),
+        func.max(PurchaseHistory.purchased_at).label("last_purchased"),
+    ]
+
+
+def product_stats_query(user_id: int, start_date: datetime, now: datetime) -> Select:
+    """
+    사용자의 상품별 구매 통계 집계 쿼리 (idx_purchase_user_date 사용)
+
+    weighted_score 내림차순(동점이면 최근 구매 순)으로 정렬됩니다.
+    """
+    stats = select(*product_stats_columns(now)).where(
         PurchaseHistory.user_id == user_id,
         PurchaseHistory.purchased_at >= start_date
-    ).all()
-    
-    if not purchases:
+    ).group_by(PurchaseHistory.product_id).subquery()
+
+    return select(
+        stats.c.product_id,
+        Product.name,
+        Product.category,
+        stats.c.purchase_count,
+        stats.c.total_quantity,
+        stats.c.weighted_score,
+        stats.c.last_purchased
+    ).join(
+        Product, Product.product_id == stats.c.product_id
+    ).order_by(
+        desc(stats.c.weighted_score),
+        desc(stats.c.last_purchased),
+        stats.c.product_id
+    )
+
+
+def product_stats_batch_query(user_ids: List[int], start_date: datetime, now: datetime) -> Select:
+    """
+    여러 사용자의 상품별 구매 통계를 한 번에 집계하는 쿼리
+
+    사용자 테이블 기준 LEFT JOIN이므로 구매이력이 없는 사용자도 product_id가 NULL인 행 하나로 포함됩니다.
+    user_id 순으로, 사용자 안에서는 product_stats_query와 같은 순서로 정렬됩니다.
+    """
+    stats = select(
+        PurchaseHistory.user_id.label("user_id"),
+        *product_stats_columns(now)
+    ).where(
+        PurchaseHistory.user_id.in_(user_ids),
+        PurchaseHistory.purchased_at >= start_date
+    ).group_by(PurchaseHistory.user_id, PurchaseHistory.product_id).subquery()
+
+    return select(
+        User.user_id,
+        User.name.label("user_name"),
+        stats.c.product_id,
+        Product.name,
+        Product.category,
+        stats.c.purchase_count,
+        stats.c.total_quantity,
+        stats.c.weighted_score,
+        stats.c.last_purchased
+    ).select_from(User).outerjoin(
+        stats, stats.c.user_id == User.user_id
+    ).outerjoin(
+        Product, Product.product_id == stats.c.product_id
+    ).where(
+        User.user_id.in_(user_ids)
+    ).order_by(
+        User.user_id,
+        desc(stats.c.weighted_score),
+        desc(stats.c.last_purchased),
+        stats.c.product_id
+    )
+
+
+@dataclass(slots=True)
+class ProductStats:
+    """상품별 구매 통계 (product_stats_query 결과 행 하나)"""
+    product_id: int
+    product_name: str
+    category: Optional[str]
+    purchase_count: int
+    total_quantity: int
+    weighted_score: float
+    last_purchased: Optional[datetime]
+
+    @classmethod
+    def from_row(cls, row) -> "ProductStats":
+        return cls(
+            row.product_id,
+            row.name,
+            row.category,
+            row.purchase_count,
+            row.total_quantity,
+            float(row.weighted_score),
+            row.last_purchased
+        )
+
+
+def product_stats_from_rows(rows) -> List[ProductStats]:
+    """product_stats_query 결과 행 → 상품별 통계"""
+    return [ProductStats.from_row(row) for row in rows]
+
+
+def empty_summary(user_id: int, user_name: str, period_days: int) -> Dict[str, Any]:
+    """구매이력이 없는 사용자의 요약 정보"""
+    return {
+        "user_id": user_id,
+        "user_name": user_name,
+        "period": f"last_{period_days}_days",
+        "total_purchases": 0,
+        "insights": {
+            "top_products": [],
+            "recent_trends": [],
+            "repeat_purchases": [],
+            "category_preferences": {}
+        },
+        "message_template_id": 0,
+        "message_variables": {}
+    }
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+class SummaryBuilder:
+    """
+    weighted_score 내림차순으로 들어오는 상품별 통계를 한 번 훑으며 요약에 필요한 값만 보관
+
+    상위/반복/최근 상품은 각각 3개까지만, 카테고리는 점수 합만 유지하므로
+    사용자의 구매 상품 수와 관계없이 메모리 사용량이 일정합니다.
+    """
+
+    __slots__ = ("week_ago", "total_purchases", "total_score", "category_scores", "top", "repeat", "recent")
+
+    LIMIT = 3
+    REPEAT_MIN_COUNT = 3
+
+    def __init__(self, now: datetime):
+        self.week_ago = now - timedelta(days=7)
+        self.total_purchases = 0
+        self.total_score = 0.0
+        self.category_scores: Dict[str, float] = {}
+        self.top: List[ProductStats] = []
+        self.repeat: List[ProductStats] = []
+        self.recent: List[ProductStats] = []
+
+    def add(self, stats: ProductStats) -> None:
+        self.total_purchases += stats.purchase_count
+        self.total_score += stats.weighted_score
+        category = stats.category or "기타"
+        self.category_scores[category] = self.category_scores.get(category, 0.0) + stats.weighted_score
+        if len(self.top) < self.LIMIT:
+            self.top.append(stats)
+        # 반복 구매 상품 (3회 이상)
+        if len(self.repeat) < self.LIMIT and stats.purchase_count >= self.REPEAT_MIN_COUNT:
+            self.repeat.append(stats)
+        # 최근 트렌드 (최근 1주일)
+        if len(self.recent) < self.LIMIT and stats.last_purchased and stats.last_purchased >= self.week_ago:
+            self.recent.append(stats)
+
+    def build(self, user_id: int, user_name: str, period_days: int) -> Dict[str, Any]:
+        """구매 요약 정보 구성"""
+        if not self.top:
+            return empty_summary(user_id, user_name, period_days)
+
+        # 카테고리 선호도 (점수 비율)
+        total_score = self.total_score
+        category_preferences = {
+            category: score / total_score if total_score > 0 else 0
+            for category, score in self.category_scores.items()
+        }
+
+        # 메시지 변수 생성
+        message_variables = {
+            "count": self.total_purchases,
+            "products": ", ".join(p.product_name for p in self.top),
+            "most_purchased": self.top[0].product_name,
+            "repeat_count": self.repeat[0].purchase_count if self.repeat else 0,
+            "top_category": max(category_preferences.items(), key=lambda x: x[1])[0]
+        }
+
         return {
             "user_id": user_id,
-            "user_name": user.name,
+            "user_name": user_name,
             "period": f"last_{period_days}_days",
-            "total_purchases": 0,
+            "total_purchases": self.total_purchases,
             "insights": {
-                "top_products": [],
-                "recent_trends": [],
-                "repeat_purchases": [],
-                "category_preferences": {}
+                "top_products": [
+                    {
+                        "product_id": p.product_id,
+                        "product_name": p.product_name,
+                        "purchase_count": p.purchase_count,
+                        "weighted_score": round(p.weighted_score, 2),
+                        "last_purchased": _isoformat(p.last_purchased)
+                    }
+                    for p in self.top
+                ],
+                "recent_trends": [
+                    {
+                        "product_id": p.product_id,
+                        "product_name": p.product_name,
+                        "purchase_count": p.purchase_count,
+                        "last_purchased": _isoformat(p.last_purchased)
+                    }
+                    for p in self.recent
+                ],
+                "repeat_purchases": [
+                    {
+                        "product_id": p.product_id,
+                        "product_name": p.product_name,
+                        "repeat_count": p.purchase_count
+                    }
+                    for p in self.repeat
+                ],
+                "category_preferences": category_preferences
             },
-            "message_template_id": 0,
-            "message_variables": {}
+            "message_template_id": 0,  # 프론트엔드에서 랜덤 선택
+            "message_variables": message_variables
         }
+
+
+def build_summary(
+    user_id: int,
+    user_name: str,
+    period_days: int,
+    sorted_products: Iterable[ProductStats],
+    now: datetime
+) -> Dict[str, Any]:
+    """
+    상품별 통계(weighted_score 내림차순)로 구매 요약 정보 구성
+
+    Args:
+        user_id: 사용자 ID
+        user_name: 사용자 이름
+        period_days: 분석 기간 (일)
+        sorted_products: 상품별 구매 통계 (한 번만 순회하므로 제너레이터도 가능)
+        now: 기준 시각
+    """
+    builder = SummaryBuilder(now)
+    for stats in sorted_products:
+        builder.add(stats)
+    return builder.build(user_id, user_name, period_days)
+
+
+async def get_purchase_summary(db: AsyncSession, user_id: int, period_days: int = 30) -> Dict[str, Any]:
+    """
+    사용자의 구매 요약 정보 반환
     
-    # 상품별 구매 통계 계산
-    product_stats: Dict[int, Dict[str, Any]] = {}
-    
-    for purchase_history, product in purchases:
-        product_id = product.product_id
-        
-        if product_id not in product_stats:
-            product_stats[product_id] = {
-                "product_id": product_id,
-                "product_name": product.name,
-                "category": product.category,
-                "purchase_count": 0,
-                "total_quantity": 0,
-                "weighted_score": 0.0,
-                "purchase_dates": [],
-                "last_purchased": None
-            }
-        
-        stats = product_stats[product_id]
-        stats["purchase_count"] += 1
-        stats["total_quantity"] += purchase_history.quantity
-        stats["purchase_dates"].append(purchase_history.purchased_at)
-        
-        # 가중치 점수 계산
-        time_weight = calculate_time_weight(purchase_history.purchased_at)
-        quantity_weight = calculate_quantity_weight(purchase_history.quantity)
-        base_score = 1.0
-        
-        stats["weighted_score"] += base_score * time_weight * quantity_weight
-        
-        # 마지막 구매일 업데이트
-        if not stats["last_purchased"] or purchase_history.purchased_at > stats["last_purchased"]:
-            stats["last_purchased"] = purchase_history.purchased_at
+    상품별 집계(횟수, 수량, 가중치 점수, 마지막 구매일)는 DB에서 GROUP BY로 계산하고
+    상품 수만큼의 집계 행만 가져옵니다.
+    비동기 세션을 사용하므로 쿼리 대기 중에도 이벤트 루프가 막히지 않습니다.
     
-    # 반복 구매 보너스 적용
-    for product_id, stats in product_stats.items():
-        repeat_bonus = calculate_repeat_bonus(stats["purchase_count"])
-        stats["weighted_score"] *= repeat_bonus
+    Args:
+        db: 비동기 데이터베이스 세션
+        user_id: 사용자 ID
+        period_days: 분석 기간 (일)
     
-    # 가중치 점수 기준으로 정렬
-    sorted_products = sorted(
-        product_stats.values(),
-        key=lambda x: x["weighted_score"],
-        reverse=True
-    )
+    Returns:
+        구매 요약 정보 딕셔너리
+    """
+    # 사용자 정보 조회
+    user_name = await db.scalar(select(User.name).where(User.user_id == user_id))
+    if user_name is None:
+        return None
     
-    # Top 3 상품
-    top_products = sorted_products[:3]
+    # 기간 설정
+    now = datetime.now()
+    start_date = now - timedelta(days=period_days)
     
-    # 반복 구매 상품 (3회 이상)
-    repeat_purchases = [
-        p for p in sorted_products 
-        if p["purchase_count"] >= 3
-    ][:3]
+    result = await db.execute(product_stats_query(user_id, start_date, now))
+    return build_summary(user_id, user_name, period_days, map(ProductStats.from_row, result), now)
+
+
+async def iter_purchase_summaries(
+    db: AsyncSession,
+    user_ids: Iterable[int],
+    period_days: int = 30
+) -> AsyncIterator[Tuple[int, Optional[Dict[str, Any]]]]:
+    """
+    여러 사용자의 구매 요약을 순서대로 생성 (CRM/푸시 배치용)
     
-    # 카테고리 선호도 계산
-    category_preferences: Dict[str, float] = {}
-    total_score = sum(p["weighted_score"] for p in sorted_products)
+    PURCHASE_SUMMARY_BATCH_SIZE명씩 한 번의 집계 쿼리로 계산하고, 결과 행을 스트리밍으로 읽어
+    사용자 단위로 요약을 만들어 바로 내보냅니다.
     
-    for product in sorted_products:
-        category = product["category"] or "기타"
-        if category not in category_preferences:
-            category_preferences[category] = 0.0
-        category_preferences[category] += product["weighted_score"] / total_score if total_score > 0 else 0
+    Args:
+        db: 비동기 데이터베이스 세션
+        user_ids: 사용자 ID 목록 (중복은 한 번만 처리)
+        period_days: 분석 기간 (일)
     
-    # 최근 트렌드 (최근 1주일)
-    week_ago = datetime.now() - timedelta(days=7)
-    recent_purchases = [
-        p for p in sorted_products
-        if p["last_purchased"] and p["last_purchased"] >= week_ago
-    ][:3]
+    Yields:
+        (사용자 ID, 구매 요약 정보) - 없는 사용자는 요약 대신 None
+    """
+    now = datetime.now()
+    start_date = now - timedelta(days=period_days)
+    unique_ids = sorted(set(user_ids))
     
-    # 메시지 변수 생성
-    top_product_names = [p["product_name"] for p in top_products[:3]]
-    message_variables = {
-        "count": len(purchases),
-        "products": ", ".join(top_product_names),
-        "most_purchased": top_products[0]["product_name"] if top_products else "",
-        "repeat_count": repeat_purchases[0]["purchase_count"] if repeat_purchases else 0,
-        "top_category": max(category_preferences.items(), key=lambda x: x[1])[0] if category_preferences else ""
-    }
+    for offset in range(0, len(unique_ids), PURCHASE_SUMMARY_BATCH_SIZE):
+        chunk = unique_ids[offset:offset + PURCHASE_SUMMARY_BATCH_SIZE]
+        found = set()
+        current_id, current_name, builder = None, None, None
+        
+        # 행을 쌓아두지 않고 사용자별 SummaryBuilder에 바로 반영
+        result = await db.stream(product_stats_batch_query(chunk, start_date, now))
+        async for row in result:
+            if row.user_id != current_id:
+                if current_id is not None:
+                    yield current_id, builder.build(current_id, current_name, period_days)
+                current_id, current_name, builder = row.user_id, row.user_name, SummaryBuilder(now)
+                found.add(row.user_id)
+            if row.product_id is not None:
+                builder.add(ProductStats.from_row(row))
+        if current_id is not None:
+            yield current_id, builder.build(current_id, current_name, period_days)
+        
+        for user_id in chunk:
+            if user_id not in found:
+                yield user_id, None
+
+
+async def get_purchase_summaries(
+    db: AsyncSession,
+    user_ids: Iterable[int],
+    period_days: int = 30
+) -> Dict[int, Dict[str, Any]]:
+    """
+    여러 사용자의 구매 요약 정보 반환
     
+    Returns:
+        사용자 ID → 구매 요약 정보 (없는 사용자는 제외)
+    """
     return {
-        "user_id": user_id,
-        "user_name": user.name,
-        "period": f"last_{period_days}_days",
-        "total_purchases": len(purchases),
-        "insights": {
-            "top_products": [
-                {
-                    "product_id": p["product_id"],
-                    "product_name": p["product_name"],
-                    "purchase_count": p["purchase_count"],
-                    "weighted_score": round(p["weighted_score"], 2),
-                    "last_purchased": p["last_purchased"].isoformat() if p["last_purchased"] else None
-                }
-                for p in top_products
-            ],
-            "recent_trends": [
-                {
-                    "product_id": p["product_id"],
-                    "product_name": p["product_name"],
-                    "purchase_count": p["purchase_count"],
-                    "last_purchased": p["last_purchased"].isoformat() if p["last_purchased"] else None
-                }
-                for p in recent_purchases
-            ],
-            "repeat_purchases": [
-                {
-                    "product_id": p["product_id"],
-                    "product_name": p["product_name"],
-                    "repeat_count": p["purchase_count"]
-                }
-                for p in repeat_purchases
-            ],
-            "category_preferences": category_preferences
-        },
-        "message_template_id": 0,  # 프론트엔드에서 랜덤 선택
-        "message_variables": message_variables
+        user_id: summary
+        async for user_id, summary in iter_purchase_summaries(db, user_ids, period_days)
+        if summary is not None
     }
-
@@ -0,0 +1,136 @@
+"""
+로컬 벡터 검색 기반 추천 후보 선택
+
+상품명/설명/카테고리/태그/요리 용도를 문자 n-gram TF-IDF 벡터로 색인하고,
+메시지 벡터와의 코사인 유사도를 한 번의 행렬 곱으로 계산해 상위 k개만 LLM에 전달합니다.
+색인 행렬과 idf는 카탈로그 스냅샷에 저장해 두고 워커마다 mmap으로 공유합니다.
+"""
+import os
+from typing import List, Dict, Any, Iterable, Optional
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+# LLM에 전달할 후보 수
+RECOMMEND_TOP_K = int(os.getenv("RECOMMEND_TOP_K", "20"))
+
+# 키워드 규칙/역색인에 매칭된 상품 가산점
+KEYWORD_BOOST = 0.5
+# 유사도가 같을 때 인기 상품이 앞서도록 하는 가산점 상한
+POPULARITY_PRIOR = 0.05
+# 구매이력 연관 점수(0~1)에 곱하는 가산점
+AFFINITY_BOOST = 0.2
+
+
+def product_text(product: Dict[str, Any]) -> str:
+    """상품을 검색용 텍스트로 변환"""
+    parts = [
+        product.get('name', ''),
+        product.get('category') or '',
+        product.get('subCategory') or '',
+        product.get('description') or '',
+        ' '.join(product.get('tags') or []),
+        ' '.join(product.get('usedIn') or []),
+    ]
+    return ' '.join(p for p in parts if p)
+
+
+def _vectorizer(vocabulary: Optional[Dict[str, int]] = None) -> TfidfVectorizer:
+    return TfidfVectorizer(
+        analyzer='char_wb',
+        ngram_range=(2, 3),
+        sublinear_tf=True,
+        dtype=np.float32,
+        vocabulary=vocabulary
+    )
+
+
+class ProductRetriever:
+    """TF-IDF 벡터 색인 (행 단위 L2 정규화된 희소 행렬)"""
+
+    def __init__(self, products: List[Dict[str, Any]], arrays: Optional[Dict[str, np.ndarray]] = None):
+        """
+        Args:
+            products: 상품 딕셔너리 목록 또는 CatalogSnapshot
+            arrays: 스냅샷에 저장된 색인 배열 (없으면 상품 목록으로 학습)
+        """
+        self.products = products
+        if arrays is not None:
+            # n-gram 사전만 워커별로 만들고 (크기는 n-gram 종류 수로 제한), 행렬/idf는 mmap 그대로 사용
+            vocabulary = arrays["vocabulary"].tolist()
+            self.vectorizer = _vectorizer({term: column for column, term in enumerate(vocabulary)})
+            self.vectorizer.idf_ = arrays["idf"]
+            self.matrix = sparse.csr_matrix(
+                (arrays["data"], arrays["indices"], arrays["indptr"]), shape=(len(products), len(vocabulary))
+            )
+            self.prior = arrays["prior"]
+            return
+
+        self.vectorizer = _vectorizer()
+        if products:
+            self.matrix = self.vectorizer.fit_transform([product_text(p) for p in products]).tocsr()
+        else:
+            self.matrix = None
+
+        reviews = np.array([p.get('reviews', 0) or 0 for p in products], dtype=np.float32)
+        log_reviews = np.log1p(reviews)
+        peak = float(log_reviews.max()) if len(log_reviews) else 0.0
+        self.prior = (log_reviews / peak * POPULARITY_PRIOR) if peak > 0 else np.zeros_like(log_reviews)
+
+    def to_arrays(self) -> Optional[Dict[str, np.ndarray]]:
+        """스냅샷에 저장할 배열 (상품이 없으면 None)"""
+        if self.matrix is None:
+            return None
+        vocabulary = sorted(self.vectorizer.vocabulary_, key=self.vectorizer.vocabulary_.get)
+        # scipy는 indices / indptr가 같은 정수형이어야 복사 없이 사용하므로 둘을 맞춰 저장
+        index_dtype = np.int32 if self.matrix.nnz < np.iinfo(np.int32).max else np.int64
+        return {
+            "vocabulary": np.array(vocabulary, dtype=str),
+            "idf": self.vectorizer.idf_.astype(np.float32),
+            "data": self.matrix.data.astype(np.float32),
+            "indices": self.matrix.indices.astype(index_dtype),
+            "indptr": self.matrix.indptr.astype(index_dtype),
+            "prior": self.prior.astype(np.float32),
+        }
+
+    def scores(self, query: str) -> np.ndarray:
+        """모든 상품에 대한 코사인 유사도"""
+        if self.matrix is None:
+            return np.zeros(0, dtype=np.float32)
+        query_vector = self.vectorizer.transform([query])
+        return (self.matrix @ query_vector.T).toarray().ravel()
+
+    def top_k(
+        self,
+        query: str,
+        allowed: np.ndarray,
+        boosted: Iterable[int] = (),
+        k: int = RECOMMEND_TOP_K,
+        affinity: Optional[np.ndarray] = None
+    ) -> List[int]:
+        """
+        유사도 상위 k개 상품 위치 반환
+
+        Args:
+            query: 검색어 (사용자 메시지)
+            allowed: 프로필 필터를 통과한 상품 여부 (bool 배열)
+            boosted: 키워드 매칭으로 가산점을 줄 상품 위치
+            k: 반환할 개수
+            affinity: 상품별 구매이력 연관 점수 (0~1, AFFINITY_BOOST만큼 가산)
+        """
+        if self.matrix is None or k <= 0:
+            return []
+        scores = self.scores(query) + self.prior
+        if affinity is not None:
+            scores = scores + AFFINITY_BOOST * affinity
+        boosted_positions = np.fromiter(boosted, dtype=np.int64)
+        if len(boosted_positions):
+            scores[boosted_positions] += KEYWORD_BOOST
+        scores = np.where(allowed, scores, -np.inf)
+
+        available = int(allowed.sum())
+        k = min(k, available)
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top], kind='stable')].tolist()
@@ -0,0 +1,88 @@
+"""
+벤치마크 결과 비교
+
+같은 (시나리오, 카탈로그 크기, 동시 요청 수) 항목끼리 비교해
+p95/p99 지연이나 처리량이 threshold 이상 나빠지면 종료 코드 1을 반환합니다.
+
+사용법:
+    python3 backend/benchmarks/compare.py baseline.json candidate.json --threshold 0.1
+"""
+import sys
+import json
+import argparse
+from typing import Any, Dict, List, Optional, Tuple
+
+Key = Tuple[str, int, int]
+
+
+def load_results(path: str) -> Dict[Key, Dict[str, Any]]:
+    with open(path) as f:
+        report = json.load(f)
+    return {
+        (r["scenario"], r["catalog_size"], r["concurrency"]): r
+        for r in report["results"]
+    }
+
+
+def _change(before: float, after: float) -> float:
+    return (after - before) / before if before else 0.0
+
+
+def compare(
+    baseline: Dict[Key, Dict[str, Any]],
+    candidate: Dict[Key, Dict[str, Any]],
+    threshold: float
+) -> Tuple[List[str], List[str]]:
+    """
+    Returns:
+        (비교표 줄 목록, 회귀 항목 목록)
+    """
+    lines = [
+        f"{'scenario':<17} {'catalog':>8} {'c':>4}  {'p50':>16}  {'p95':>16}  {'p99':>16}  {'req/s':>16}"
+    ]
+    regressions = []
+    for key in sorted(baseline.keys() & candidate.keys()):
+        before, after = baseline[key], candidate[key]
+        cells = []
+        for metric in ("p50", "p95", "p99"):
+            change = _change(before["latency_ms"][metric], after["latency_ms"][metric])
+            cells.append(f"{after['latency_ms'][metric]:>8.1f} ({change:+.0%})")
+            if metric != "p50" and change > threshold:
+                regressions.append(f"{key}: {metric} {change:+.0%}")
+        change = _change(before["throughput_rps"], after["throughput_rps"])
+        cells.append(f"{after['throughput_rps']:>8.1f} ({change:+.0%})")
+        if change < -threshold:
+            regressions.append(f"{key}: throughput {change:+.0%}")
+        if after["errors"] > before["errors"]:
+            regressions.append(f"{key}: errors {before['errors']} → {after['errors']}")
+        scenario, catalog_size, concurrency = key
+        lines.append(f"{scenario:<17} {catalog_size:>8} {concurrency:>4}  " + "  ".join(cells))
+    return lines, regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="벤치마크 결과 비교")
+    parser.add_argument("baseline", help="기준 결과 JSON")
+    parser.add_argument("candidate", help="비교할 결과 JSON")
+    parser.add_argument("--threshold", type=float, default=0.1, help="허용 변화율 (기본값: 0.1 = 10%%)")
+    args = parser.parse_args(argv)
+
+    baseline = load_results(args.baseline)
+    candidate = load_results(args.candidate)
+    lines, regressions = compare(baseline, candidate, args.threshold)
+    print("\n".join(lines))
+
+    missing = sorted(baseline.keys() - candidate.keys())
+    if missing:
+        print(f"⚠️  비교 결과에 없는 항목: {missing}")
+    if regressions:
+        print("❌ 성능 회귀:")
+        for regression in regressions:
+            print(f"   {regression}")
+        return 1
+    print("✅ 성능 회귀 없음")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
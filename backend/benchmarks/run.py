@@ -0,0 +1,379 @@
+"""
+챗봇 / 구매 인사이트 API 벤치마크 (오프라인)
+
+카탈로그 크기마다 합성 데이터로 SQLite DB를 새로 만들고,
+LLM 스텁 서버와 API 서버(uvicorn)를 띄운 뒤 동시 요청 수를 바꿔 가며 측정합니다.
+외부 네트워크 없이 실행되며, 결과는 커밋 간 비교할 수 있도록 JSON으로 저장합니다.
+
+시나리오:
+- chat: POST /api/chatbot/chat (model=gpt, 스텁 LLM 사용)
+- chat-single-shot: POST /api/chatbot/chat (model=gpt, single_shot=true, 의도/감정/추천 LLM 한 번)
+- chat-local: POST /api/chatbot/chat (model=local, LLM 호출 없음)
+- purchase-summary: GET /api/users/{id}/purchase-summary
+
+사용법:
+    python3 backend/benchmarks/run.py
+    python3 backend/benchmarks/run.py --catalog-sizes 1000 --concurrency 1,16 --requests 100
+    python3 backend/benchmarks/compare.py before.json after.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import socket
+import asyncio
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCHMARKS_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.synthetic import build_database  # noqa: E402
+
+SCENARIOS = ("chat", "chat-single-shot", "chat-local", "purchase-summary")
+
+RECOMMEND_MESSAGES = [
+    "오늘 저녁 밀키트 추천해줘",
+    "간편식 뭐가 좋을까요?",
+    "아이들 간식으로 과일 추천해주세요",
+    "고기 요리 하고 싶은데 추천해줘",
+    "해산물로 파스타 만들 재료 추천",
+    "다이어트용 채소 추천해주세요",
+]
+CASUAL_MESSAGES = [
+    "안녕하세요",
+    "오늘 날씨 좋네요",
+    "고마워요!",
+    "요즘 너무 피곤해요",
+]
+
+
+# ============ 프로세스 관리 ============
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(url: str, process: subprocess.Popen, timeout: float) -> None:
+    """헬스 체크가 성공할 때까지 대기 (프로세스가 죽거나 시간 초과 시 예외)"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"서버 프로세스가 종료되었습니다 (exit={process.returncode}): {url}")
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"서버가 {timeout}초 안에 준비되지 않았습니다: {url}")
+
+
+def stop_process(process: subprocess.Popen) -> None:
+    if process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def start_stub(args: argparse.Namespace, log) -> Tuple[subprocess.Popen, int]:
+    port = free_port()
+    process = subprocess.Popen(
+        [
+            sys.executable, os.path.join(BENCHMARKS_DIR, "stub_llm.py"),
+            "--port", str(port),
+            "--latency-ms", str(args.llm_latency_ms),
+            "--jitter-ms", str(args.llm_jitter_ms),
+            "--seed", str(args.seed),
+        ],
+        stdout=log,
+        stderr=subprocess.STDOUT,
+    )
+    wait_until_ready(f"http://127.0.0.1:{port}/health", process, 30)
+    return process, port
+
+
+def start_api(args: argparse.Namespace, database_path: str, secret_path: str, stub_port: int, log) -> Tuple[subprocess.Popen, int]:
+    port = free_port()
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": f"sqlite:///{database_path}",
+        "SECRET_JSON_PATH": secret_path,
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{stub_port}/v1",
+        "LLM_CACHE_ENABLED": "1" if args.llm_cache else "0",
+        "INSIGHTS_REFRESH_ENABLED": "0",
+        "LOG_LEVEL": args.log_level,
+    })
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1",
+            "--port", str(port),
+            "--workers", str(args.workers),
+            "--log-level", "warning",
+            "--no-access-log",
+        ],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=log,
+        stderr=subprocess.STDOUT,
+    )
+    wait_until_ready(f"http://127.0.0.1:{port}/health", process, args.startup_timeout)
+    return process, port
+
+
+# ============ 부하 생성 ============
+
+RequestFactory = Callable[[random.Random], Tuple[str, str, Optional[Dict[str, Any]]]]
+
+
+def chat_request(model: str, users: int, single_shot: bool = False) -> RequestFactory:
+    def factory(rng: random.Random):
+        messages = RECOMMEND_MESSAGES if rng.random() < 0.7 else CASUAL_MESSAGES
+        return "POST", "/api/chatbot/chat", {
+            "message": rng.choice(messages),
+            "model": model,
+            "single_shot": single_shot,
+            "user_profile": {
+                "name": f"사용자{rng.randint(1, users)}",
+                "gender": rng.choice(["M", "F", "U"]),
+                "ageGroup": rng.choice(["20s", "30s", "40s", "50s+"]),
+            },
+        }
+    return factory
+
+
+def purchase_summary_request(users: int) -> RequestFactory:
+    def factory(rng: random.Random):
+        return "GET", f"/api/users/{rng.randint(1, users)}/purchase-summary", None
+    return factory
+
+
+async def run_load(
+    base_url: str,
+    factory: RequestFactory,
+    concurrency: int,
+    requests: int,
+    seed: int
+) -> Tuple[List[float], int, float]:
+    """
+    concurrency개의 작업자가 총 requests개의 요청을 보냅니다.
+
+    Returns:
+        (성공 요청 지연 시간 목록(초), 실패 수, 전체 소요 시간(초))
+    """
+    rng = random.Random(seed)
+    plan = [factory(rng) for _ in range(requests)]
+    latencies: List[float] = []
+    errors = 0
+    next_index = 0
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120.0) as client:
+        async def worker():
+            nonlocal next_index, errors
+            while next_index < len(plan):
+                method, path, body = plan[next_index]
+                next_index += 1
+                started = time.perf_counter()
+                try:
+                    response = await client.request(method, path, json=body)
+                    ok = response.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return latencies, errors, elapsed
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    values = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(float(values.mean()), 2),
+            "p50": round(float(p50), 2),
+            "p95": round(float(p95), 2),
+            "p99": round(float(p99), 2),
+            "max": round(float(values.max()), 2),
+        },
+    }
+
+
+# ============ 실행 ============
+
+def git_revision() -> Dict[str, Any]:
+    def git(*command: str) -> str:
+        return subprocess.run(
+            ["git", *command], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    try:
+        return {"commit": git("rev-parse", "HEAD"), "dirty": bool(git("status", "--porcelain", "--", "."))}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+
+def scenario_factory(scenario: str, users: int) -> RequestFactory:
+    if scenario == "chat":
+        return chat_request("gpt", users)
+    if scenario == "chat-single-shot":
+        return chat_request("gpt", users, single_shot=True)
+    if scenario == "chat-local":
+        return chat_request("local", users)
+    return purchase_summary_request(users)
+
+
+def run_catalog(args: argparse.Namespace, catalog_size: int, workdir: str, log) -> List[Dict[str, Any]]:
+    database_path = os.path.join(workdir, f"bench-{catalog_size}.db")
+    dataset = build_database(
+        f"sqlite:///{database_path}",
+        catalog_size,
+        args.users,
+        purchases_per_user=args.purchases_per_user,
+        seed=args.seed
+    )
+    print(f"📦 카탈로그 {catalog_size:,}개: 합성 데이터 생성 {dataset['seconds']}초", file=sys.stderr)
+
+    secret_path = os.path.join(workdir, "secret.json")
+    with open(secret_path, "w") as f:
+        # Gemini 키가 없으므로 헤지 요청 없이 스텁(OpenAI 호환)만 호출
+        json.dump({"openai_api_key": "sk-benchmark"}, f)
+
+    stub, stub_port = start_stub(args, log)
+    try:
+        started = time.perf_counter()
+        api, api_port = start_api(args, database_path, secret_path, stub_port, log)
+        startup_seconds = time.perf_counter() - started
+        try:
+            base_url = f"http://127.0.0.1:{api_port}"
+            results = []
+            for scenario in args.scenarios:
+                factory = scenario_factory(scenario, args.users)
+                if args.warmup:
+                    asyncio.run(run_load(base_url, factory, min(args.warmup, 8), args.warmup, args.seed + 1))
+                for concurrency in args.concurrency:
+                    latencies, errors, elapsed = asyncio.run(
+                        run_load(base_url, factory, concurrency, args.requests, args.seed)
+                    )
+                    result = {
+                        "scenario": scenario,
+                        "catalog_size": catalog_size,
+                        "concurrency": concurrency,
+                        **summarize(latencies, errors, elapsed),
+                    }
+                    results.append(result)
+                    latency = result["latency_ms"]
+                    print(
+                        f"   {scenario:<17} c={concurrency:<4} {result['throughput_rps']:>8.1f} req/s  "
+                        f"p50={latency['p50']:.1f}ms p95={latency['p95']:.1f}ms p99={latency['p99']:.1f}ms "
+                        f"errors={errors}",
+                        file=sys.stderr
+                    )
+            for result in results:
+                result["startup_seconds"] = round(startup_seconds, 2)
+            return results
+        finally:
+            stop_process(api)
+    finally:
+        stop_process(stub)
+
+
+def parse_int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def parse_scenarios(value: str) -> List[str]:
+    scenarios = [v.strip() for v in value.split(",") if v.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        raise argparse.ArgumentTypeError(f"알 수 없는 시나리오: {', '.join(sorted(unknown))}")
+    return scenarios
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="챗봇 / 구매 인사이트 API 벤치마크")
+    parser.add_argument("--catalog-sizes", type=parse_int_list, default=[1000, 10000, 100000])
+    parser.add_argument("--concurrency", type=parse_int_list, default=[1, 8, 32])
+    parser.add_argument("--scenarios", type=parse_scenarios, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=200, help="동시 요청 수 단계별 요청 수")
+    parser.add_argument("--warmup", type=int, default=20, help="시나리오별 워밍업 요청 수 (결과 제외)")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--purchases-per-user", type=int, default=20)
+    parser.add_argument("--llm-latency-ms", type=float, default=300)
+    parser.add_argument("--llm-jitter-ms", type=float, default=100)
+    parser.add_argument("--llm-cache", action="store_true", help="LLM 응답 캐시 사용 (기본값: 끔)")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn 워커 수")
+    parser.add_argument("--startup-timeout", type=float, default=300)
+    parser.add_argument("--log-level", default="WARNING", help="API 서버 LOG_LEVEL")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="결과 JSON 경로 (기본값: benchmarks/results/<시각>-<커밋>.json)")
+    args = parser.parse_args(argv)
+
+    revision = git_revision()
+    started_at = datetime.now()
+    results: List[Dict[str, Any]] = []
+    with tempfile.TemporaryDirectory(prefix="freshmind-bench-") as workdir:
+        log_path = os.path.join(workdir, "servers.log")
+        with open(log_path, "w") as log:
+            try:
+                for catalog_size in args.catalog_sizes:
+                    results += run_catalog(args, catalog_size, workdir, log)
+            except Exception:
+                log.flush()
+                with open(log_path) as f:
+                    sys.stderr.write(f.read()[-4000:])
+                raise
+
+    report = {
+        "meta": {
+            **revision,
+            "started_at": started_at.isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "config": {
+                key: value for key, value in vars(args).items() if key != "output"
+            },
+        },
+        "results": results,
+    }
+
+    output = args.output
+    if output is None:
+        commit = (revision["commit"] or "unknown")[:8]
+        output = os.path.join(
+            BENCHMARKS_DIR, "results", f"{started_at:%Y%m%d-%H%M%S}-{commit}.json"
+        )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"✅ 결과 저장: {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
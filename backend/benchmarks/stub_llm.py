@@ -0,0 +1,180 @@
+"""
+벤치마크용 OpenAI 호환 LLM 스텁 서버 (오프라인)
+
+/v1/chat/completions를 흉내 내며, 응답마다 지연 시간(평균 ± 지터)을 넣습니다.
+프롬프트 내용을 보고 의도 분석 / 감정 분석 / 상품 추천 / 단일 호출 / 일반 대화 응답을 구분해
+앱이 그대로 파싱할 수 있는 응답을 돌려줍니다. 추천 응답은 프롬프트의 상품 목록에서 고릅니다.
+
+사용법:
+    python3 backend/benchmarks/stub_llm.py --port 9999 --latency-ms 300 --jitter-ms 100
+    OPENAI_BASE_URL=http://127.0.0.1:9999/v1 uvicorn app.main:app
+"""
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from typing import Any, Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+CASUAL_REPLY = "안녕하세요! 반가워요 😊 오늘은 어떤 음식이나 식재료를 찾고 계신가요?"
+SENTIMENTS = ("positive", "neutral", "negative")
+
+
+class StubConfig:
+    """응답 지연 설정"""
+
+    def __init__(self, latency_ms: float, jitter_ms: float, chunk_ms: float, seed: int):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.chunk_ms = chunk_ms
+        self.rng = random.Random(seed)
+
+    def delay(self) -> float:
+        """이번 응답의 지연 시간 (초), 평균 ± 지터 범위의 균등 분포"""
+        jitter = self.rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        return max(0.0, self.latency_ms + jitter) / 1000
+
+
+def _candidate_ids(prompt: str) -> List[int]:
+    """추천 프롬프트의 상품 목록(JSON 배열 한 줄)에서 상품 ID 추출"""
+    for line in prompt.splitlines():
+        line = line.strip()
+        if line.startswith("[{") and line.endswith("}]"):
+            try:
+                return [p["id"] for p in json.loads(line)]
+            except (ValueError, KeyError, TypeError):
+                return []
+    return []
+
+
+def _message(prompt: str) -> str:
+    """프롬프트의 '메시지: "..."' 부분"""
+    start = prompt.find('메시지: "')
+    if start < 0:
+        return ""
+    start += len('메시지: "')
+    return prompt[start:prompt.find('"', start)]
+
+
+def reply_for(prompt: str, rng: random.Random) -> str:
+    """프롬프트 종류에 맞는 응답 본문"""
+    if '"intent_reason"' in prompt:
+        # 단일 호출 (의도 + 감정 + 추천)
+        needs = "추천" in _message(prompt)
+        ids = _candidate_ids(prompt)[:5] if needs else []
+        return json.dumps({
+            "needs_product_recommendation": needs,
+            "intent_type": "product_inquiry" if needs else "casual_chat",
+            "intent_reason": "스텁 응답",
+            "sentiment": rng.choice(SENTIMENTS),
+            "sentiment_score": round(rng.uniform(0.3, 0.9), 2),
+            "keywords": _message(prompt).split()[:3],
+            "recommendations": [
+                {"product_id": product_id, "reason": "스텁 추천", "relevance_score": round(0.9 - i * 0.1, 2)}
+                for i, product_id in enumerate(ids)
+            ],
+        }, ensure_ascii=False)
+    if '"needs_product_recommendation"' in prompt:
+        return json.dumps({
+            "needs_product_recommendation": False,
+            "intent_type": "casual_chat",
+            "reason": "스텁 응답",
+        }, ensure_ascii=False)
+    if '"recommendations"' in prompt:
+        ids = _candidate_ids(prompt)[:5]
+        return json.dumps({
+            "recommendations": [
+                {"product_id": product_id, "reason": "스텁 추천", "relevance_score": round(0.9 - i * 0.1, 2)}
+                for i, product_id in enumerate(ids)
+            ]
+        }, ensure_ascii=False)
+    if '"sentiment"' in prompt:
+        return json.dumps({
+            "sentiment": rng.choice(SENTIMENTS),
+            "score": round(rng.uniform(0.3, 0.9), 2),
+            "keywords": _message(prompt).split()[:3],
+        }, ensure_ascii=False)
+    return CASUAL_REPLY
+
+
+def _completion(model: str, content: str) -> Dict[str, Any]:
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+
+def _chunk(model: str, delta: Dict[str, Any], finish_reason: Optional[str] = None) -> str:
+    body = {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(body, ensure_ascii=False)}\n\n"
+
+
+def create_app(config: StubConfig) -> FastAPI:
+    app = FastAPI(title="FreshMind LLM Stub")
+    app.state.requests = 0
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        model = body.get("model", "stub")
+        prompt = body["messages"][-1]["content"]
+        content = reply_for(prompt, config.rng)
+        await asyncio.sleep(config.delay())
+
+        if not body.get("stream"):
+            return _completion(model, content)
+
+        async def events():
+            # 첫 토큰까지 지연을 넣은 뒤 나머지는 chunk_ms 간격으로 전송
+            for start in range(0, len(content), 8):
+                yield _chunk(model, {"content": content[start:start + 8]})
+                await asyncio.sleep(config.chunk_ms / 1000)
+            yield _chunk(model, {}, "stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy", "requests": app.state.requests}
+
+    return app
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="OpenAI 호환 LLM 스텁 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9999)
+    parser.add_argument("--latency-ms", type=float, default=300, help="평균 응답 지연 (ms)")
+    parser.add_argument("--jitter-ms", type=float, default=100, help="지연 편차 (평균 ± ms, 균등 분포)")
+    parser.add_argument("--chunk-ms", type=float, default=20, help="스트리밍 청크 간격 (ms)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    config = StubConfig(args.latency_ms, args.jitter_ms, args.chunk_ms, args.seed)
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
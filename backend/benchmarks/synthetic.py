@@ -0,0 +1,205 @@
+"""
+벤치마크용 합성 데이터 생성
+
+시드가 같으면 같은 상품/사용자/구매이력이 만들어집니다.
+구매 시각은 생성 시점 기준 최근 days일 안에 분포하므로 구매 요약(최근 30일)이 항상 채워집니다.
+
+사용법:
+    python3 backend/benchmarks/synthetic.py sqlite:////tmp/bench.db --products 10000 --users 1000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+from datetime import datetime, timedelta
+from itertools import accumulate
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import create_engine, insert
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import Base  # noqa: E402
+from app.models import User, Product, PurchaseHistory  # noqa: E402
+
+# 카테고리 → (서브카테고리, 상품명 재료)
+CATEGORIES = {
+    "간편식/밀키트": (["밀키트", "즉석식품", "냉동식품"], ["부대찌개", "감바스", "밀푀유나베", "떡볶이", "파스타", "닭갈비", "된장찌개"]),
+    "채소": (["잎채소", "열매채소", "뿌리채소"], ["양상추", "방울토마토", "파프리카", "당근", "감자", "시금치"]),
+    "육류/계란": (["소고기", "돼지고기", "가공육"], ["한우 등심", "삼겹살", "목살", "베이컨", "유정란"]),
+    "과일": (["열대과일", "사과/배", "베리"], ["바나나", "사과", "블루베리", "딸기", "망고"]),
+    "해산물": (["생선", "조개류", "연체류"], ["연어", "고등어", "바지락", "오징어", "새우"]),
+    "쌀/면/곡물": (["쌀", "면", "잡곡"], ["백미", "현미", "소면", "파스타면", "귀리"]),
+    "유제품": (["우유", "치즈", "요거트"], ["우유", "모짜렐라 치즈", "그릭요거트", "버터"]),
+    "양념/오일": (["장류", "오일", "소스"], ["고추장", "된장", "올리브오일", "굴소스"]),
+    "음료/차": (["주스", "차", "커피"], ["오렌지 주스", "보리차", "콜드브루"]),
+    "냉동식품": (["냉동조리", "만두", "아이스크림"], ["만두", "볶음밥", "치킨너겟"]),
+}
+ADJECTIVES = ["신선한", "국내산", "유기농", "프리미엄", "간편", "대용량", "한입", "저당"]
+USED_IN = ["찌개/국/탕", "볶음", "구이", "조림/무침", "샐러드", "생식/간식", "파스타/면", "밥/죽", "전/튀김"]
+TAGS = ["유기농", "국내산", "당도높음", "신선", "필수재료", "대용량", "신선팩", "세척", "간편", "저칼로리"]
+AGE_GROUPS = ["10s", "20s", "30s", "40s", "50s+"]
+TARGET_GENDERS = ["all", "all", "all", "male-oriented", "female-oriented"]
+OCCUPATIONS = ["대학생", "직장인", "주부", "기타"]
+MARITAL_STATUSES = ["미혼", "기혼"]
+
+INSERT_CHUNK_SIZE = 5000
+
+
+def generate_products(count: int, rng: random.Random) -> Iterator[Dict[str, Any]]:
+    categories = list(CATEGORIES)
+    for product_id in range(1, count + 1):
+        category = categories[product_id % len(categories)]
+        sub_categories, items = CATEGORIES[category]
+        sub_category = rng.choice(sub_categories)
+        name = f"{rng.choice(ADJECTIVES)} {rng.choice(items)} {product_id}"
+        if sub_category == "밀키트":
+            name = f"[밀키트] {name}"
+        price = rng.randrange(2000, 40000, 100)
+        yield {
+            "product_id": product_id,
+            "name": name,
+            "description": f"{category} {sub_category} 상품입니다. {name}",
+            "category": category,
+            "sub_category": sub_category,
+            "price": price,
+            "original_price": price + rng.choice([0, 0, 1000, 3000]),
+            "image_url": f"https://example.com/products/{product_id}.jpg",
+            "rating": round(rng.uniform(3.5, 5.0), 1),
+            "review_count": rng.randrange(0, 20000),
+            "purchase_count": rng.randrange(0, 50000),
+            "target_gender": rng.choice(TARGET_GENDERS),
+            "target_age_groups": rng.sample(AGE_GROUPS, rng.randint(0, 3)),
+            "used_in": rng.sample(USED_IN, rng.randint(0, 3)),
+            "tags": rng.sample(TAGS, rng.randint(0, 3)),
+            "stock": rng.randrange(0, 500),
+            "badge": rng.choice([None, None, "베스트", "신상품"]),
+            "is_kurly_only": rng.random() < 0.2,
+        }
+
+
+def generate_users(count: int, rng: random.Random) -> Iterator[Dict[str, Any]]:
+    today = datetime.now()
+    for user_id in range(1, count + 1):
+        age = rng.randint(15, 65)
+        yield {
+            "user_id": user_id,
+            "name": f"사용자{user_id}",
+            "birth_date": today - timedelta(days=age * 365),
+            "gender": rng.choice(["M", "F", "U"]),
+            "age_group": "50s+" if age >= 50 else f"{age // 10 * 10}s",
+            "occupation": rng.choice(OCCUPATIONS),
+            "marital_status": rng.choice(MARITAL_STATUSES),
+        }
+
+
+def generate_purchases(
+    users: int,
+    products: int,
+    purchases_per_user: int,
+    days: int,
+    rng: random.Random
+) -> Iterator[Dict[str, Any]]:
+    """사용자별 구매이력 (인기 상품에 구매가 몰리도록 순위^-0.8 가중치)"""
+    cum_weights = list(accumulate(1 / (rank + 1) ** 0.8 for rank in range(products)))
+    now = datetime.now()
+    purchase_id = 0
+    for user_id in range(1, users + 1):
+        count = max(1, int(rng.gauss(purchases_per_user, purchases_per_user / 3)))
+        # 사용자별 선호 상품 몇 개를 반복 구매
+        favorites = rng.choices(range(1, products + 1), cum_weights=cum_weights, k=5)
+        for _ in range(count):
+            purchase_id += 1
+            if rng.random() < 0.3:
+                product_id = rng.choice(favorites)
+            else:
+                product_id = rng.choices(range(1, products + 1), cum_weights=cum_weights)[0]
+            yield {
+                "purchase_id": purchase_id,
+                "user_id": user_id,
+                "product_id": product_id,
+                "quantity": rng.choice([1, 1, 1, 2, 2, 3, 5]),
+                "purchased_at": now - timedelta(seconds=rng.randrange(days * 86400)),
+            }
+
+
+def _insert_all(connection, table, rows: Iterator[Dict[str, Any]]) -> int:
+    total = 0
+    chunk: List[Dict[str, Any]] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= INSERT_CHUNK_SIZE:
+            connection.execute(insert(table), chunk)
+            total += len(chunk)
+            chunk = []
+    if chunk:
+        connection.execute(insert(table), chunk)
+        total += len(chunk)
+    return total
+
+
+def build_database(
+    database_url: str,
+    products: int,
+    users: int,
+    purchases_per_user: int = 20,
+    days: int = 90,
+    seed: int = 42
+) -> Dict[str, Any]:
+    """
+    빈 DB에 테이블을 만들고 합성 데이터를 채웁니다.
+
+    Returns:
+        생성 결과 (products, users, purchases, seconds)
+    """
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    engine = create_engine(database_url)
+    try:
+        Base.metadata.create_all(engine)
+        with engine.begin() as connection:
+            product_count = _insert_all(connection, Product.__table__, generate_products(products, rng))
+            user_count = _insert_all(connection, User.__table__, generate_users(users, rng))
+            purchase_count = _insert_all(
+                connection,
+                PurchaseHistory.__table__,
+                generate_purchases(users, products, purchases_per_user, days, rng)
+            )
+    finally:
+        engine.dispose()
+    return {
+        "products": product_count,
+        "users": user_count,
+        "purchases": purchase_count,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="벤치마크용 합성 데이터 생성")
+    parser.add_argument("database_url", help="대상 DB URL (빈 DB)")
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--purchases-per-user", type=int, default=20)
+    parser.add_argument("--days", type=int, default=90, help="구매 시각 분포 기간 (일)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    result = build_database(
+        args.database_url,
+        args.products,
+        args.users,
+        purchases_per_user=args.purchases_per_user,
+        days=args.days,
+        seed=args.seed
+    )
+    print(
+        f"✅ 상품 {result['products']:,}개, 사용자 {result['users']:,}명, "
+        f"구매이력 {result['purchases']:,}건 생성 ({result['seconds']}초)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
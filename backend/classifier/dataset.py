@@ -0,0 +1,90 @@
+"""
+로컬 분류기 학습/평가 데이터
+
+- JSONL 파일: {"text", "intent", "sentiment"} (정답이 없는 작업은 생략 가능)
+- 대화 로그(chat_messages): 사용자 메시지의 감정 분석 결과를 sentiment 정답으로,
+  바로 다음 AI 응답에 추천 상품이 있었는지를 intent 정답(product_inquiry / casual_chat)으로 사용
+"""
+import os
+import sys
+import json
+import random
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import create_engine, select
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models import ChatMessage  # noqa: E402
+from app.services.message_classifier import SENTIMENT_LABELS, TASKS, load_examples  # noqa: E402
+
+Example = Dict[str, Optional[str]]
+
+
+def _recommended(value: Optional[str]) -> bool:
+    if not value:
+        return False
+    try:
+        return bool(json.loads(value))
+    except ValueError:
+        return False
+
+
+def load_logged_examples(database_url: str, limit: Optional[int] = None) -> List[Example]:
+    """chat_messages 테이블의 사용자 메시지 (최근 limit건)"""
+    query = (
+        select(
+            ChatMessage.message_id,
+            ChatMessage.user_id,
+            ChatMessage.sender,
+            ChatMessage.message_text,
+            ChatMessage.sentiment,
+            ChatMessage.recommended_products,
+        )
+        .order_by(ChatMessage.user_id, ChatMessage.message_id)
+    )
+    engine = create_engine(database_url)
+    logged: List[Tuple[int, Example]] = []
+    try:
+        with engine.connect() as connection:
+            # (user_id, message_id, 응답을 기다리는 사용자 메시지)
+            pending: Optional[Tuple[int, int, Example]] = None
+            for row in connection.execute(query).yield_per(10000):
+                if row.sender == "user":
+                    if pending is not None:
+                        logged.append(pending[1:])
+                    sentiment = row.sentiment if row.sentiment in SENTIMENT_LABELS else None
+                    pending = (
+                        row.user_id, row.message_id,
+                        {"text": row.message_text, "intent": None, "sentiment": sentiment}
+                    )
+                elif pending is not None and pending[0] == row.user_id:
+                    pending[2]["intent"] = (
+                        "product_inquiry" if _recommended(row.recommended_products) else "casual_chat"
+                    )
+                    logged.append(pending[1:])
+                    pending = None
+            if pending is not None:
+                logged.append(pending[1:])
+    finally:
+        engine.dispose()
+
+    # 사용자별로 읽었으므로 메시지 순서(message_id)로 다시 정렬한 뒤 최근 limit건 선택
+    logged.sort(key=lambda item: item[0])
+    examples = [e for _, e in logged if e["text"] and any(e[task] for task in TASKS)]
+    return examples[-limit:] if limit else examples
+
+
+def load_files(paths: List[str]) -> List[Example]:
+    examples: List[Example] = []
+    for path in paths:
+        examples.extend(load_examples(path))
+    return examples
+
+
+def split(examples: List[Example], holdout: float, seed: int) -> Tuple[List[Example], List[Example]]:
+    """(학습, 검증) 무작위 분할"""
+    shuffled = list(examples)
+    random.Random(seed).shuffle(shuffled)
+    cut = int(len(shuffled) * (1 - holdout))
+    return shuffled[:cut], shuffled[cut:]
@@ -0,0 +1,182 @@
+"""
+로컬 분류기 평가
+
+신뢰도 임계값별로 로컬 처리 비율(coverage)과 그 중 정답 비율(accuracy),
+추천이 필요한 메시지를 로컬에서 추천 불필요로 판단한 비율(missed_recommendation),
+메시지 1건당 추론 시간을 출력합니다.
+
+사용법:
+    python3 backend/classifier/evaluate.py --data labeled.jsonl
+    python3 backend/classifier/evaluate.py --from-logs --model backend/app/data/message_classifier.npz
+    python3 backend/classifier/evaluate.py --cross-validate 5   # 시드 데이터 (+ --data/--from-logs) 교차 검증
+"""
+import os
+import sys
+import time
+import random
+import argparse
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.message_classifier import (  # noqa: E402
+    LOCAL_LABELS,
+    MESSAGE_CLASSIFIER_PATH,
+    MessageClassifier,
+    Prediction,
+    TASKS,
+    fit_examples,
+    load_examples,
+)
+from dataset import Example, load_files, load_logged_examples  # noqa: E402
+
+DEFAULT_THRESHOLDS = (0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95)
+
+
+def summarize(
+    task: str,
+    labeled: List[Example],
+    predictions: List[Prediction],
+    thresholds=DEFAULT_THRESHOLDS
+) -> Dict[str, Any]:
+    """한 작업의 전체 정확도와 임계값별 coverage / accuracy / missed_recommendation"""
+    correct = [p.label == e[task] for p, e in zip(predictions, labeled)]
+    rows = []
+    for threshold in thresholds:
+        # 서버와 같이 LOCAL_LABELS에 있는 라벨만 로컬에서 확정
+        local = [
+            i for i, p in enumerate(predictions)
+            if p.confidence >= threshold and p.label in LOCAL_LABELS[task]
+        ]
+        local_set = set(local)
+        row = {
+            "threshold": threshold,
+            "coverage": len(local) / len(labeled),
+            "accuracy": sum(correct[i] for i in local) / len(local) if local else None,
+        }
+        if task == "intent":
+            inquiries = [i for i, e in enumerate(labeled) if e[task] == "product_inquiry"]
+            missed = [i for i in inquiries if i in local_set and predictions[i].label != "product_inquiry"]
+            row["missed_recommendation"] = len(missed) / len(inquiries) if inquiries else None
+        rows.append(row)
+    return {"examples": len(labeled), "accuracy": sum(correct) / len(labeled), "thresholds": rows}
+
+
+def evaluate(
+    classifier: MessageClassifier,
+    examples: List[Example],
+    thresholds=DEFAULT_THRESHOLDS
+) -> Dict[str, Any]:
+    """작업별 전체 정확도와 임계값별 coverage / accuracy"""
+    report: Dict[str, Any] = {}
+    for task in TASKS:
+        labeled = [e for e in examples if e.get(task)]
+        if not labeled or task not in classifier.heads:
+            continue
+        predictions = [classifier.predict(task, e["text"]) for e in labeled]
+        report[task] = summarize(task, labeled, predictions, thresholds)
+    return report
+
+
+def cross_validate(
+    examples: List[Example],
+    folds: int = 5,
+    repeats: int = 5,
+    thresholds=DEFAULT_THRESHOLDS
+) -> Dict[str, Any]:
+    """
+    k-fold 교차 검증 (학습에 쓰지 않은 메시지로 평가)
+
+    섞는 순서를 바꿔 repeats번 반복하고, 모든 fold의 예측을 모아 임계값별 지표를 계산합니다.
+    임계값 보정(LOCAL_LABELS 확정 기준)에 사용합니다.
+    """
+    predicted: Dict[str, List[Tuple[Example, Prediction]]] = {task: [] for task in TASKS}
+    for repeat in range(repeats):
+        order = list(range(len(examples)))
+        random.Random(repeat).shuffle(order)
+        for fold in range(folds):
+            held_out = set(order[fold::folds])
+            classifier = fit_examples([examples[i] for i in order if i not in held_out])
+            for i in sorted(held_out):
+                for task in TASKS:
+                    if examples[i].get(task) and task in classifier.heads:
+                        predicted[task].append((examples[i], classifier.predict(task, examples[i]["text"])))
+    return {
+        task: summarize(task, [e for e, _ in pairs], [p for _, p in pairs], thresholds)
+        for task, pairs in predicted.items() if pairs
+    }
+
+
+def measure_latency(classifier: MessageClassifier, examples: List[Example], repeat: int = 5) -> Dict[str, float]:
+    """메시지 1건의 intent + sentiment 추론 시간 (µs)"""
+    timings = []
+    for _ in range(repeat):
+        for example in examples:
+            started = time.perf_counter()
+            for task in TASKS:
+                classifier.predict(task, example["text"])
+            timings.append((time.perf_counter() - started) * 1e6)
+    timings.sort()
+    if not timings:
+        return {}
+    return {
+        "p50_us": round(timings[len(timings) // 2], 1),
+        "p99_us": round(timings[min(len(timings) - 1, int(len(timings) * 0.99))], 1),
+        "max_us": round(timings[-1], 1),
+    }
+
+
+def format_report(report: Dict[str, Any]) -> List[str]:
+    lines = []
+    for task, result in report.items():
+        lines.append(f"[{task}] {result['examples']:,}개, 전체 정확도 {result['accuracy']:.1%}")
+        lines.append(f"  {'threshold':>9}  {'coverage':>8}  {'accuracy':>8}  {'missed':>8}")
+        for row in result["thresholds"]:
+            accuracy = f"{row['accuracy']:.1%}" if row["accuracy"] is not None else "-"
+            missed = row.get("missed_recommendation")
+            missed = f"{missed:.1%}" if missed is not None else "-"
+            lines.append(f"  {row['threshold']:>9.2f}  {row['coverage']:>8.1%}  {accuracy:>8}  {missed:>8}")
+    return lines
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="로컬 의도/감정 분류기 평가")
+    parser.add_argument("--model", default=MESSAGE_CLASSIFIER_PATH, help="모델 파일 (없으면 시드 데이터로 학습)")
+    parser.add_argument("--data", action="append", default=[], help="평가 JSONL 파일 (여러 번 지정 가능)")
+    parser.add_argument("--from-logs", action="store_true", help="chat_messages 대화 로그로 평가")
+    parser.add_argument("--limit", type=int, help="대화 로그 최근 N건만 사용")
+    parser.add_argument("--database-url", help="DB URL (기본값: DATABASE_URL 환경 변수)")
+    parser.add_argument("--cross-validate", type=int, metavar="K", help="모델 대신 시드 데이터 + 평가 데이터로 K-fold 교차 검증")
+    args = parser.parse_args(argv)
+
+    examples = load_files(args.data)
+    if args.from_logs:
+        if args.database_url:
+            database_url = args.database_url
+        else:
+            from app.database import SQLALCHEMY_DATABASE_URL
+            database_url = SQLALCHEMY_DATABASE_URL
+        examples.extend(load_logged_examples(database_url, limit=args.limit))
+    if args.cross_validate:
+        examples = load_examples() + examples
+        print(f"🔁 {args.cross_validate}-fold 교차 검증: {len(examples):,}개")
+        print("\n".join(format_report(cross_validate(examples, folds=args.cross_validate))))
+        return 0
+    if not examples:
+        print("❌ 평가 데이터가 없습니다 (--data 또는 --from-logs)", file=sys.stderr)
+        return 1
+
+    if os.path.exists(args.model):
+        classifier = MessageClassifier.load(args.model)
+    else:
+        print(f"⚠️  모델 파일 없음, 시드 데이터로 학습한 기본 모델 평가: {args.model}")
+        classifier = fit_examples(load_examples())
+
+    print("\n".join(format_report(evaluate(classifier, examples))))
+    latency = measure_latency(classifier, examples)
+    print(f"⏱️  추론 시간 (intent + sentiment): p50 {latency['p50_us']}µs, p99 {latency['p99_us']}µs")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
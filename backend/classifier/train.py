@@ -0,0 +1,70 @@
+"""
+로컬 의도 / 감정 분류기 학습
+
+번들된 시드 데이터와 대화 로그(chat_messages)로 학습해 .npz 모델 파일을 만듭니다.
+먼저 holdout 비율만큼 떼어 검증한 결과를 출력한 뒤, 전체 데이터로 다시 학습해 저장합니다.
+서버는 재시작 시 MESSAGE_CLASSIFIER_PATH의 모델을 로드합니다.
+
+사용법:
+    python3 backend/classifier/train.py --from-logs
+    python3 backend/classifier/train.py --data labeled.jsonl --output /tmp/message_classifier.npz
+"""
+import os
+import sys
+import time
+import argparse
+from typing import List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.message_classifier import MESSAGE_CLASSIFIER_PATH, fit_examples, load_examples  # noqa: E402
+from dataset import load_files, load_logged_examples, split  # noqa: E402
+from evaluate import evaluate, format_report  # noqa: E402
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="로컬 의도/감정 분류기 학습")
+    parser.add_argument("--output", default=MESSAGE_CLASSIFIER_PATH, help="모델 파일 경로")
+    parser.add_argument("--data", action="append", default=[], help="추가 학습 JSONL 파일 (여러 번 지정 가능)")
+    parser.add_argument("--from-logs", action="store_true", help="chat_messages 대화 로그 포함")
+    parser.add_argument("--limit", type=int, help="대화 로그 최근 N건만 사용")
+    parser.add_argument("--no-seed", action="store_true", help="번들된 시드 데이터 제외")
+    parser.add_argument("--holdout", type=float, default=0.2, help="검증용 비율 (0이면 검증 생략)")
+    parser.add_argument("--C", type=float, default=10.0, help="로지스틱 회귀 규제 강도의 역수")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database-url", help="DB URL (기본값: DATABASE_URL 환경 변수)")
+    args = parser.parse_args(argv)
+
+    examples = [] if args.no_seed else load_examples()
+    examples.extend(load_files(args.data))
+    if args.from_logs:
+        if args.database_url:
+            database_url = args.database_url
+        else:
+            from app.database import SQLALCHEMY_DATABASE_URL
+            database_url = SQLALCHEMY_DATABASE_URL
+        logged = load_logged_examples(database_url, limit=args.limit)
+        print(f"💬 대화 로그 {len(logged):,}건")
+        examples.extend(logged)
+    if not examples:
+        print("❌ 학습 데이터가 없습니다", file=sys.stderr)
+        return 1
+
+    if args.holdout > 0:
+        train, validation = split(examples, args.holdout, args.seed)
+        report = evaluate(fit_examples(train, C=args.C), validation)
+        print(f"🔎 검증 ({len(train):,}개 학습 / {len(validation):,}개 검증)")
+        print("\n".join(format_report(report)))
+
+    started = time.perf_counter()
+    classifier = fit_examples(examples, C=args.C)
+    classifier.save(args.output)
+    print(
+        f"✅ {len(examples):,}개로 학습, n-gram {len(classifier.vocabulary):,}개 "
+        f"({time.perf_counter() - started:.2f}초) → {args.output}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""
+구매 연관 모델 빌드 CLI
+
+products / purchase_history 테이블로 함께 구매한 상품 / 카테고리 연관도 희소 행렬을 만들어
+AFFINITY_MODEL_DIR에 저장합니다. 서버는 재시작 시 이 디렉터리를 mmap으로 로드합니다.
+(저장은 임시 디렉터리에 쓴 뒤 교체하므로 서버 실행 중에 다시 빌드해도 됩니다.)
+
+사용법:
+    python3 backend/database/build_affinity.py
+    python3 backend/database/build_affinity.py --days 180 --neighbors 30
+    python3 backend/database/build_affinity.py --database-url postgresql://... --output-dir /srv/affinity
+"""
+import os
+import sys
+import time
+import argparse
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import create_engine, select
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models import Product, PurchaseHistory  # noqa: E402
+from app.services.affinity import (  # noqa: E402
+    AFFINITY_MODEL_DIR,
+    AFFINITY_NEIGHBORS,
+    AFFINITY_SHRINKAGE,
+    AffinityModel,
+)
+
+
+def _purchases(connection, days: Optional[int], batch_size: int = 50000) -> Iterator[Tuple[int, int]]:
+    """(user_id, product_id) 구매 목록 (서버 측 커서로 나눠 읽음)"""
+    query = select(PurchaseHistory.user_id, PurchaseHistory.product_id)
+    if days:
+        query = query.where(PurchaseHistory.purchased_at >= datetime.now() - timedelta(days=days))
+    result = connection.execution_options(stream_results=True, yield_per=batch_size).execute(query)
+    for user_id, product_id in result:
+        yield user_id, product_id
+
+
+def build_affinity(
+    database_url: str,
+    output_dir: str = AFFINITY_MODEL_DIR,
+    neighbors: int = AFFINITY_NEIGHBORS,
+    shrinkage: float = AFFINITY_SHRINKAGE,
+    days: Optional[int] = None
+) -> Dict[str, Any]:
+    started = time.perf_counter()
+    engine = create_engine(database_url)
+    try:
+        with engine.connect() as connection:
+            product_categories = dict(connection.execute(select(Product.product_id, Product.category)).all())
+            model = AffinityModel.build(
+                product_categories, _purchases(connection, days), neighbors=neighbors, shrinkage=shrinkage
+            )
+    finally:
+        engine.dispose()
+    model.save(output_dir)
+    return {**model.stats(), "output_dir": output_dir, "seconds": round(time.perf_counter() - started, 2)}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="구매 연관 모델 빌드")
+    parser.add_argument("--output-dir", default=AFFINITY_MODEL_DIR, help="모델 디렉터리")
+    parser.add_argument("--neighbors", type=int, default=AFFINITY_NEIGHBORS, help="상품별 저장할 함께 구매한 상품 수")
+    parser.add_argument("--shrinkage", type=float, default=AFFINITY_SHRINKAGE, help="공동 구매 수 수축 계수")
+    parser.add_argument("--days", type=int, help="최근 N일 구매만 사용 (기본값: 전체)")
+    parser.add_argument("--database-url", help="DB URL (기본값: DATABASE_URL 환경 변수)")
+    args = parser.parse_args(argv)
+
+    if args.database_url:
+        database_url = args.database_url
+    else:
+        from app.database import SQLALCHEMY_DATABASE_URL
+        database_url = SQLALCHEMY_DATABASE_URL
+
+    result = build_affinity(
+        database_url,
+        output_dir=args.output_dir,
+        neighbors=args.neighbors,
+        shrinkage=args.shrinkage,
+        days=args.days
+    )
+    print(
+        f"✅ 상품 {result['items']:,}개, 사용자 {result['users']:,}명, 구매 {result['purchases']:,}건 → "
+        f"nnz {result['nnz']:,} ({result['seconds']}초) → {result['output_dir']}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""
+상품 카탈로그 스냅샷 빌드 CLI
+
+products 테이블을 상품 ID 순으로 나눠 읽어 열 단위 mmap 스냅샷(CATALOG_SNAPSHOT_PATH)으로 저장합니다.
+서버(모든 워커)는 재시작 시 DB 조회 없이 이 스냅샷을 읽기 전용으로 엽니다.
+상품이 바뀌면 다시 빌드한 뒤 서버를 재시작하세요. (실행 중인 서버에 영향 없이 교체됩니다.)
+
+사용법:
+    python3 backend/database/build_catalog_snapshot.py
+    python3 backend/database/build_catalog_snapshot.py --database-url postgresql://... --output-dir /srv/catalog
+"""
+import os
+import sys
+import time
+import argparse
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models import Product  # noqa: E402
+from app.services.catalog import product_to_dict  # noqa: E402
+from app.services.catalog_snapshot import CATALOG_SNAPSHOT_PATH, write_snapshot  # noqa: E402
+
+
+def _products(session: Session, batch_size: int) -> Iterator[Dict[str, Any]]:
+    """상품 ID 순으로 batch_size개씩 읽어 딕셔너리로 변환"""
+    query = session.query(Product).order_by(Product.product_id).yield_per(batch_size)
+    for product in query:
+        yield product_to_dict(product)
+
+
+def build_catalog_snapshot(
+    database_url: str,
+    output_dir: str = CATALOG_SNAPSHOT_PATH,
+    batch_size: int = 10000
+) -> Dict[str, Any]:
+    started = time.perf_counter()
+    engine = create_engine(database_url)
+    try:
+        with Session(engine) as session:
+            meta = write_snapshot(_products(session, batch_size), output_dir)
+    finally:
+        engine.dispose()
+    return {**meta, "output_dir": output_dir, "seconds": round(time.perf_counter() - started, 2)}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="상품 카탈로그 스냅샷 빌드")
+    parser.add_argument("--output-dir", default=CATALOG_SNAPSHOT_PATH, help="스냅샷 디렉터리")
+    parser.add_argument("--batch-size", type=int, default=10000, help="한 번에 읽을 상품 수")
+    parser.add_argument("--database-url", help="DB URL (기본값: DATABASE_URL 환경 변수)")
+    args = parser.parse_args(argv)
+
+    if args.database_url:
+        database_url = args.database_url
+    else:
+        from app.database import SQLALCHEMY_DATABASE_URL
+        database_url = SQLALCHEMY_DATABASE_URL
+
+    result = build_catalog_snapshot(database_url, output_dir=args.output_dir, batch_size=args.batch_size)
+    print(
+        f"✅ 상품 {result['count']:,}개 (version={result['version']}, {result['seconds']}초) "
+        f"→ {result['output_dir']}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
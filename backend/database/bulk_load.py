@@ -0,0 +1,513 @@
+"""
+상품 / 구매이력 대량 적재 CLI
+
+CSV, JSONL, 프론트엔드 TS 데이터 파일(products.ts, mockPurchaseHistory.ts)을 읽어
+products / purchase_history 테이블에 적재합니다.
+
+- PostgreSQL: 청크마다 임시 테이블로 COPY 후 INSERT ... SELECT ... ON CONFLICT DO UPDATE
+- SQLite: 청크마다 executemany + ON CONFLICT DO UPDATE
+- 입력은 청크 단위로 읽으므로 수백만 행도 메모리 사용량이 일정합니다.
+- 기본 키(product_id, purchase_id)가 있는 행은 upsert, 없는 행은 새로 추가됩니다.
+
+사용법:
+    python3 backend/database/bulk_load.py products frontend/app/data/products.ts
+    python3 backend/database/bulk_load.py purchases purchases.csv --chunk-size 50000
+    python3 backend/database/bulk_load.py purchases history.jsonl --database-url postgresql://...
+"""
+import os
+import io
+import re
+import sys
+import csv
+import json
+import time
+import argparse
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import create_engine
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+# ============ 값 변환 ============
+
+def _text(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _integer(value: Any) -> Optional[int]:
+    value = _text(value)
+    return int(Decimal(value)) if value is not None else None
+
+
+def _number(value: Any) -> Optional[float]:
+    value = _text(value)
+    if value is None:
+        return None
+    number = Decimal(value)
+    return int(number) if number == number.to_integral_value() else float(number)
+
+
+def _boolean(value: Any) -> Optional[bool]:
+    if isinstance(value, bool):
+        return value
+    value = _text(value)
+    if value is None:
+        return None
+    return value.lower() in ('1', 't', 'true', 'y', 'yes')
+
+
+def _string_list(value: Any) -> Optional[List[str]]:
+    """배열 값 (CSV에서는 JSON 배열 또는 '|' 구분 문자열 허용)"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.strip()
+        if not value:
+            return None
+        if value.startswith('['):
+            value = json.loads(value)
+        else:
+            value = value.split('|')
+    return [str(v).strip() for v in value if str(v).strip()]
+
+
+def _timestamp(value: Any) -> Optional[str]:
+    """
+    ISO 8601 → 'YYYY-MM-DD HH:MM:SS' (schema.sql의 TIMESTAMP)
+
+    시간대가 있는 값은 서버 로컬 시각으로 변환한 뒤 시간대를 제거합니다 (시간대가 섞인 입력도 같은 기준으로 저장).
+    """
+    value = _text(value)
+    if value is None:
+        return None
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone()
+    return parsed.replace(tzinfo=None).isoformat(sep=' ')
+
+
+# ============ 테이블 정의 ============
+
+@dataclass
+class TableSpec:
+    """적재 대상 테이블"""
+    table: str
+    key: str
+    # 컬럼 → 값 변환 함수 (순서대로 적재)
+    columns: Dict[str, Callable[[Any], Any]]
+    required: Tuple[str, ...]
+    # 프론트엔드(camelCase) 필드명 → 컬럼
+    aliases: Dict[str, str] = field(default_factory=dict)
+    # 값이 없을 때 사용할 기본값 (schema.sql DEFAULT와 동일)
+    defaults: Dict[str, Any] = field(default_factory=dict)
+
+
+TABLES: Dict[str, TableSpec] = {
+    "products": TableSpec(
+        table="products",
+        key="product_id",
+        columns={
+            "product_id": _integer,
+            "name": _text,
+            "description": _text,
+            "category": _text,
+            "sub_category": _text,
+            "price": _number,
+            "original_price": _number,
+            "image_url": _text,
+            "rating": _number,
+            "review_count": _integer,
+            "purchase_count": _integer,
+            "target_gender": _text,
+            "target_age_groups": _string_list,
+            "used_in": _string_list,
+            "tags": _string_list,
+            "stock": _integer,
+            "badge": _text,
+            "is_kurly_only": _boolean,
+        },
+        required=("name", "price"),
+        aliases={
+            "id": "product_id",
+            "subCategory": "sub_category",
+            "originalPrice": "original_price",
+            "image": "image_url",
+            "reviews": "review_count",
+            "purchaseCount": "purchase_count",
+            "targetGender": "target_gender",
+            "targetAge": "target_age_groups",
+            "usedIn": "used_in",
+            "isKurlyOnly": "is_kurly_only",
+        },
+        defaults={
+            "rating": 0,
+            "review_count": 0,
+            "purchase_count": 0,
+            "stock": 0,
+            "is_kurly_only": False,
+            "target_age_groups": [],
+            "used_in": [],
+            "tags": [],
+        },
+    ),
+    "purchases": TableSpec(
+        table="purchase_history",
+        key="purchase_id",
+        columns={
+            "purchase_id": _integer,
+            "user_id": _integer,
+            "product_id": _integer,
+            "quantity": _integer,
+            "purchased_at": _timestamp,
+        },
+        required=("user_id", "product_id", "purchased_at"),
+        aliases={
+            "id": "purchase_id",
+            "purchaseId": "purchase_id",
+            "userId": "user_id",
+            "productId": "product_id",
+            "purchasedAt": "purchased_at",
+        },
+        defaults={"quantity": 1},
+    ),
+}
+
+
+def normalize_record(spec: TableSpec, record: Dict[str, Any]) -> Tuple:
+    """입력 레코드 → 컬럼 순서의 튜플 (필수 값이 없으면 ValueError)"""
+    values = {}
+    for name, value in record.items():
+        column = spec.aliases.get(name, name)
+        converter = spec.columns.get(column)
+        if converter is not None:
+            try:
+                values[column] = converter(value)
+            except (ValueError, InvalidOperation, json.JSONDecodeError) as e:
+                raise ValueError(f"{name}={value!r}: {str(e)}")
+    for column in spec.required:
+        if values.get(column) is None:
+            raise ValueError(f"필수 값 누락: {column}")
+    return tuple(
+        values[column] if values.get(column) is not None else spec.defaults.get(column)
+        for column in spec.columns
+    )
+
+
+# ============ 입력 형식 ============
+
+# TS 객체 리터럴 → JSON 변환용 토큰
+# (문자열을 먼저 소비하므로 문자열 안의 ':'나 '//'는 건드리지 않음)
+_TS_TOKEN = re.compile(
+    r'"(?:\\.|[^"\\])*"'                      # "문자열"
+    r"|'(?:\\.|[^'\\])*'"                     # '문자열'
+    r"|//[^\n]*"                              # 한 줄 주석
+    r"|/\*.*?\*/"                             # 블록 주석
+    r"|\b[A-Za-z_$][\w$]*(?=\s*:)"            # 따옴표 없는 키
+    r"|,(?=(?:\s|//[^\n]*|/\*.*?\*/)*[}\]])",  # 마지막 원소 뒤 쉼표
+    re.S
+)
+
+
+def _ts_token_to_json(match: "re.Match") -> str:
+    token = match.group(0)
+    if token.startswith('"'):
+        return token
+    if token.startswith("'"):
+        return json.dumps(token[1:-1].replace("\\'", "'"), ensure_ascii=False)
+    if token.startswith('/') or token == ',':
+        return ''
+    return f'"{token}"'
+
+
+_TS_BRACKET = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|//[^\n]*|/\*.*?\*/|[\[\]]', re.S)
+
+
+def _array_end(source: str, start: int) -> int:
+    """start 위치의 '['와 짝이 맞는 ']' 다음 위치 (문자열/주석 안의 괄호는 무시)"""
+    depth = 0
+    for match in _TS_BRACKET.finditer(source, start):
+        token = match.group(0)
+        if token == '[':
+            depth += 1
+        elif token == ']':
+            depth -= 1
+            if depth == 0:
+                return match.end()
+    raise ValueError("배열이 닫히지 않았습니다")
+
+
+def read_ts(path: str) -> Iterator[Dict[str, Any]]:
+    """프론트엔드 TS 데이터 파일의 첫 번째 'export const xxx: T[] = [...]' 배열 읽기"""
+    with open(path, encoding='utf-8') as f:
+        source = f.read()
+    start = source.index('= [') + 2
+    end = _array_end(source, start)
+    yield from json.loads(_TS_TOKEN.sub(_ts_token_to_json, source[start:end]))
+
+
+def read_jsonl(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_csv(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        yield from csv.DictReader(f)
+
+
+READERS: Dict[str, Callable[[str], Iterator[Dict[str, Any]]]] = {
+    "csv": read_csv,
+    "jsonl": read_jsonl,
+    "ts": read_ts,
+}
+
+
+def detect_format(path: str) -> str:
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    if extension == 'ndjson':
+        return 'jsonl'
+    if extension in READERS:
+        return extension
+    raise ValueError(f"입력 형식을 알 수 없습니다: {path} (--format으로 지정)")
+
+
+# ============ 적재 ============
+
+class Loader(ABC):
+    """DB 방언별 청크 적재"""
+
+    def __init__(self, connection, spec: TableSpec):
+        self.connection = connection
+        self.spec = spec
+        self.columns = list(spec.columns)
+        self.value_columns = [c for c in self.columns if c != spec.key]
+
+    @abstractmethod
+    def load_chunk(self, rows: List[Tuple]) -> None:
+        """청크 하나를 적재하고 커밋"""
+
+    @staticmethod
+    @abstractmethod
+    def encode_array(values: List[str]) -> str:
+        """배열 값 → DB 방언의 입력 표현"""
+
+    def encode(self, row: Tuple) -> Tuple:
+        """배열 값을 DB 방언의 표현으로 변환"""
+        return tuple(self.encode_array(v) if isinstance(v, list) else v for v in row)
+
+    def split(self, rows: List[Tuple]) -> Tuple[List[Tuple], List[Tuple]]:
+        """
+        (기본 키가 있는 행, 없는 행)으로 분리
+
+        같은 청크에 같은 키가 여러 번 있으면 마지막 행만 사용합니다 (ON CONFLICT는 한 문장에서 같은 행을 두 번 갱신할 수 없음).
+        """
+        key_index = self.columns.index(self.spec.key)
+        keyed: Dict[Any, Tuple] = {}
+        unkeyed: List[Tuple] = []
+        for row in rows:
+            if row[key_index] is None:
+                unkeyed.append(row[:key_index] + row[key_index + 1:])
+            else:
+                keyed[row[key_index]] = row
+        return list(keyed.values()), unkeyed
+
+    def _upsert_clause(self) -> str:
+        updates = ", ".join(f"{c} = excluded.{c}" for c in self.value_columns)
+        return f"ON CONFLICT ({self.spec.key}) DO UPDATE SET {updates}"
+
+
+class SQLiteLoader(Loader):
+    """SQLite: executemany + ON CONFLICT DO UPDATE (product_attributes는 트리거가 채움)"""
+
+    @staticmethod
+    def encode_array(values: List[str]) -> str:
+        return json.dumps(values, ensure_ascii=False)
+
+    def load_chunk(self, rows: List[Tuple]) -> None:
+        keyed, unkeyed = self.split([self.encode(row) for row in rows])
+        cursor = self.connection.cursor()
+        table = self.spec.table
+        if keyed:
+            cursor.executemany(
+                f"INSERT INTO {table} ({', '.join(self.columns)}) "
+                f"VALUES ({', '.join('?' for _ in self.columns)}) {self._upsert_clause()}",
+                keyed
+            )
+        if unkeyed:
+            cursor.executemany(
+                f"INSERT INTO {table} ({', '.join(self.value_columns)}) "
+                f"VALUES ({', '.join('?' for _ in self.value_columns)})",
+                unkeyed
+            )
+        self.connection.commit()
+
+
+class PostgresLoader(Loader):
+    """PostgreSQL: 임시 테이블로 COPY 후 INSERT ... SELECT ... ON CONFLICT DO UPDATE"""
+
+    def __init__(self, connection, spec: TableSpec):
+        super().__init__(connection, spec)
+        self.stage = f"bulk_stage_{spec.table}"
+        cursor = self.connection.cursor()
+        # 제약 조건 없이 컬럼 타입만 복사 (기본 키가 없는 행도 받기 위해)
+        cursor.execute(
+            f"CREATE TEMP TABLE IF NOT EXISTS {self.stage} AS "
+            f"SELECT {', '.join(self.columns)} FROM {spec.table} WITH NO DATA"
+        )
+        self.connection.commit()
+
+    @staticmethod
+    def encode_array(values: List[str]) -> str:
+        """TEXT[] 입력 형식 ('{"a","b"}')"""
+        escaped = (v.replace('\\', '\\\\').replace('"', '\\"') for v in values)
+        return '{' + ','.join(f'"{v}"' for v in escaped) + '}'
+
+    def load_chunk(self, rows: List[Tuple]) -> None:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(self.encode(row))
+        buffer.seek(0)
+
+        columns = ', '.join(self.columns)
+        value_columns = ', '.join(self.value_columns)
+        key = self.spec.key
+        cursor = self.connection.cursor()
+        cursor.execute(f"TRUNCATE {self.stage}")
+        cursor.copy_expert(f"COPY {self.stage} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+        # 같은 키가 여러 번 있으면 마지막 행만 사용 (ctid는 COPY 순서)
+        cursor.execute(
+            f"INSERT INTO {self.spec.table} ({columns}) "
+            f"SELECT DISTINCT ON ({key}) {columns} FROM {self.stage} "
+            f"WHERE {key} IS NOT NULL ORDER BY {key}, ctid DESC "
+            f"{self._upsert_clause()}"
+        )
+        if cursor.rowcount:
+            # 기본 키를 직접 지정해 넣었으므로 키가 없는 행이 기존 키와 겹치지 않도록
+            # SERIAL 시퀀스를 최대값 이후로 맞춤 (같은 실행의 다음 청크 포함)
+            cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence('{self.spec.table}', '{key}'), "
+                f"GREATEST(1, (SELECT COALESCE(MAX({key}), 0) FROM {self.spec.table})))"
+            )
+        cursor.execute(
+            f"INSERT INTO {self.spec.table} ({value_columns}) "
+            f"SELECT {value_columns} FROM {self.stage} WHERE {key} IS NULL"
+        )
+        self.connection.commit()
+
+
+def normalized_rows(
+    spec: TableSpec,
+    records: Iterable[Dict[str, Any]],
+    errors: List[str],
+    max_errors: int
+) -> Iterator[Tuple]:
+    """변환에 실패한 행은 건너뛰고, 오류가 max_errors개를 넘으면 중단"""
+    for line_no, record in enumerate(records, start=1):
+        try:
+            yield normalize_record(spec, record)
+        except ValueError as e:
+            errors.append(f"{line_no}번째 행: {str(e)}")
+            if len(errors) > max_errors:
+                raise ValueError(f"오류가 너무 많아 중단합니다 ({len(errors)}건)")
+
+
+def bulk_load(
+    database_url: str,
+    target: str,
+    path: str,
+    input_format: Optional[str] = None,
+    chunk_size: int = 10000,
+    max_errors: int = 100
+) -> Dict[str, Any]:
+    """
+    파일을 청크 단위로 읽어 테이블에 적재
+
+    Returns:
+        적재 결과 (loaded, skipped, errors, seconds)
+    """
+    spec = TABLES[target]
+    reader = READERS[input_format or detect_format(path)]
+    engine = create_engine(database_url)
+    connection = engine.raw_connection()
+    errors: List[str] = []
+    loaded = 0
+    started = time.perf_counter()
+    try:
+        loader_class = PostgresLoader if engine.dialect.name == "postgresql" else SQLiteLoader
+        loader = loader_class(connection, spec)
+        rows = normalized_rows(spec, reader(path), errors, max_errors)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            loader.load_chunk(chunk)
+            loaded += len(chunk)
+            elapsed = time.perf_counter() - started
+            print(
+                f"📥 {spec.table}: {loaded:,}행 적재 ({loaded / elapsed:,.0f}행/초)",
+                file=sys.stderr,
+                flush=True
+            )
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+        engine.dispose()
+
+    return {
+        "table": spec.table,
+        "loaded": loaded,
+        "skipped": len(errors),
+        "errors": errors[:10],
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="상품/구매이력 대량 적재")
+    parser.add_argument("target", choices=sorted(TABLES), help="적재 대상")
+    parser.add_argument("path", help="입력 파일 (.csv, .jsonl, .ts)")
+    parser.add_argument("--format", choices=sorted(READERS), help="입력 형식 (기본값: 확장자로 판단)")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="한 번에 적재할 행 수")
+    parser.add_argument("--max-errors", type=int, default=100, help="건너뛸 수 있는 잘못된 행 수")
+    parser.add_argument("--database-url", help="DB URL (기본값: DATABASE_URL 환경 변수)")
+    args = parser.parse_args(argv)
+
+    if args.database_url:
+        database_url = args.database_url
+    else:
+        from app.database import SQLALCHEMY_DATABASE_URL
+        database_url = SQLALCHEMY_DATABASE_URL
+
+    result = bulk_load(
+        database_url,
+        args.target,
+        args.path,
+        input_format=args.format,
+        chunk_size=args.chunk_size,
+        max_errors=args.max_errors
+    )
+    for error in result["errors"]:
+        print(f"⚠️  {error}", file=sys.stderr)
+    print(
+        f"✅ {result['table']}: {result['loaded']:,}행 적재, {result['skipped']:,}행 건너뜀 "
+        f"({result['seconds']}초)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
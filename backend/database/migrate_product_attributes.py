@@ -0,0 +1,102 @@
+"""
+상품 배열 속성 정규화 마이그레이션
+
+products.target_age_groups / used_in / tags를 JSON 문자열(TEXT)에서 조회 가능한 구조로 바꿉니다.
+
+- PostgreSQL: TEXT → TEXT[] 변환 + GIN 인덱스
+- SQLite: product_attributes 테이블 + 동기화 트리거 생성 후 기존 상품으로 채우기
+  (SQLite의 배열 컬럼은 JSON 문자열 그대로 유지)
+
+여러 번 실행해도 안전합니다.
+
+사용법:
+    python3 backend/database/migrate_product_attributes.py
+    python3 backend/database/migrate_product_attributes.py --database-url postgresql://...
+"""
+import os
+import sys
+import argparse
+from typing import Optional, List
+
+from sqlalchemy import create_engine, text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models import (  # noqa: E402
+    ProductAttribute,
+    PRODUCT_ATTRIBUTE_COLUMNS,
+    SQLITE_PRODUCT_ATTRIBUTE_TRIGGERS,
+    sqlite_attribute_insert,
+)
+
+ARRAY_COLUMNS = list(PRODUCT_ATTRIBUTE_COLUMNS.values())
+
+POSTGRES_JSON_TO_ARRAY = """
+CREATE OR REPLACE FUNCTION pg_temp.json_text_to_array(value TEXT) RETURNS TEXT[]
+LANGUAGE sql IMMUTABLE AS $$
+  SELECT COALESCE(ARRAY(SELECT jsonb_array_elements_text(NULLIF(value, '')::jsonb)), '{}')
+$$
+"""
+
+
+def migrate_postgres(connection) -> None:
+    converted = connection.execute(text(
+        "SELECT column_name FROM information_schema.columns "
+        "WHERE table_name = 'products' AND data_type = 'ARRAY'"
+    )).scalars().all()
+    pending = [c for c in ARRAY_COLUMNS if c not in converted]
+
+    if pending:
+        connection.execute(text(POSTGRES_JSON_TO_ARRAY))
+        alterations = []
+        for column in pending:
+            alterations.append(
+                f"ALTER COLUMN {column} TYPE TEXT[] USING pg_temp.json_text_to_array({column})"
+            )
+            alterations.append(f"ALTER COLUMN {column} SET DEFAULT '{{}}'")
+        connection.execute(text(f"ALTER TABLE products {', '.join(alterations)}"))
+        print(f"🔧 TEXT[]로 변환: {', '.join(pending)}")
+
+    for column in ARRAY_COLUMNS:
+        connection.execute(text(
+            f"CREATE INDEX IF NOT EXISTS idx_products_{column} ON products USING GIN ({column})"
+        ))
+    print("🔧 GIN 인덱스 확인 완료")
+
+
+def migrate_sqlite(connection) -> None:
+    ProductAttribute.__table__.create(connection, checkfirst=True)
+    for trigger in SQLITE_PRODUCT_ATTRIBUTE_TRIGGERS:
+        connection.exec_driver_sql(trigger)
+    connection.execute(text("DELETE FROM product_attributes"))
+    connection.execute(text(sqlite_attribute_insert("products")))
+    count = connection.execute(text("SELECT COUNT(*) FROM product_attributes")).scalar()
+    print(f"🔧 product_attributes 채우기 완료: {count:,}행")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="상품 배열 속성 정규화 마이그레이션")
+    parser.add_argument("--database-url", help="DB URL (기본값: DATABASE_URL 환경 변수)")
+    args = parser.parse_args(argv)
+
+    if args.database_url:
+        database_url = args.database_url
+    else:
+        from app.database import SQLALCHEMY_DATABASE_URL
+        database_url = SQLALCHEMY_DATABASE_URL
+
+    engine = create_engine(database_url)
+    try:
+        with engine.begin() as connection:
+            if engine.dialect.name == "postgresql":
+                migrate_postgres(connection)
+            else:
+                migrate_sqlite(connection)
+    finally:
+        engine.dispose()
+    print("✅ 마이그레이션 완료")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -48,9 +48,9 @@ CREATE TABLE IF NOT EXISTS products (
   purchase_count INTEGER DEFAULT 0,
   
   target_gender VARCHAR(20),  -- 'all', 'male', 'female', 'male-oriented', 'female-oriented'
-  target_age_groups TEXT,  -- JSON 배열 형태: '["20s", "30s"]'
-  used_in TEXT,  -- JSON 배열 형태: '["찌개/국/탕", "볶음"]'
-  tags TEXT,  -- JSON 배열 형태: '["유기농", "국내산"]'
+  target_age_groups TEXT[] DEFAULT '{}',  -- 배열: {"20s", "30s"}
+  used_in TEXT[] DEFAULT '{}',  -- 배열: {"찌개/국/탕", "볶음"}
+  tags TEXT[] DEFAULT '{}',  -- 배열: {"유기농", "국내산"}
   
   stock INTEGER DEFAULT 0,
   badge VARCHAR(50),
@@ -64,6 +64,10 @@ CREATE INDEX IF NOT EXISTS idx_rating ON products(rating DESC);
 CREATE INDEX IF NOT EXISTS idx_purchase_count ON products(purchase_count DESC);
 CREATE INDEX IF NOT EXISTS idx_created_at ON products(created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_target_gender ON products(target_gender);
+-- 배열 속성 포함 여부 조회 (&&, @>)
+CREATE INDEX IF NOT EXISTS idx_products_target_age_groups ON products USING GIN (target_age_groups);
+CREATE INDEX IF NOT EXISTS idx_products_used_in ON products USING GIN (used_in);
+CREATE INDEX IF NOT EXISTS idx_products_tags ON products USING GIN (tags);
 
 
 
@@ -85,12 +89,29 @@ CREATE INDEX IF NOT EXISTS idx_purchase_product_id ON purchase_history(product_i
 CREATE INDEX IF NOT EXISTS idx_purchase_purchased_at ON purchase_history(purchased_at DESC);
 CREATE INDEX IF NOT EXISTS idx_purchase_user_date ON purchase_history(user_id, purchased_at DESC);
 
+-- ========== User_Purchase_Insights 테이블 ==========
+-- 구매 요약(배너) 스냅샷: 새 구매 발생 시 증분 갱신, 매일 시간 가중치 재적용
+CREATE TABLE IF NOT EXISTS user_purchase_insights (
+  user_id INTEGER NOT NULL,
+  period_days INTEGER NOT NULL,
+  summary TEXT NOT NULL,  -- JSON: 구매 요약 응답
+  last_purchase_id INTEGER NOT NULL DEFAULT 0,
+  computed_at TIMESTAMP NOT NULL,
+  
+  PRIMARY KEY (user_id, period_days),
+  FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_insights_computed_at ON user_purchase_insights(computed_at);
+
 -- ========== 코멘트 ==========
 COMMENT ON TABLE users IS '사용자 프로필 정보';
 COMMENT ON TABLE products IS '상품 정보 및 타겟팅 데이터';
 COMMENT ON TABLE purchase_history IS '사용자 구매이력';
+COMMENT ON TABLE user_purchase_insights IS '사용자별 구매 인사이트 스냅샷';
 
-COMMENT ON COLUMN products.target_age_groups IS 'JSON 배열: ["20s", "30s", "40s", "50s+"]';
-COMMENT ON COLUMN products.used_in IS 'JSON 배열: ["찌개/국/탕", "볶음", "구이", "샐러드" 등]';
+COMMENT ON COLUMN products.target_age_groups IS '배열: {"20s", "30s", "40s", "50s+"}';
+COMMENT ON COLUMN products.used_in IS '배열: {"찌개/국/탕", "볶음", "구이", "샐러드" 등}';
+COMMENT ON COLUMN products.tags IS '배열: {"유기농", "국내산" 등}';
 COMMENT ON COLUMN chat_messages.recommended_products IS 'JSON 배열: 추천한 상품 ID 목록';
 
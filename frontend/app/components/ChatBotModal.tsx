@@ -45,8 +45,24 @@ export default function ChatBotModal({ isOpen, onClose, onShowRecommendedProduct
   const [input, setInput] = useState('');
   const [isLoading, setIsLoading] = useState(false);
   const [selectedModel, setSelectedModel] = useState<'gpt' | 'gemini'>('gpt');
+  const [catalogVersion, setCatalogVersion] = useState<string | null>(null);
   const messagesEndRef = useRef<HTMLDivElement>(null);
 
+  // 서버 카탈로그 버전 확인 (서버에 카탈로그가 있으면 상품 목록을 보내지 않음)
+  useEffect(() => {
+    if (!isOpen || catalogVersion) return;
+    fetch('http://localhost:8001/api/chatbot/catalog/version')
+      .then(res => (res.ok ? res.json() : null))
+      .then(data => {
+        if (data && data.count > 0) {
+          setCatalogVersion(data.version);
+        }
+      })
+      .catch(() => {
+        // 서버 카탈로그를 사용할 수 없으면 기존처럼 상품 목록 전송
+      });
+  }, [isOpen, catalogVersion]);
+
   // 메시지 스크롤
   useEffect(() => {
     messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
@@ -69,8 +85,9 @@ export default function ChatBotModal({ isOpen, onClose, onShowRecommendedProduct
     try {
       // 구매이력 데이터 준비
       let purchaseHistory: any[] = [];
+      let userId: number | null = null;
       if (profile) {
-        const userId = getUserIdByProfile(profile);
+        userId = getUserIdByProfile(profile);
         if (userId) {
           purchaseHistory = getPurchaseHistoryByUserId(userId);
         }
@@ -78,8 +95,8 @@ export default function ChatBotModal({ isOpen, onClose, onShowRecommendedProduct
 
       console.log(`🤖 선택된 AI 모델: ${selectedModel.toUpperCase()}`);
 
-      // Backend API 호출
-      const response = await fetch('http://localhost:8001/api/chatbot/chat', {
+      // Backend 스트리밍 API 호출 (Server-Sent Events)
+      const response = await fetch('http://localhost:8001/api/chatbot/chat/stream', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -89,35 +106,77 @@ export default function ChatBotModal({ isOpen, onClose, onShowRecommendedProduct
           user_profile: profile ? {
             gender: profile.gender,
             ageGroup: profile.ageGroup,
+            occupation: profile.occupation,
+            maritalStatus: profile.maritalStatus,
             name: profile.name,
           } : null,
-          products: products,
+          ...(catalogVersion
+            ? { catalog_version: catalogVersion }
+            : { products: products }),
           purchase_history: purchaseHistory,  // 구매이력 추가
+          ...(userId ? { user_id: userId } : {}),  // 대화 내역 저장용
           model: selectedModel,  // 선택된 AI 모델
         }),
       });
 
-      if (!response.ok) {
+      if (!response.ok || !response.body) {
         throw new Error('챗봇 API 오류');
       }
 
-      const data = await response.json();
-      
-      console.log(`✅ API 응답 받음`);
-      console.log(`🤖 요청한 모델: ${selectedModel.toUpperCase()}`);
-      console.log(`🤖 실제 사용된 모델: ${data.model_used?.toUpperCase()}`);
-      console.log(`📦 추천 상품 수: ${data.recommended_products?.length || 0}개`);
-      console.log(`💭 감정 분석: ${data.sentiment} (${data.sentiment_score})`);
+      // 첫 이벤트가 도착하면 AI 메시지를 추가하고 이후에는 갱신
+      const aiMessageId = (Date.now() + 1).toString();
+      let aiMessageAdded = false;
+      const updateAiMessage = (update: (message: Message) => Message) => {
+        if (!aiMessageAdded) {
+          aiMessageAdded = true;
+          const initial: Message = { id: aiMessageId, role: 'ai', content: '', timestamp: new Date(), recommendations: [] };
+          setMessages(prev => [...prev, update(initial)]);
+        } else {
+          setMessages(prev => prev.map(m => (m.id === aiMessageId ? update(m) : m)));
+        }
+      };
 
-      const aiMessage: Message = {
-        id: (Date.now() + 1).toString(),
-        role: 'ai',
-        content: data.message,
-        timestamp: new Date(),
-        recommendations: data.recommended_products,
+      const handleStreamEvent = (event: string, data: any) => {
+        switch (event) {
+          case 'meta':
+            console.log(`🤖 실제 사용된 모델: ${data.model_used?.toUpperCase()}`);
+            break;
+          case 'sentiment':
+            console.log(`💭 감정 분석: ${data.sentiment} (${data.sentiment_score})`);
+            break;
+          case 'recommendation':
+            updateAiMessage(m => ({ ...m, recommendations: [...(m.recommendations || []), data] }));
+            break;
+          case 'token':
+            updateAiMessage(m => ({ ...m, content: m.content + data.text }));
+            break;
+          case 'done':
+            updateAiMessage(m => ({ ...m, content: data.message || m.content }));
+            break;
+          case 'error':
+            throw new Error(data.detail);
+        }
       };
 
-      setMessages(prev => [...prev, aiMessage]);
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const events = buffer.split('\n\n');
+        buffer = events.pop() || '';
+        for (const raw of events) {
+          const lines = raw.split('\n');
+          const eventLine = lines.find(line => line.startsWith('event: '));
+          const dataLine = lines.find(line => line.startsWith('data: '));
+          if (!eventLine || !dataLine) continue;
+          handleStreamEvent(eventLine.slice(7), JSON.parse(dataLine.slice(6)));
+        }
+      }
+
+      console.log(`✅ API 응답 완료`);
     } catch (error) {
       console.error('챗봇 오류:', error);
       const errorMessage: Message = {
@@ -228,7 +287,7 @@ export default function ChatBotModal({ isOpen, onClose, onShowRecommendedProduct
             </div>
           ))}
           
-          {isLoading && (
+          {isLoading && messages[messages.length - 1]?.role !== 'ai' && (
             <div className="flex justify-start">
               <div className="bg-white rounded-2xl p-4 shadow-sm">
                 <div className="flex gap-2">